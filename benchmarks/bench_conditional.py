@@ -0,0 +1,81 @@
+"""Check that conditional GETs save bandwidth against a fake Flowise that sends ETags
+
+Usage: python benchmarks/bench_conditional.py [--requests N] [--items N] [--json]
+
+Starts benchmarks/fake_flowise.py and lists chatflows `--requests` times with
+a FlowiseAIClient, once with the validator store off and once with it on
+(response cache off in both, so every call reaches the backend). The fake
+counts the body bytes it actually sent and the 304s it answered; the run
+fails if conditional requests did not cut the bytes served.
+"""
+
+import sys
+import json
+import asyncio
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, Any
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx
+
+from flowiseai_mcp.client import FlowiseAIClient
+from bench_http_workers import free_port, wait_ready, stop
+
+
+async def run(url: str, requests: int, validator_bytes: int) -> Dict[str, Any]:
+    before = httpx.get(f"{url}/bench/stats").json()
+    client = FlowiseAIClient(base_url=url, api_key="bench-key", cache_enabled=False,
+                             validator_cache_bytes=validator_bytes)
+    try:
+        for _ in range(requests):
+            chatflows = await client.list_chatflows()
+            assert chatflows, "fake Flowise returned no chatflows"
+    finally:
+        await client.close()
+    after = httpx.get(f"{url}/bench/stats").json()
+    return {
+        "conditional": validator_bytes > 0,
+        "requests": after["requests"] - before["requests"],
+        "not_modified": after["not_modified"] - before["not_modified"],
+        "body_bytes": after["body_bytes"] - before["body_bytes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="chatflow listings per run")
+    parser.add_argument("--items", type=int, default=200, help="chatflows returned by the list endpoint")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    port = free_port()
+    fake = subprocess.Popen([
+        sys.executable, str(ROOT / "benchmarks" / "fake_flowise.py"), "--port", str(port), "--items", str(args.items)
+    ])
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(f"{url}/api/v1/ping", fake)
+        plain = asyncio.run(run(url, args.requests, 0))
+        conditional = asyncio.run(run(url, args.requests, 16 * 1024 * 1024))
+    finally:
+        stop(fake)
+
+    saved = 1 - conditional["body_bytes"] / plain["body_bytes"] if plain["body_bytes"] else None
+    if args.json:
+        print(json.dumps({"items": args.items, "results": [plain, conditional], "bytes_saved_ratio": saved}, indent=2))
+    else:
+        print(f"{args.requests} chatflow listings of {args.items} items")
+        print(f"{'conditional':>11} {'requests':>9} {'304s':>6} {'body bytes':>12}")
+        for r in (plain, conditional):
+            print(f"{str(r['conditional']):>11} {r['requests']:>9} {r['not_modified']:>6} {r['body_bytes']:>12}")
+        print(f"bytes saved: {saved:.1%}")
+    if not conditional["not_modified"] or conditional["body_bytes"] >= plain["body_bytes"]:
+        sys.exit("conditional requests did not reduce the bytes served")
+
+
+if __name__ == "__main__":
+    main()
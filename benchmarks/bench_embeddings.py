@@ -0,0 +1,132 @@
+"""Benchmark list-of-floats vs. array-backed embeddings in VectorUpsertRequest
+
+Usage: python benchmarks/bench_embeddings.py [--rows N] [--dim D] [--repeat R] [--json]
+
+For each input representation, measures validating the request model, the
+memory the validated model retains, and encoding the request body sent to
+Flowise. The baseline is the previous `List[List[float]]` field encoded through
+`model_dump` and `json.dumps`.
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import BaseModel
+
+from flowiseai_mcp import serialization
+from flowiseai_mcp.client import FlowiseAIClient
+from flowiseai_mcp.embeddings import EmbeddingMatrix, numpy
+from flowiseai_mcp.models import VectorUpsertRequest
+
+
+class LegacyVectorUpsertRequest(BaseModel):
+    texts: Optional[List[str]] = None
+    embeddings: Optional[List[List[float]]] = None
+    metadata: Optional[List[Dict[str, Any]]] = None
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def retained(fn):
+    """Bytes still allocated by fn's result, and peak bytes while building it
+
+    Inputs are built inside fn, so whatever the model keeps of them (e.g. the
+    boxed floats of a list-of-lists field) is counted.
+    """
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current - baseline, peak - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Round through float32 so every representation holds the same values
+    flat = array("f", (rng.uniform(-1, 1) for _ in range(args.rows * args.dim)))
+    lists = [flat[i:i + args.dim].tolist() for i in range(0, len(flat), args.dim)]
+    texts = [f"text {i}" for i in range(args.rows)]
+
+    def fresh_lists():
+        return [flat[i:i + args.dim].tolist() for i in range(0, len(flat), args.dim)]
+
+    builders = {
+        "lists": fresh_lists,
+        "array('f') rows": lambda: [flat[i:i + args.dim] for i in range(0, len(flat), args.dim)],
+        "float32 bytes rows": lambda: [flat[i:i + args.dim].tobytes() for i in range(0, len(flat), args.dim)],
+        "base64 rows": lambda: EmbeddingMatrix(flat, args.dim).to_base64(),
+    }
+    if numpy is not None:
+        builders["numpy float32"] = lambda: numpy.frombuffer(flat, dtype=numpy.float32).reshape(args.rows, args.dim)
+
+    client = FlowiseAIClient(base_url="http://localhost")
+    results = []
+
+    legacy = LegacyVectorUpsertRequest(texts=texts, embeddings=lists)
+    results.append({
+        "case": "legacy List[List[float]]",
+        "encoding": "float",
+        "validate_ms": round(timed(lambda: LegacyVectorUpsertRequest(texts=texts, embeddings=lists), args.repeat) * 1000, 2),
+        "encode_ms": round(timed(lambda: json.dumps(legacy.model_dump(exclude_none=True)), args.repeat) * 1000, 2),
+        "retained_bytes": retained(lambda: LegacyVectorUpsertRequest(texts=texts, embeddings=fresh_lists()))[0],
+        "body_bytes": len(json.dumps(legacy.model_dump(exclude_none=True)).encode("utf-8")),
+    })
+
+    for name, build in builders.items():
+        value = build()
+        request = VectorUpsertRequest(texts=texts, embeddings=value)
+        for encoding in ("float", "base64") if name == "lists" else ("float",):
+            client.embedding_encoding = encoding
+            results.append({
+                "case": f"compact from {name}",
+                "encoding": encoding,
+                "validate_ms": round(timed(lambda: VectorUpsertRequest(texts=texts, embeddings=value), args.repeat) * 1000, 2),
+                "encode_ms": round(timed(lambda: client._vector_upsert_body(request), args.repeat) * 1000, 2),
+                "retained_bytes": retained(lambda: VectorUpsertRequest(texts=texts, embeddings=build()))[0],
+                "body_bytes": len(client._vector_upsert_body(request)),
+            })
+
+    if args.json:
+        print(json.dumps({
+            "rows": args.rows,
+            "dim": args.dim,
+            "numpy": numpy is not None,
+            "orjson": serialization.orjson is not None,
+            "results": results
+        }, indent=2))
+        return
+
+    print(f"{args.rows} x {args.dim} embeddings, numpy {'available' if numpy is not None else 'not installed'}, "
+          f"orjson {'available' if serialization.orjson else 'not installed'}")
+    print(f"{'case':<32} {'encoding':>8} {'validate ms':>12} {'encode ms':>10} {'retained MB':>12} {'body MB':>8}")
+    for r in results:
+        print(f"{r['case']:<32} {r['encoding']:>8} {r['validate_ms']:>12} {r['encode_ms']:>10} "
+              f"{r['retained_bytes'] / 1e6:>12.1f} {r['body_bytes'] / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
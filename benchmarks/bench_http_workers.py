@@ -0,0 +1,197 @@
+"""Load test the stateless HTTP server across worker counts against a fake Flowise
+
+Usage: python benchmarks/bench_http_workers.py [--workers 1,2,4] [--duration S] [--concurrency C]
+                                                [--clients P] [--tool NAME] [--latency S] [--json]
+
+Starts benchmarks/fake_flowise.py, then for each worker count runs
+`flowiseai_mcp.http_server` with FLOWISEAI_HTTP_WORKERS=N in stateless mode
+and drives it with `--clients` load generator processes sending tools/call
+requests (no session, no initialize) for `--duration` seconds. Reports
+throughput, p50/p99 latency and scaling efficiency relative to one worker.
+Scaling is bounded by the cores left over for the load generators and the
+fake backend, so run it on a machine with more cores than the largest
+worker count.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx
+
+from flowiseai_mcp.evaluation import percentile
+
+TOOL_ARGUMENTS = {
+    "ping": {},
+    "chatflow_list": {},
+    "prediction_run": {"chatflow_id": "chatflow-0", "question": "How fast is this?"},
+}
+
+HEADERS = {
+    "Accept": "application/json, text/event-stream",
+    "Content-Type": "application/json",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def _drive(url: str, tool: str, concurrency: int, duration: float) -> Tuple[int, List[float]]:
+    body = json.dumps({
+        "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+        "params": {"name": tool, "arguments": TOOL_ARGUMENTS[tool]}
+    })
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(headers=HEADERS, limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, content=body)
+                    ok = response.status_code == 200 and '"result"' in response.text and "Error:" not in response.text
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return errors, latencies
+
+
+def load_process(args: Tuple[str, str, int, float]) -> Tuple[int, List[float]]:
+    """One load generator process; returns its error count and successful latencies"""
+    return asyncio.run(_drive(*args))
+
+
+def run_level(workers: int, args, fake_url: str) -> Dict:
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        HOST="127.0.0.1",
+        FLOWISEAI_HTTP_WORKERS=str(workers),
+        FLOWISEAI_HTTP_STATELESS="true",
+        FLOWISEAI_URL=fake_url,
+        FLOWISEAI_API_KEY="bench-key",
+        FLOWISEAI_CACHE_ENABLED="false",
+    )
+    server = subprocess.Popen([sys.executable, "-m", "flowiseai_mcp.http_server"], cwd=ROOT, env=env)
+    try:
+        wait_ready(f"http://127.0.0.1:{port}/health", server)
+        url = f"http://127.0.0.1:{port}/mcp"
+        per_client = max(1, args.concurrency // args.clients)
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            # Warm up every worker's client pool and lazy imports before measuring
+            pool.map(load_process, [(url, args.tool, per_client, 1.0)] * args.clients)
+            started = time.perf_counter()
+            outcomes = pool.map(load_process, [(url, args.tool, per_client, args.duration)] * args.clients)
+            elapsed = time.perf_counter() - started
+    finally:
+        stop(server)
+
+    latencies = sorted(l for _, client_latencies in outcomes for l in client_latencies)
+    errors = sum(e for e, _ in outcomes)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--concurrency", type=int, default=64, help="requests in flight across all clients")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="load generator processes")
+    parser.add_argument("--tool", choices=sorted(TOOL_ARGUMENTS), default="prediction_run")
+    parser.add_argument("--latency", type=float, default=0.01, help="fake Flowise latency per request")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    fake = subprocess.Popen([
+        sys.executable, str(ROOT / "benchmarks" / "fake_flowise.py"),
+        "--port", str(fake_port), "--latency", str(args.latency)
+    ])
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    try:
+        wait_ready(f"{fake_url}/api/v1/ping", fake)
+        results = [run_level(int(n), args, fake_url) for n in args.workers.split(",")]
+    finally:
+        stop(fake)
+
+    baseline = results[0]["requests_per_second"] / results[0]["workers"] or None
+    for r in results:
+        r["scaling_efficiency"] = round(r["requests_per_second"] / (baseline * r["workers"]), 2) if baseline else None
+
+    if args.json:
+        print(json.dumps({
+            "tool": args.tool,
+            "cpus": os.cpu_count(),
+            "clients": args.clients,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "fake_latency": args.latency,
+            "results": results
+        }, indent=2))
+        return
+
+    print(f"{args.tool} over stateless HTTP, {os.cpu_count()} CPUs, {args.clients} load processes, "
+          f"{args.concurrency} in flight, fake Flowise latency {args.latency * 1000:.0f} ms")
+    print(f"{'workers':>7} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'efficiency':>11}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['requests']:>9} {r['errors']:>7} {r['requests_per_second']:>9} "
+              f"{r['p50_ms']:>8} {r['p99_ms']:>8} {r['scaling_efficiency']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark tools/list latency and allocations with and without the cached catalog
+
+Usage: python benchmarks/bench_list_tools.py [--iterations N] [--json]
+
+Compares three paths:
+  rebuild      - build every MCPTool from the tool table per request (previous behaviour)
+  cached       - the server's list_tools handler serving the prebuilt catalog
+  precomputed  - the serialized catalog served by GET /tools
+The handler paths include the result dump the MCP session performs per response.
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcp.server import Server
+from mcp.types import Tool as MCPTool, ListToolsRequest
+
+from flowiseai_mcp.server import FlowiseAIMCPServer
+from flowiseai_mcp.tools import TOOL_SPECS, tool_catalog_json, _with_output_argument
+
+
+def _dump(result) -> dict:
+    # What BaseSession does with every result before writing it to the transport
+    return result.model_dump(by_alias=True, mode="json", exclude_none=True)
+
+
+def rebuild_handler():
+    """tools/list handler that rebuilds the catalog per request, as before caching"""
+    server = Server("bench")
+
+    @server.list_tools()
+    async def list_tools():
+        return [
+            MCPTool(
+                name=spec.name,
+                description=spec.description,
+                inputSchema=_with_output_argument(spec.input_schema) if spec.shapes_output else spec.input_schema
+            )
+            for spec in TOOL_SPECS
+        ]
+    return server.request_handlers[ListToolsRequest]
+
+
+def cached_handler():
+    return FlowiseAIMCPServer().server.request_handlers[ListToolsRequest]
+
+
+async def _time(call, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await call()
+    return time.perf_counter() - start
+
+
+def measure(name: str, call, iterations: int) -> dict:
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(call())  # warm up caches and lazy imports
+    elapsed = loop.run_until_complete(_time(call, iterations))
+
+    # Peak allocation of a single call, measured separately since tracing slows everything down
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    loop.run_until_complete(call())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    loop.close()
+
+    return {
+        "path": name,
+        "iterations": iterations,
+        "mean_us": round(elapsed / iterations * 1e6, 2),
+        "calls_per_sec": round(iterations / elapsed, 1),
+        "peak_bytes_per_call": peak - baseline
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    request = ListToolsRequest(method="tools/list")
+    before, after = rebuild_handler(), cached_handler()
+
+    async def rebuild():
+        return _dump(await before(request))
+
+    async def cached():
+        return _dump(await after(request))
+
+    async def precomputed():
+        return tool_catalog_json()
+
+    results = [
+        measure("rebuild", rebuild, args.iterations),
+        measure("cached", cached, args.iterations),
+        measure("precomputed", precomputed, args.iterations)
+    ]
+    payload = len(tool_catalog_json())
+
+    if args.json:
+        print(json.dumps({"tools": len(TOOL_SPECS), "payload_bytes": payload, "results": results}, indent=2))
+        return
+
+    print(f"tools/list: {len(TOOL_SPECS)} tools, {payload} bytes serialized")
+    print(f"{'path':<12} {'mean (us)':>10} {'calls/s':>12} {'peak bytes/call':>16}")
+    for r in results:
+        print(f"{r['path']:<12} {r['mean_us']:>10} {r['calls_per_sec']:>12} {r['peak_bytes_per_call']:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Micro-benchmark tool result serialization for every model in flowiseai_mcp.models
+
+Usage: python benchmarks/bench_serialization.py [--items N] [--repeat R] [--json]
+
+For each model, a list of N populated instances is serialized with the previous
+`json.dumps([r.model_dump() ...], default=str)` path and with
+`flowiseai_mcp.serialization.serialize`, reporting mean time and peak memory.
+"""
+
+import sys
+import json
+import time
+import typing
+import argparse
+import tracemalloc
+from enum import Enum
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import BaseModel
+
+from flowiseai_mcp import models
+from flowiseai_mcp import serialization
+from flowiseai_mcp.embeddings import EmbeddingMatrix
+
+_NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def sample_value(annotation, depth=0):
+    """A representative value for a field annotation"""
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        return sample_value(next(a for a in args if a is not type(None)), depth)
+    if origin in (list, typing.List):
+        return [sample_value(args[0] if args else str, depth + 1) for _ in range(3)]
+    if origin in (dict, typing.Dict) or annotation is dict:
+        if len(args) == 2 and args[1] is not typing.Any:
+            return {"key": sample_value(args[1], depth + 1), "other": sample_value(args[1], depth + 1)}
+        if depth > 1:
+            return {"key": "value"}
+        return {"key": "value", "count": 3, "nested": {"text": "lorem ipsum " * 4, "score": 0.25}}
+    if isinstance(annotation, type):
+        if issubclass(annotation, EmbeddingMatrix):
+            return [[0.125 * (row + 1)] * 16 for row in range(3)]
+        if issubclass(annotation, Enum):
+            return next(iter(annotation)).value
+        if issubclass(annotation, bool):
+            return True
+        if issubclass(annotation, int):
+            return 1
+        if issubclass(annotation, float):
+            return 0.5
+        if issubclass(annotation, datetime):
+            return _NOW
+        if issubclass(annotation, BaseModel):
+            return sample_fields(annotation, depth + 1)
+    if annotation is typing.Any:
+        return {"key": "value"}
+    return "lorem ipsum dolor sit amet"
+
+
+def sample_fields(model, depth=0):
+    return {field.alias or name: sample_value(field.annotation, depth) for name, field in model.model_fields.items()}
+
+
+def all_models():
+    return [
+        obj for obj in vars(models).values()
+        if isinstance(obj, type) and issubclass(obj, BaseModel) and obj is not BaseModel
+        and obj.__module__ == models.__name__
+    ]
+
+
+def legacy(result):
+    return json.dumps([r.model_dump() for r in result], default=str)
+
+
+def measure(fn, result, repeat):
+    fn(result)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(result)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    fn(result)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000, help="list length per model")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = []
+    for model in all_models():
+        result = [model.model_validate(sample_fields(model)) for _ in range(args.items)]
+        old_time, old_peak = measure(legacy, result, args.repeat)
+        new_time, new_peak = measure(serialization.serialize, result, args.repeat)
+        results.append({
+            "model": model.__name__,
+            "items": args.items,
+            "bytes": len(serialization.serialize(result)),
+            "legacy_ms": round(old_time * 1000, 3),
+            "serialize_ms": round(new_time * 1000, 3),
+            "speedup": round(old_time / new_time, 2) if new_time else None,
+            "legacy_peak_bytes": old_peak,
+            "serialize_peak_bytes": new_peak
+        })
+
+    if args.json:
+        print(json.dumps({"orjson": serialization.orjson is not None, "results": results}, indent=2))
+        return
+
+    print(f"{args.items} items per model, orjson {'available' if serialization.orjson else 'not installed'}")
+    print(f"{'model':<20} {'legacy ms':>10} {'new ms':>10} {'speedup':>8} {'legacy peak':>12} {'new peak':>12}")
+    for r in results:
+        print(f"{r['model']:<20} {r['legacy_ms']:>10} {r['serialize_ms']:>10} {r['speedup']:>8} "
+              f"{r['legacy_peak_bytes']:>12} {r['serialize_peak_bytes']:>12}")
+
+
+if __name__ == "__main__":
+    main()
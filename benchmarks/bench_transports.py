@@ -0,0 +1,241 @@
+"""Benchmark representative tools over stdio and Streamable HTTP against a fake Flowise
+
+Usage: python benchmarks/bench_transports.py [--transports stdio,http] [--tools a,b] [--requests N]
+                                              [--concurrency C] [--latency S] [--items N] [--text-bytes B]
+                                              [--tokens N] [--token-interval S] [--json] [--output FILE]
+                                              [--compare FILE]
+
+Starts benchmarks/fake_flowise.py, then runs the server the way clients do:
+`python -m flowiseai_mcp` as a stdio subprocess and `flowiseai_mcp.http_server`
+(one stateful worker) over Streamable HTTP, both driven through the MCP SDK
+client. For every transport and tool it issues `--requests` calls with
+`--concurrency` in flight on one session and reports throughput and
+p50/p99 latency.
+
+The JSON written by --json/--output records the commit, environment and
+settings next to the results, so runs from different commits can be diffed;
+--compare prints the change against such a file.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import platform
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from mcp import ClientSession
+from mcp.client.stdio import stdio_client, StdioServerParameters
+try:
+    from mcp.client.streamable_http import streamable_http_client
+except ImportError:
+    from mcp.client.streamable_http import streamablehttp_client as streamable_http_client
+
+from flowiseai_mcp.evaluation import percentile
+from bench_http_workers import free_port, wait_ready, stop
+
+TOOL_ARGUMENTS = {
+    "ping": {},
+    "chatflow_list": {},
+    "chatflow_get": {"id": "chatflow-0"},
+    "prediction_run": {"chatflow_id": "chatflow-0", "question": "How fast is this?"},
+    "prediction_stream": {"chatflow_id": "chatflow-0", "question": "How fast is this?"},
+}
+
+
+def server_env(fake_url: str) -> Dict[str, str]:
+    # Caching would turn repeated reads into local hits and hide the request path
+    return dict(
+        os.environ,
+        FLOWISEAI_URL=fake_url,
+        FLOWISEAI_API_KEY="bench-key",
+        FLOWISEAI_CACHE_ENABLED="false",
+        PYTHONPATH=str(ROOT),
+    )
+
+
+async def measure(session: ClientSession, tool: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    arguments = TOOL_ARGUMENTS[tool]
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                result = await session.call_tool(tool, arguments)
+                text = result.content[0].text if result.content else ""
+                ok = not result.isError and not text.startswith(("Error:", "Unknown tool"))
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    # Warm up lazy imports, the client pool and the validators before measuring
+    for _ in range(min(10, requests)):
+        await session.call_tool(tool, arguments)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "tool": tool,
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+async def run_tools(session: ClientSession, args) -> List[Dict[str, Any]]:
+    await session.initialize()
+    return [await measure(session, tool, args.requests, args.concurrency) for tool in args.tools]
+
+
+async def bench_stdio(args, fake_url: str) -> List[Dict[str, Any]]:
+    params = StdioServerParameters(
+        command=sys.executable, args=["-m", "flowiseai_mcp"], env=server_env(fake_url), cwd=str(ROOT)
+    )
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            return await run_tools(session, args)
+
+
+async def bench_http(args, fake_url: str) -> List[Dict[str, Any]]:
+    port = free_port()
+    env = dict(server_env(fake_url), PORT=str(port), HOST="127.0.0.1", FLOWISEAI_HTTP_WORKERS="1")
+    server = subprocess.Popen([sys.executable, "-m", "flowiseai_mcp.http_server"], cwd=ROOT, env=env)
+    try:
+        wait_ready(f"http://127.0.0.1:{port}/health", server)
+        async with streamable_http_client(f"http://127.0.0.1:{port}/mcp") as (read, write, _):
+            async with ClientSession(read, write) as session:
+                return await run_tools(session, args)
+    finally:
+        stop(server)
+
+
+TRANSPORTS = {"stdio": bench_stdio, "http": bench_http}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def compare(report: Dict[str, Any], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["transport"], r["tool"]): r for r in baseline["results"]}
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if new is not None and old else "n/a"
+
+    print(f"\nAgainst {baseline_path} (commit {baseline.get('commit') or 'unknown'}):")
+    print(f"{'transport':<9} {'tool':<18} {'req/s':>9} {'p50':>9} {'p99':>9}")
+    for r in report["results"]:
+        old = previous.get((r["transport"], r["tool"]))
+        if old is None:
+            continue
+        print(f"{r['transport']:<9} {r['tool']:<18} {change(r['requests_per_second'], old['requests_per_second']):>9} "
+              f"{change(r['p50_ms'], old['p50_ms']):>9} {change(r['p99_ms'], old['p99_ms']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transports", default="stdio,http", help="comma-separated: stdio, http")
+    parser.add_argument("--tools", default="ping,chatflow_list,chatflow_get,prediction_run,prediction_stream",
+                        help=f"comma-separated, from: {', '.join(TOOL_ARGUMENTS)}")
+    parser.add_argument("--requests", type=int, default=500, help="measured calls per transport and tool")
+    parser.add_argument("--concurrency", type=int, default=8, help="calls in flight on the session")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake Flowise latency per request")
+    parser.add_argument("--items", type=int, default=20, help="chatflows returned by the list endpoint")
+    parser.add_argument("--text-bytes", type=int, default=256, help="size of each prediction answer")
+    parser.add_argument("--tokens", type=int, default=32, help="token events per streamed prediction")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+    args.tools = args.tools.split(",")
+    transports = args.transports.split(",")
+    for name in args.tools:
+        if name not in TOOL_ARGUMENTS:
+            parser.error(f"unknown tool {name!r}")
+    for name in transports:
+        if name not in TRANSPORTS:
+            parser.error(f"unknown transport {name!r}")
+
+    fake_port = free_port()
+    fake = subprocess.Popen([
+        sys.executable, str(ROOT / "benchmarks" / "fake_flowise.py"), "--port", str(fake_port),
+        "--latency", str(args.latency), "--items", str(args.items), "--text-bytes", str(args.text_bytes),
+        "--tokens", str(args.tokens), "--token-interval", str(args.token_interval)
+    ])
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    results = []
+    try:
+        wait_ready(f"{fake_url}/api/v1/ping", fake)
+        for name in transports:
+            for result in asyncio.run(TRANSPORTS[name](args, fake_url)):
+                results.append({"transport": name, **result})
+    finally:
+        stop(fake)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "fake_latency": args.latency,
+            "items": args.items,
+            "text_bytes": args.text_bytes,
+            "tokens": args.tokens,
+            "token_interval": args.token_interval,
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.requests} calls per tool, {args.concurrency} in flight, fake Flowise latency "
+              f"{args.latency * 1000:.0f} ms, commit {(report['commit'] or 'unknown')[:12]}")
+        print(f"{'transport':<9} {'tool':<18} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for r in results:
+            print(f"{r['transport']:<9} {r['tool']:<18} {r['requests']:>9} {r['errors']:>7} "
+                  f"{r['requests_per_second']:>9} {r['p50_ms']:>8} {r['p99_ms']:>8}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
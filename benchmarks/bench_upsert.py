@@ -0,0 +1,114 @@
+"""Check batched vector upserts with deduplication against a fake Flowise
+
+Usage: python benchmarks/bench_upsert.py [--documents N] [--batch-size N] [--concurrency C]
+                                         [--latency S] [--json]
+
+Starts benchmarks/fake_flowise.py and upserts `--documents` texts through
+`FlowiseAIClient.vector_upsert_batched` with a dedup index, several batches in
+flight; the fake finishes them out of order and rejects one batch. The dedup
+index must then hold exactly the texts the fake accepted, and a second run
+must send only the rejected batch again. Reports the time of both runs and
+fails if either check does not hold.
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx
+
+from flowiseai_mcp.client import FlowiseAIClient
+from flowiseai_mcp.dedup import DedupRun, content_key, vector_target
+from bench_http_workers import free_port, wait_ready, stop
+
+CHATFLOW = "chatflow-0"
+
+
+def documents(count: int, failing_batch: int, batch_size: int) -> List[Dict[str, Any]]:
+    failing = range(failing_batch * batch_size, (failing_batch + 1) * batch_size)
+    return [
+        {"pageContent": f"{'FAIL' if i in failing else 'text'} {i}", "metadata": {"row": i}}
+        for i in range(count)
+    ]
+
+
+async def run(client: FlowiseAIClient, docs: List[Dict[str, Any]], args) -> Dict[str, Any]:
+    dedup = DedupRun(client.dedup, vector_target(client.base_url, CHATFLOW))
+    started = time.perf_counter()
+    batches = failed = 0
+    async for result in client.vector_upsert_batched(CHATFLOW, docs, batch_size=args.batch_size,
+                                                     concurrency=args.concurrency, max_attempts=1, dedup=dedup):
+        batches += 1
+        failed += not result.success
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "batches": batches,
+        "failed_batches": failed,
+        **dedup.report().model_dump()
+    }
+
+
+async def bench(url: str, args) -> Dict[str, Any]:
+    docs = documents(args.documents, failing_batch=1, batch_size=args.batch_size)
+    with tempfile.TemporaryDirectory() as directory:
+        client = FlowiseAIClient(base_url=url, api_key="bench-key", dedup_path=f"{directory}/dedup.sqlite")
+        try:
+            first = await run(client, docs, args)
+            accepted = set(httpx.get(f"{url}/bench/upserted").json().get(CHATFLOW, []))
+            keys = {content_key(d["pageContent"], d["metadata"]): d["pageContent"] for d in docs}
+            recorded = {keys[key] for key in client.dedup.seen(vector_target(client.base_url, CHATFLOW), list(keys))}
+            second = await run(client, docs, args)
+        finally:
+            await client.close()
+    return {"first": first, "second": second, "accepted": len(accepted),
+            "recorded_matches_accepted": recorded == accepted}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=2000, help="texts to upsert")
+    parser.add_argument("--batch-size", type=int, default=100, help="texts per batch")
+    parser.add_argument("--concurrency", type=int, default=4, help="batches in flight")
+    parser.add_argument("--latency", type=float, default=0.01, help="mean fake Flowise latency per batch")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+    if args.documents < 3 * args.batch_size or args.concurrency < 2:
+        parser.error("the check needs at least 3 batches and a concurrency of 2")
+
+    port = free_port()
+    fake = subprocess.Popen([
+        sys.executable, str(ROOT / "benchmarks" / "fake_flowise.py"), "--port", str(port), "--latency", str(args.latency)
+    ])
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(f"{url}/api/v1/ping", fake)
+        report = asyncio.run(bench(url, args))
+    finally:
+        stop(fake)
+
+    first, second = report["first"], report["second"]
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.documents} texts in batches of {args.batch_size}, {args.concurrency} in flight")
+        print(f"{'run':<7} {'seconds':>8} {'batches':>8} {'failed':>7} {'sent':>6} {'skipped':>8}")
+        for name, r in (("first", first), ("second", second)):
+            print(f"{name:<7} {r['seconds']:>8} {r['batches']:>8} {r['failed_batches']:>7} {r['sent']:>6} {r['skipped']:>8}")
+        print(f"dedup index matches the {report['accepted']} accepted texts: {report['recorded_matches_accepted']}")
+    if not report["recorded_matches_accepted"]:
+        sys.exit("the dedup index does not match the texts Flowise accepted")
+    if second["batches"] != 1 or second["skipped"] != report["accepted"]:
+        sys.exit("the second run did not send only the rejected batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Local stand-in for the FlowiseAI API, for load tests and benchmarks
+
+Usage: python benchmarks/fake_flowise.py [--port P] [--latency S] [--items N] [--text-bytes B]
+                                         [--tokens N] [--token-interval S]
+
+Serves the handful of endpoints the benchmarks call with fixed payloads and
+an artificial per-request latency, so a run measures this server rather than
+a real Flowise instance. Chatflow reads carry an ETag and are answered with
+304 Not Modified when the request's If-None-Match matches, and
+GET /bench/stats reports the requests, 304s and body bytes served so far.
+Vector upserts take a random share of up to twice the latency, so concurrent
+batches finish out of order; a batch with a text starting with "FAIL" gets a
+500, and GET /bench/upserted lists the texts accepted per chatflow.
+Predictions with `"streaming": true` are answered as
+a Flowise SSE stream: a start event, `--tokens` token events spaced by
+`--token-interval` seconds that together carry the `--text-bytes` answer, a
+metadata event and the end marker.
+"""
+
+import json
+import random
+import asyncio
+import hashlib
+import argparse
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+
+def create_app(latency: float = 0.0, items: int = 20, text_bytes: int = 256, tokens: int = 32,
+               token_interval: float = 0.0) -> Starlette:
+    """Fake Flowise app answering ping, chatflow reads, (streaming) predictions and vector upserts"""
+    chatflows = [
+        {
+            "id": f"chatflow-{i}",
+            "name": f"Chatflow {i}",
+            "flowData": {"nodes": [], "edges": []},
+            "deployed": True,
+            "isPublic": False,
+            "type": "CHATFLOW",
+            "createdDate": "2024-01-01T00:00:00.000Z",
+            "updatedDate": "2024-01-01T00:00:00.000Z"
+        }
+        for i in range(items)
+    ]
+    by_id = {chatflow["id"]: chatflow for chatflow in chatflows}
+    answer = ("lorem ipsum " * (text_bytes // 12 + 1))[:text_bytes]
+    step = max(1, -(-len(answer) // max(1, tokens)))
+    pieces = [answer[i:i + step] for i in range(0, len(answer), step)]
+
+    stats = {"requests": 0, "not_modified": 0, "body_bytes": 0}
+    upserted = {}
+
+    async def wait():
+        stats["requests"] += 1
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def conditional(request: Request, value) -> Response:
+        body = json.dumps(value).encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        if request.headers.get("if-none-match") == etag:
+            stats["not_modified"] += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        stats["body_bytes"] += len(body)
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    async def ping(request: Request):
+        await wait()
+        return JSONResponse({"message": "pong"})
+
+    async def list_chatflows(request: Request):
+        await wait()
+        return conditional(request, chatflows)
+
+    async def get_chatflow(request: Request):
+        await wait()
+        chatflow = by_id.get(request.path_params["chatflow_id"])
+        if chatflow is None:
+            return JSONResponse({"message": "Chatflow not found"}, status_code=404)
+        return conditional(request, chatflow)
+
+    async def bench_stats(request: Request):
+        return JSONResponse(stats)
+
+    async def prediction(request: Request):
+        body = await request.json()
+        await wait()
+        metadata = {
+            "question": body.get("question"),
+            "chatId": body.get("chatId") or "bench-chat",
+            "chatMessageId": "bench-message",
+            "sessionId": (body.get("overrideConfig") or {}).get("sessionId", "bench-session")
+        }
+        if not body.get("streaming"):
+            return JSONResponse({"text": answer, **metadata})
+
+        async def events():
+            yield "event: start\ndata: \n\n"
+            for piece in pieces:
+                if token_interval > 0:
+                    await asyncio.sleep(token_interval)
+                yield f"event: token\ndata: {piece}\n\n"
+            yield f"event: metadata\ndata: {json.dumps(metadata)}\n\n"
+            yield "event: end\ndata: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def vector_upsert(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        if latency > 0:
+            await asyncio.sleep(random.uniform(0, 2 * latency))
+        texts = body.get("texts") or []
+        if any(text.startswith("FAIL") for text in texts):
+            return JSONResponse({"message": "Upsert failed"}, status_code=500)
+        upserted.setdefault(request.path_params["chatflow_id"], []).extend(texts)
+        return JSONResponse({"numAdded": len(texts), "numUpdated": 0, "numSkipped": 0, "numDeleted": 0})
+
+    async def bench_upserted(request: Request):
+        return JSONResponse(upserted)
+
+    return Starlette(routes=[
+        Route("/api/v1/ping", ping),
+        Route("/api/v1/chatflows", list_chatflows),
+        Route("/api/v1/chatflows/{chatflow_id}", get_chatflow),
+        Route("/api/v1/prediction/{chatflow_id}", prediction, methods=["POST"]),
+        Route("/api/v1/vector/upsert/{chatflow_id}", vector_upsert, methods=["POST"]),
+        Route("/bench/stats", bench_stats),
+        Route("/bench/upserted", bench_upserted),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3999)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--items", type=int, default=20, help="chatflows returned by the list endpoint")
+    parser.add_argument("--text-bytes", type=int, default=256, help="size of each prediction answer")
+    parser.add_argument("--tokens", type=int, default=32, help="token events per streamed prediction")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="seconds between streamed tokens")
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.latency, args.items, args.text_bytes, args.tokens, args.token_interval),
+        host=args.host, port=args.port, log_level="error"
+    )
+
+
+if __name__ == "__main__":
+    main()
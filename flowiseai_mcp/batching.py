@@ -0,0 +1,96 @@
+"""Size-bounded batching of documents for bulk upserts"""
+
+import time
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+
+from .models import UpsertBatchResult, BulkUpsertReport
+from .serialization import dumps_plain
+
+
+def batch_documents(
+    documents: Iterable[Dict[str, Any]],
+    max_count: int,
+    max_bytes: int
+) -> Iterator[Tuple[List[bytes], int]]:
+    """Group documents into batches of at most `max_count` items and `max_bytes` of JSON
+
+    Documents are encoded once here and yielded as (encoded documents, total
+    bytes), so the request body can be assembled without serializing again.
+    The input is consumed lazily; a single document larger than `max_bytes` is
+    sent as a batch of its own.
+    """
+    batch: List[bytes] = []
+    size = 0
+    for document in documents:
+        encoded = dumps_plain(document).encode("utf-8")
+        if batch and (len(batch) >= max_count or size + len(encoded) + 1 > max_bytes):
+            yield batch, size
+            batch, size = [], 0
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        yield batch, size
+
+
+def batch_texts(
+    documents: Iterable[Dict[str, Any]],
+    max_count: int,
+    max_bytes: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """Group `{"pageContent", "metadata"}` documents by count and (approximate) text bytes"""
+    batch: List[Dict[str, Any]] = []
+    size = 0
+    for document in documents:
+        length = len(document.get("pageContent", "").encode("utf-8"))
+        if batch and (len(batch) >= max_count or size + length > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(document)
+        size += length
+    if batch:
+        yield batch
+
+
+def documents_body(encoded: List[bytes]) -> bytes:
+    """Build the `{"documents": [...]}` request body from pre-encoded documents"""
+    return b'{"documents":[' + b",".join(encoded) + b"]}"
+
+
+class BulkUpsertTracker:
+    """Accumulates per-batch results into a BulkUpsertReport"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.batches = 0
+        self.succeeded = 0
+        self.documents = 0
+        self.documents_upserted = 0
+        self.bytes_sent = 0
+        self.retries = 0
+        self.failures: List[UpsertBatchResult] = []
+
+    def add(self, result: UpsertBatchResult):
+        self.batches += 1
+        self.documents += result.documents
+        self.retries += result.attempts - 1
+        if result.success:
+            self.succeeded += 1
+            self.documents_upserted += result.documents
+            self.bytes_sent += result.bytes
+        else:
+            self.failures.append(result)
+
+    def report(self) -> BulkUpsertReport:
+        elapsed = time.monotonic() - self.started
+        return BulkUpsertReport(
+            batches=self.batches,
+            succeeded_batches=self.succeeded,
+            failed_batches=len(self.failures),
+            documents=self.documents,
+            documents_upserted=self.documents_upserted,
+            bytes_sent=self.bytes_sent,
+            retries=self.retries,
+            elapsed_seconds=round(elapsed, 3),
+            documents_per_second=round(self.documents_upserted / elapsed, 1) if elapsed > 0 else None,
+            failures=self.failures
+        )
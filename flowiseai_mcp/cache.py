@@ -0,0 +1,209 @@
+"""In-process response and validator caches for FlowiseAI GET endpoints"""
+
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Awaitable, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LoadCancelled(Exception):
+    """The call whose load other callers were waiting on was cancelled"""
+
+
+class ResponseCache:
+    """Size-bounded LRU cache with per-resource TTLs and single-flight loading
+
+    Entries are grouped by resource name (e.g. "chatflows") so a successful
+    write can invalidate every cached list/get of that resource at once.
+    Concurrent misses for the same key share one loader call, and a load that
+    races with an invalidation is returned to its callers but not stored. If
+    the caller running a shared load is cancelled, its waiters load again
+    themselves rather than being cancelled with it.
+    """
+
+    def __init__(self, ttls: Dict[str, float], max_entries: int = 256):
+        self.ttls = {resource: ttl for resource, ttl in ttls.items() if ttl > 0}
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def is_cacheable(self, resource: str) -> bool:
+        return resource in self.ttls
+
+    async def get_or_load(self, resource: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a fresh cached value or load it, sharing concurrent loads"""
+        cache_key = (resource, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(cache_key)
+                self._hits += 1
+                return value
+            del self._entries[cache_key]
+
+        pending = self._inflight.get(cache_key)
+        if pending is not None:
+            self._coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except LoadCancelled:
+                return await self.get_or_load(resource, key, loader)
+
+        self._misses += 1
+        generation = self._generations.get(resource, 0)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Cancelling the shared future would cancel unrelated callers' tool calls
+            future.set_exception(LoadCancelled(f"Load of {resource} was cancelled"))
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures do not log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+
+        future.set_result(value)
+        if self._generations.get(resource, 0) == generation:
+            self._store(cache_key, value)
+        return value
+
+    def _store(self, cache_key: Tuple[str, Hashable], value: Any):
+        self._entries[cache_key] = (time.monotonic() + self.ttls[cache_key[0]], value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, *resources: str):
+        """Drop every cached entry of the given resources"""
+        for resource in resources:
+            self._generations[resource] = self._generations.get(resource, 0) + 1
+        stale = [k for k in self._entries if k[0] in resources]
+        for cache_key in stale:
+            del self._entries[cache_key]
+        if stale:
+            self._invalidations += len(stale)
+            logger.debug(f"Invalidated {len(stale)} cached entries for {', '.join(resources)}")
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses + self._coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttls": self.ttls,
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "hit_ratio": round((self._hits + self._coalesced) / lookups, 4) if lookups else None,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations
+        }
+
+
+class _Validated:
+    __slots__ = ("etag", "last_modified", "digest", "body")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], digest: bytes, body: bytes):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.body = body
+
+
+class ValidatorStore:
+    """Byte-bounded LRU store of HTTP validators and response bodies per URL
+
+    Remembers the ETag/Last-Modified of each GET so the next request can be
+    sent conditionally and answered from the stored body on 304. Only the raw
+    bodies are kept, so `max_bytes` bounds the memory actually used; a 304 is
+    parsed again from the stored bytes.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _Validated]" = OrderedDict()
+        self._bytes = 0
+        self._conditional_requests = 0
+        self._not_modified = 0
+        self._digest_matches = 0
+        self._bytes_saved = 0
+        self._evictions = 0
+
+    @staticmethod
+    def digest(body: bytes) -> bytes:
+        return hashlib.blake2b(body, digest_size=16).digest()
+
+    def get(self, key: Hashable) -> Optional[_Validated]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def conditional_headers(self, entry: Optional[_Validated]) -> Dict[str, str]:
+        """Build If-None-Match/If-Modified-Since headers for a stored entry"""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+            if headers:
+                self._conditional_requests += 1
+        return headers
+
+    def not_modified(self, entry: _Validated):
+        self._not_modified += 1
+        self._bytes_saved += len(entry.body)
+
+    def digest_matched(self):
+        self._digest_matches += 1
+
+    def put(self, key: Hashable, etag: Optional[str], last_modified: Optional[str],
+            digest: bytes, body: bytes) -> Optional[_Validated]:
+        """Store a response body, evicting least recently used entries to fit"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.body)
+        if len(body) > self.max_bytes:
+            return None
+
+        entry = _Validated(etag, last_modified, digest, body)
+        self._entries[key] = entry
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+            self._evictions += 1
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "conditional_requests": self._conditional_requests,
+            "not_modified": self._not_modified,
+            "digest_matches": self._digest_matches,
+            "bytes_saved": self._bytes_saved,
+            "evictions": self._evictions
+        }
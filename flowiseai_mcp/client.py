@@ -2,29 +2,183 @@
 
 import os
 import json
+import time
 import asyncio
-from typing import Optional, List, Dict, Any, AsyncGenerator, Union
+import functools
+import importlib.util
+from typing import Optional, List, Dict, Any, AsyncGenerator, Union, Callable, Tuple, Iterable
 from urllib.parse import urlparse, urljoin
 import httpx
 from .models import *
+from .cache import ResponseCache, ValidatorStore
+from .sse import SSEDecoder, SSEEvent, FlowiseEvent, StreamTimer
+from .resilience import Resilience, RetryPolicy, CircuitOpenError, RETRYABLE_STATUSES, parse_retry_after
+from .batching import batch_documents, batch_texts, documents_body
+from .serialization import dumps_plain, list_adapter
+from .dedup import DedupIndex, DedupRun, content_key, vector_target
+from .embeddings import EMBEDDING_ENCODINGS
+from .projection import projection
+from .evaluation import TIMEOUT_ERROR
+from .metrics import UPSTREAM_IN_FLIGHT, observe_request, payload_size, route
+from .tracing import start_span, TRACEPARENT_HEADER
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    if not value:
+        return default
+    if value.lower() in ("none", "off"):
+        return None
+    return float(value)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.lower() in ("true", "1", "yes")
+
+
+# Resources served through the response cache; chat messages, feedback, leads and
+# upsert history change with every conversation and are always fetched live
+CACHEABLE_RESOURCES = ("assistants", "chatflows", "tools", "variables", "document_stores", "document_chunks")
+
+
+@functools.lru_cache(maxsize=None)
+def _model_parser(model: type, many: bool = False) -> Callable[[Any], Any]:
+    """Return a stable parser so parsed results can be keyed and reused by parser
+    
+    Parsers also carry `from_json`, which validates a raw response body in one
+    pass; keys the model does not declare are never turned into Python objects.
+    """
+    if many:
+        parse = lambda data: [model(**item) for item in data]
+        parse.from_json = list_adapter(model).validate_json
+    else:
+        parse = lambda data: model(**data)
+        parse.from_json = model.model_validate_json
+    return parse
+
+
+def _parse_body(body: bytes, parse: Optional[Callable[[Any], Any]]) -> Any:
+    """Decode and parse a response body, validating straight from JSON when the parser can"""
+    if body and parse is not None and hasattr(parse, "from_json"):
+        return parse.from_json(body)
+    data = json.loads(body) if body else {}
+    return parse(data) if parse else data
+
+
 class FlowiseAIClient:
     """Async client for FlowiseAI API with complete endpoint coverage"""
     
-    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        write_timeout: Optional[float] = None,
+        pool_timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+        cache_enabled: Optional[bool] = None,
+        cache_ttls: Optional[Dict[str, float]] = None,
+        cache_max_entries: Optional[int] = None,
+        validator_cache_bytes: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_failure_threshold: Optional[int] = None,
+        circuit_reset_timeout: Optional[float] = None,
+        dedup_path: Optional[str] = None
+    ):
         self.base_url = self._normalize_url(base_url or os.getenv("FLOWISEAI_URL", "http://localhost:3000"))
         self.api_key = api_key or os.getenv("FLOWISEAI_API_KEY", "")
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}" if self.api_key else ""
         }
-        self.client = httpx.AsyncClient(timeout=60.0)
         
-    def _normalize_url(self, url: str) -> str:
+        # Connection pool configuration: explicit arguments win over environment variables
+        self.limits = httpx.Limits(
+            max_connections=max_connections or _env_int("FLOWISEAI_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=max_keepalive_connections or _env_int("FLOWISEAI_MAX_KEEPALIVE_CONNECTIONS", 20),
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else _env_float("FLOWISEAI_KEEPALIVE_EXPIRY", 5.0)
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout if connect_timeout is not None else _env_float("FLOWISEAI_CONNECT_TIMEOUT", 60.0),
+            read=read_timeout if read_timeout is not None else _env_float("FLOWISEAI_READ_TIMEOUT", 60.0),
+            write=write_timeout if write_timeout is not None else _env_float("FLOWISEAI_WRITE_TIMEOUT", 60.0),
+            pool=pool_timeout if pool_timeout is not None else _env_float("FLOWISEAI_POOL_TIMEOUT", 60.0)
+        )
+        self.http2 = http2 if http2 is not None else _env_bool("FLOWISEAI_HTTP2", False)
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1")
+            self.http2 = False
+        
+        self.client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+        
+        # Read-through cache for GET endpoints, invalidated by successful writes
+        self.cache: Optional[ResponseCache] = None
+        if cache_enabled if cache_enabled is not None else _env_bool("FLOWISEAI_CACHE_ENABLED", True):
+            default_ttl = _env_float("FLOWISEAI_CACHE_TTL", 30.0) or 0.0
+            ttls = {
+                resource: _env_float(f"FLOWISEAI_CACHE_TTL_{resource.upper()}", default_ttl) or 0.0
+                for resource in CACHEABLE_RESOURCES
+            }
+            ttls.update(cache_ttls or {})
+            self.cache = ResponseCache(
+                ttls,
+                max_entries=cache_max_entries or _env_int("FLOWISEAI_CACHE_MAX_ENTRIES", 256)
+            )
+        
+        # ETag/Last-Modified validators and bodies for conditional GETs
+        max_validator_bytes = validator_cache_bytes if validator_cache_bytes is not None else _env_int(
+            "FLOWISEAI_CONDITIONAL_CACHE_BYTES", 16 * 1024 * 1024
+        )
+        self.validators: Optional[ValidatorStore] = ValidatorStore(max_validator_bytes) if max_validator_bytes > 0 else None
+        
+        # Retries for transient failures and per-endpoint circuit breakers
+        self.resilience = Resilience(
+            retry_policy or RetryPolicy(
+                max_attempts=_env_int("FLOWISEAI_RETRY_MAX_ATTEMPTS", 3),
+                backoff_base=_env_float("FLOWISEAI_RETRY_BACKOFF_BASE", 0.25),
+                backoff_max=_env_float("FLOWISEAI_RETRY_BACKOFF_MAX", 5.0),
+                max_retry_after=_env_float("FLOWISEAI_RETRY_MAX_RETRY_AFTER", 30.0),
+                retry_post=_env_bool("FLOWISEAI_RETRY_POST", False)
+            ),
+            failure_threshold=circuit_failure_threshold if circuit_failure_threshold is not None else _env_int(
+                "FLOWISEAI_CIRCUIT_FAILURE_THRESHOLD", 5
+            ),
+            reset_timeout=circuit_reset_timeout if circuit_reset_timeout is not None else _env_float(
+                "FLOWISEAI_CIRCUIT_RESET_TIMEOUT", 30.0
+            )
+        )
+        
+        # Content-hash index used to skip texts that were already vector-upserted
+        dedup_path = dedup_path or os.getenv("FLOWISEAI_DEDUP_PATH")
+        self.dedup: Optional[DedupIndex] = DedupIndex(dedup_path) if dedup_path else None
+        
+        # "base64" sends each embedding as base64 float32, for backends that accept it
+        self.embedding_encoding = os.getenv("FLOWISEAI_EMBEDDING_ENCODING", "float").lower()
+        if self.embedding_encoding not in EMBEDDING_ENCODINGS:
+            raise ValueError(f"FLOWISEAI_EMBEDDING_ENCODING must be one of: {', '.join(EMBEDDING_ENCODINGS)}")
+        
+        # Pool occupancy counters maintained by _request/_stream_request
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._pool_timeouts = 0
+        
+    @staticmethod
+    def _normalize_url(url: str) -> str:
         """Normalize URL to handle localhost, network, and cloud deployments"""
         if not url.startswith(("http://", "https://")):
             url = f"http://{url}"
@@ -35,107 +189,412 @@ class FlowiseAIClient:
             url = urljoin(url, "api/v1")
         return url.rstrip("/")
     
-    async def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
-        """Make an async HTTP request"""
+    def _enter_request(self):
+        self._in_flight += 1
+        if self._in_flight > self._peak_in_flight:
+            self._peak_in_flight = self._in_flight
+    
+    def _exit_request(self):
+        self._in_flight -= 1
+    
+    async def _send(self, method: str, endpoint: str, url: str, headers: Dict[str, str],
+                    retry: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """Send a request through the endpoint's circuit breaker, retrying transient failures
+        
+        Idempotent methods are retried automatically; POST/PATCH only when the
+        caller opts in with `retry=True` (or FLOWISEAI_RETRY_POST is set).
+        Retry-After is honored for 429/503 responses.
+        """
+        policy = self.resilience.policy
+        can_retry = policy.allows(method, retry)
+        attempt = 1
+        while True:
+            breaker = self.resilience.check(endpoint)
+            retry_after = None
+            try:
+                response = await self.client.request(method, url, headers=headers, **kwargs)
+            except httpx.PoolTimeout:
+                # Local pool exhaustion says nothing about Flowise health
+                raise
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                error = e
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code not in RETRYABLE_STATUSES:
+                    return response
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                error = None
+            
+            delay = policy.delay(attempt, retry_after) if can_retry and attempt < policy.max_attempts else None
+            if delay is None:
+                if can_retry:
+                    self.resilience.exhausted += 1
+                if error is not None:
+                    raise error
+                return response
+            
+            self.resilience.record_retry(endpoint)
+            logger.debug(f"Retrying {method} {endpoint} in {delay:.2f}s (attempt {attempt + 1})")
+            if error is None:
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    async def _request(self, method: str, endpoint: str, parse: Optional[Callable[[Any], Any]] = None,
+                       retry: Optional[bool] = None, conditional: bool = True, **kwargs) -> Any:
+        """Make an async HTTP request, optionally parsing the decoded JSON body
+        
+        GETs are sent conditionally when validators for the URL are known, and a
+        304 or an unchanged body reuses the previously parsed result. Pass
+        `conditional=False` for one-off reads (e.g. pages) that should not be kept.
+        """
         url = f"{self.base_url}{endpoint}"
-        try:
-            response = await self.client.request(method, url, headers=self.headers, **kwargs)
-            response.raise_for_status()
-            return response.json() if response.content else {}
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
-            raise
-        except Exception as e:
-            logger.error(f"Request failed: {str(e)}")
-            raise
+        headers = self.headers
+        store_key = None
+        validated = None
+        if method == "GET" and conditional and self.validators is not None:
+            store_key = (url, tuple(sorted((kwargs.get("params") or {}).items())))
+            validated = self.validators.get(store_key)
+            conditional = self.validators.conditional_headers(validated)
+            if conditional:
+                headers = {**self.headers, **conditional}
+        
+        span = start_span(f"{method} /{route(endpoint)}", "CLIENT", {
+            "http.request.method": method,
+            "url.full": url,
+            "flowiseai.route": route(endpoint)
+        })
+        with span:
+            if span.traceparent:
+                headers = {**headers, TRACEPARENT_HEADER: span.traceparent}
+            self._enter_request()
+            UPSTREAM_IN_FLIGHT.inc()
+            started = time.perf_counter()
+            received = None
+            status = "error"
+            size = None
+            try:
+                response = await self._send(method, endpoint, url, headers, retry=retry, **kwargs)
+                received = time.perf_counter()
+                status = str(response.status_code)
+                size = len(response.content)
+                span.set_attribute("http.response.status_code", response.status_code)
+                span.set_attribute("http.response.body.size", size)
+                if response.status_code == 304 and validated is not None:
+                    self.validators.not_modified(validated)
+                    return _parse_body(validated.body, parse)
+                response.raise_for_status()
+                if store_key is not None:
+                    return self._store_validated(store_key, response, parse)
+                return _parse_body(response.content, parse)
+            except httpx.HTTPStatusError as e:
+                logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
+                raise
+            except httpx.PoolTimeout as e:
+                self._pool_timeouts += 1
+                logger.error(f"Timed out waiting for a pooled connection: {str(e)}")
+                raise
+            except Exception as e:
+                logger.error(f"Request failed: {str(e)}")
+                raise
+            finally:
+                self._exit_request()
+                UPSTREAM_IN_FLIGHT.dec()
+                finished = time.perf_counter()
+                # Everything after the response arrived is decoding and validating it
+                observe_request(
+                    method, endpoint, status,
+                    upstream=(received or finished) - started,
+                    validation=finished - received if received else 0.0,
+                    response_bytes=size
+                )
+    
+    def _store_validated(self, key, response: httpx.Response, parse: Optional[Callable[[Any], Any]]) -> Any:
+        """Remember a GET response body and its validators for the next request"""
+        body = response.content
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        digest = ValidatorStore.digest(body)
+        
+        previous = self.validators.get(key)
+        if previous is not None and previous.digest == digest:
+            # Same bytes without a 304: the backend could have answered conditionally
+            self.validators.digest_matched()
+        self.validators.put(key, etag, last_modified, digest, body)
+        return _parse_body(body, parse)
+    
+    async def _get(self, resource: str, endpoint: str, parse: Callable[[Any], Any],
+                   params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET and parse an endpoint, served from the response cache when cacheable"""
+        if self.cache is None or not self.cache.is_cacheable(resource):
+            return await self._request("GET", endpoint, parse=parse, params=params)
+        
+        async def load():
+            return await self._request("GET", endpoint, parse=parse, params=params)
+        
+        # Projections parse the same endpoint into different models, so the parser is part of the key
+        key = (endpoint, tuple(sorted(params.items())) if params else (), parse)
+        result = await self.cache.get_or_load(resource, key, load)
+        # Hand out a fresh list so callers cannot reorder the cached one
+        return list(result) if isinstance(result, list) else result
+    
+    def _invalidate(self, *resources: str):
+        if self.cache is not None:
+            self.cache.invalidate(*resources)
+    
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Report retry counts and circuit breaker states"""
+        return self.resilience.stats()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Report response cache and conditional request counters"""
+        stats = {"enabled": False} if self.cache is None else {"enabled": True, **self.cache.stats()}
+        stats["conditional"] = {"enabled": False} if self.validators is None else {
+            "enabled": True, **self.validators.stats()
+        }
+        stats["dedup"] = {"enabled": False} if self.dedup is None else {"enabled": True, **self.dedup.stats()}
+        return stats
     
-    async def _stream_request(self, method: str, endpoint: str, **kwargs) -> AsyncGenerator[str, None]:
-        """Make a streaming HTTP request for SSE responses"""
+    async def _stream_request(self, method: str, endpoint: str, timer: Optional[StreamTimer] = None,
+                              **kwargs) -> AsyncGenerator[SSEEvent, None]:
+        """Make a streaming HTTP request and decode its server-sent events"""
         url = f"{self.base_url}{endpoint}"
         headers = {**self.headers, "Accept": "text/event-stream"}
+        decoder = SSEDecoder()
+        
+        # Not made current: this generator yields into its consumer's context
+        span = start_span(f"{method} /{route(endpoint)}", "CLIENT", {
+            "http.request.method": method,
+            "url.full": url,
+            "flowiseai.route": route(endpoint),
+            "flowiseai.stream": True
+        }, current=False)
+        if span.traceparent:
+            headers[TRACEPARENT_HEADER] = span.traceparent
         
-        async with self.client.stream(method, url, headers=headers, **kwargs) as response:
-            response.raise_for_status()
-            async for line in response.aiter_lines():
-                if line.startswith("data: "):
-                    data = line[6:]
-                    if data != "[DONE]":
-                        yield data
+        self._enter_request()
+        UPSTREAM_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status = "error"
+        size = 0
+        with span:
+            try:
+                breaker = self.resilience.check(endpoint)
+                if timer:
+                    timer.start()
+                try:
+                    async with self.client.stream(method, url, headers=headers, **kwargs) as response:
+                        status = str(response.status_code)
+                        if timer:
+                            timer.headers()
+                        span.add_event("response_headers")
+                        span.set_attribute("http.response.status_code", response.status_code)
+                        if response.status_code >= 500:
+                            breaker.record_failure()
+                        else:
+                            breaker.record_success()
+                        response.raise_for_status()
+                        async for text in response.aiter_text():
+                            if not size and text:
+                                span.add_event("first_byte")
+                                span.set_attribute(
+                                    "flowiseai.time_to_first_byte_ms",
+                                    round((time.perf_counter() - started) * 1000, 3)
+                                )
+                            size += payload_size(text)
+                            if timer:
+                                timer.first_byte()
+                            for event in decoder.feed(text):
+                                yield event
+                        for event in decoder.flush():
+                            yield event
+                except httpx.PoolTimeout:
+                    raise
+                except httpx.TransportError:
+                    breaker.record_failure()
+                    raise
+                if timer:
+                    timer.end()
+            except httpx.PoolTimeout:
+                self._pool_timeouts += 1
+                raise
+            finally:
+                self._exit_request()
+                UPSTREAM_IN_FLIGHT.dec()
+                span.set_attribute("http.response.body.size", size)
+                # The whole stream counts as upstream time, including time spent by the consumer between chunks
+                observe_request(method, endpoint, status, upstream=time.perf_counter() - started, response_bytes=size)
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Report connection pool configuration and current occupancy"""
+        stats = {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "limits": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry
+            },
+            "timeouts": {
+                "connect": self.timeout.connect,
+                "read": self.timeout.read,
+                "write": self.timeout.write,
+                "pool": self.timeout.pool
+            },
+            "in_flight_requests": self._in_flight,
+            "peak_in_flight_requests": self._peak_in_flight,
+            "pool_timeouts": self._pool_timeouts
+        }
+        
+        # httpx does not expose pool internals publicly, so read them defensively
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        requests = getattr(pool, "_requests", None)
+        if connections is not None and requests is not None:
+            idle = sum(1 for connection in connections if connection.is_idle())
+            queued = sum(1 for request in requests if request.is_queued())
+            stats.update({
+                "connections": len(connections),
+                "active_connections": len(connections) - idle,
+                "idle_connections": idle,
+                "active_requests": len(requests) - queued,
+                "queued_requests": queued
+            })
+        return stats
     
     # === Assistants ===
     
     async def create_assistant(self, assistant: Assistant) -> Assistant:
-        data = await self._request("POST", "/assistants", json=assistant.model_dump(exclude_none=True))
-        return Assistant(**data)
+        result = await self._request("POST", "/assistants", json=assistant.model_dump(exclude_none=True),
+                                     parse=_model_parser(Assistant))
+        self._invalidate("assistants")
+        return result
     
-    async def list_assistants(self) -> List[Assistant]:
-        data = await self._request("GET", "/assistants")
-        return [Assistant(**item) for item in data]
+    async def list_assistants(self, fields: Optional[Iterable[str]] = None) -> List[Assistant]:
+        return await self._get("assistants", "/assistants", _model_parser(projection(Assistant, fields), many=True))
     
     async def get_assistant(self, assistant_id: str) -> Assistant:
-        data = await self._request("GET", f"/assistants/{assistant_id}")
-        return Assistant(**data)
+        return await self._get("assistants", f"/assistants/{assistant_id}", _model_parser(Assistant))
     
     async def update_assistant(self, assistant_id: str, assistant: Assistant) -> Assistant:
-        data = await self._request("PUT", f"/assistants/{assistant_id}", 
-                                  json=assistant.model_dump(exclude_none=True))
-        return Assistant(**data)
+        result = await self._request("PUT", f"/assistants/{assistant_id}", 
+                                  json=assistant.model_dump(exclude_none=True), parse=_model_parser(Assistant))
+        self._invalidate("assistants")
+        return result
     
     async def delete_assistant(self, assistant_id: str) -> bool:
         await self._request("DELETE", f"/assistants/{assistant_id}")
+        self._invalidate("assistants")
         return True
     
     # === Chatflows ===
     
-    async def list_chatflows(self) -> List[Chatflow]:
-        data = await self._request("GET", "/chatflows")
-        return [Chatflow(**item) for item in data]
+    async def list_chatflows(self, fields: Optional[Iterable[str]] = None) -> List[Chatflow]:
+        """List chatflows; `fields` (e.g. ["id", "name"]) validates only those fields and skips the rest"""
+        return await self._get("chatflows", "/chatflows", _model_parser(projection(Chatflow, fields), many=True))
     
     async def get_chatflow(self, chatflow_id: str) -> Chatflow:
-        data = await self._request("GET", f"/chatflows/{chatflow_id}")
-        return Chatflow(**data)
+        return await self._get("chatflows", f"/chatflows/{chatflow_id}", _model_parser(Chatflow))
     
     async def get_chatflow_by_apikey(self, apikey: str) -> Chatflow:
-        data = await self._request("GET", f"/chatflows/apikey/{apikey}")
-        return Chatflow(**data)
+        return await self._get("chatflows", f"/chatflows/apikey/{apikey}", _model_parser(Chatflow))
     
     async def create_chatflow(self, chatflow: Chatflow) -> Chatflow:
-        data = await self._request("POST", "/chatflows", json=chatflow.model_dump(exclude_none=True))
-        return Chatflow(**data)
+        result = await self._request("POST", "/chatflows", json=chatflow.model_dump(exclude_none=True),
+                                     parse=_model_parser(Chatflow))
+        self._invalidate("chatflows")
+        return result
     
     async def update_chatflow(self, chatflow_id: str, chatflow: Chatflow) -> Chatflow:
-        data = await self._request("PUT", f"/chatflows/{chatflow_id}", 
-                                  json=chatflow.model_dump(exclude_none=True))
-        return Chatflow(**data)
+        result = await self._request("PUT", f"/chatflows/{chatflow_id}", 
+                                  json=chatflow.model_dump(exclude_none=True), parse=_model_parser(Chatflow))
+        self._invalidate("chatflows")
+        return result
     
     async def delete_chatflow(self, chatflow_id: str) -> bool:
         await self._request("DELETE", f"/chatflows/{chatflow_id}")
+        self._invalidate("chatflows")
         return True
     
     # === Prediction ===
     
-    async def predict(self, chatflow_id: str, request: PredictionRequest) -> Union[PredictionResponse, AsyncGenerator[str, None]]:
+    async def predict(self, chatflow_id: str, request: PredictionRequest) -> Union[PredictionResponse, AsyncGenerator[FlowiseEvent, None]]:
         """Execute a prediction with support for streaming"""
         if request.streaming:
-            return self._stream_request("POST", f"/prediction/{chatflow_id}", 
-                                       json=request.model_dump(exclude_none=True))
+            return self.predict_streaming(chatflow_id, request)
         else:
-            data = await self._request("POST", f"/prediction/{chatflow_id}", 
-                                      json=request.model_dump(exclude_none=True))
-            return PredictionResponse(**data)
+            return await self._request("POST", f"/prediction/{chatflow_id}", 
+                                       json=request.model_dump(exclude_none=True),
+                                       parse=_model_parser(PredictionResponse))
+    
+    async def predict_batch(
+        self,
+        requests: Iterable[Tuple[str, PredictionRequest]],
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncGenerator[PredictionResult, None]:
+        """Run (chatflow_id, request) predictions concurrently, yielding results as they complete
+        
+        At most `concurrency` predictions are in flight and `requests` is consumed
+        lazily. Each prediction is non-streaming and bounded by `timeout` seconds;
+        failures and timeouts are yielded as unsuccessful results, not raised.
+        """
+        window = max(1, concurrency or _env_int("FLOWISEAI_PREDICTION_CONCURRENCY", 4))
+        timeout = timeout or _env_float("FLOWISEAI_PREDICTION_TIMEOUT", None)
+        items = enumerate(requests)
+        pending = set()
+        
+        def fill():
+            for index, (chatflow_id, request) in items:
+                pending.add(asyncio.create_task(self._predict_one(index, chatflow_id, request, timeout)))
+                if len(pending) >= window:
+                    return
+        
+        try:
+            fill()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                fill()
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def _predict_one(self, index: int, chatflow_id: str, request: PredictionRequest,
+                           timeout: Optional[float]) -> PredictionResult:
+        request = request.model_copy(update={"streaming": False})
+        start = time.monotonic()
+        try:
+            response = await asyncio.wait_for(self.predict(chatflow_id, request), timeout)
+            return PredictionResult(index=index, chatflow_id=chatflow_id, question=request.question,
+                                    elapsed_seconds=round(time.monotonic() - start, 4), response=response)
+        except asyncio.TimeoutError:
+            error = TIMEOUT_ERROR
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        return PredictionResult(index=index, chatflow_id=chatflow_id, question=request.question, success=False,
+                                elapsed_seconds=round(time.monotonic() - start, 4), error=error)
     
-    async def predict_streaming(self, chatflow_id: str, request: PredictionRequest) -> AsyncGenerator[str, None]:
-        """Execute a streaming prediction"""
+    async def predict_streaming(self, chatflow_id: str, request: PredictionRequest,
+                                timer: Optional[StreamTimer] = None) -> AsyncGenerator[FlowiseEvent, None]:
+        """Execute a streaming prediction, yielding typed Flowise events as they arrive"""
         request.streaming = True
-        async for chunk in self._stream_request("POST", f"/prediction/{chatflow_id}", 
-                                               json=request.model_dump(exclude_none=True)):
-            yield chunk
+        async for event in self._stream_request("POST", f"/prediction/{chatflow_id}", timer=timer,
+                                                json=request.model_dump(exclude_none=True)):
+            yield FlowiseEvent.from_sse(event)
     
     # === Chat Messages ===
     
-    async def list_chat_messages(
-        self,
-        chatflow_id: str,
+    @staticmethod
+    def _chat_message_params(
         chat_type: Optional[ChatType] = None,
         order: Optional[str] = "DESC",
         chat_id: Optional[str] = None,
@@ -146,8 +605,8 @@ class FlowiseAIClient:
         feedback: Optional[bool] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = None
-    ) -> List[ChatMessage]:
-        params = {
+    ) -> Dict[str, Any]:
+        return {
             k: v for k, v in {
                 "chatType": chat_type.value if chat_type else None,
                 "order": order,
@@ -161,8 +620,108 @@ class FlowiseAIClient:
                 "offset": offset
             }.items() if v is not None
         }
-        data = await self._request("GET", f"/chatmessages/{chatflow_id}", params=params)
-        return [ChatMessage(**item) for item in data]
+    
+    async def list_chat_messages(
+        self,
+        chatflow_id: str,
+        chat_type: Optional[ChatType] = None,
+        order: Optional[str] = "DESC",
+        chat_id: Optional[str] = None,
+        memory_type: Optional[MemoryType] = None,
+        session_id: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        feedback: Optional[bool] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> List[ChatMessage]:
+        params = self._chat_message_params(
+            chat_type, order, chat_id, memory_type, session_id, start_date, end_date, feedback, limit, offset
+        )
+        return await self._request("GET", f"/chatmessages/{chatflow_id}",
+                                   parse=_model_parser(projection(ChatMessage, fields), many=True), params=params)
+    
+    async def get_chat_message_page(
+        self,
+        chatflow_id: str,
+        page_size: int = 50,
+        offset: int = 0,
+        fields: Optional[Iterable[str]] = None,
+        previous_first_id: Optional[str] = None,
+        **filters
+    ) -> Tuple[List[ChatMessage], bool]:
+        """Fetch one page of chat messages and whether more follow
+        
+        One extra message is requested to detect a following page without a
+        second round trip. `filters` are the keyword filters of list_chat_messages.
+        A backend that ignores limit/offset returns everything; the page is then
+        cut locally, and a page starting with `previous_first_id` (the first
+        message of the page before) ends the listing instead of repeating it.
+        """
+        params = self._chat_message_params(**filters, limit=page_size + 1, offset=offset)
+        messages = await self._request("GET", f"/chatmessages/{chatflow_id}", conditional=False,
+                                       parse=_model_parser(projection(ChatMessage, fields), many=True), params=params)
+        if len(messages) > page_size + 1:
+            logger.warning(f"Chat messages of {chatflow_id} are not paginated by the server; paging locally")
+            messages = messages[offset:offset + page_size + 1]
+        if previous_first_id is not None and messages and getattr(messages[0], "id", None) == previous_first_id:
+            logger.warning(f"Chat messages of {chatflow_id} ignored the offset; ending the listing")
+            return [], False
+        return messages[:page_size], len(messages) > page_size
+    
+    async def iter_chat_messages(
+        self,
+        chatflow_id: str,
+        page_size: int = 100,
+        offset: int = 0,
+        prefetch: bool = True,
+        fields: Optional[Iterable[str]] = None,
+        **filters
+    ) -> AsyncGenerator[ChatMessage, None]:
+        """Yield chat messages lazily, walking limit/offset pages
+        
+        Only the current page (plus the prefetched next one) is held in memory.
+        Paging stops at the first short page. A backend that ignores `limit`
+        and `offset` returns everything on every page, so paging also stops
+        after a page longer than asked for, or at a page starting with the same
+        message as the page before.
+        """
+        endpoint = f"/chatmessages/{chatflow_id}"
+        parse = _model_parser(projection(ChatMessage, fields), many=True)
+        
+        async def fetch(page_offset: int) -> List[ChatMessage]:
+            params = self._chat_message_params(**filters, limit=page_size, offset=page_offset)
+            return await self._request("GET", endpoint, parse=parse, conditional=False, params=params)
+        
+        pending: Optional[asyncio.Task] = None
+        previous_first_id = None
+        try:
+            page = await fetch(offset)
+            while True:
+                first_id = getattr(page[0], "id", None) if page else None
+                if first_id is not None and first_id == previous_first_id:
+                    logger.warning(f"Chat messages of {chatflow_id} ignored the offset; ending the listing")
+                    return
+                previous_first_id = first_id
+                has_more = len(page) == page_size
+                if has_more and prefetch:
+                    pending = asyncio.create_task(fetch(offset + page_size))
+                for message in page:
+                    yield message
+                if not has_more:
+                    return
+                offset += page_size
+                page = await pending if pending is not None else await fetch(offset)
+                pending = None
+        finally:
+            if pending is not None:
+                # The consumer stopped early; drop the prefetched page
+                pending.cancel()
+                try:
+                    await pending
+                except (asyncio.CancelledError, Exception):
+                    pass
     
     async def delete_chat_messages(self, chatflow_id: str) -> bool:
         await self._request("DELETE", f"/chatmessages/{chatflow_id}")
@@ -177,131 +736,342 @@ class FlowiseAIClient:
         attachments: List[Dict[str, Any]],
         return_base64: bool = False
     ) -> List[Attachment]:
-        data = await self._request(
+        return await self._request(
             "POST",
             f"/attachments/{chatflow_id}/{chat_id}",
+            parse=_model_parser(Attachment, many=True),
             json={"attachments": attachments, "returnBase64": return_base64}
         )
-        return [Attachment(**item) for item in data]
     
     # === Feedback ===
     
-    async def list_feedback(self, chatflow_id: str) -> List[Feedback]:
-        data = await self._request("GET", f"/feedback/{chatflow_id}")
-        return [Feedback(**item) for item in data]
+    async def list_feedback(self, chatflow_id: str, fields: Optional[Iterable[str]] = None) -> List[Feedback]:
+        return await self._request("GET", f"/feedback/{chatflow_id}",
+                                   parse=_model_parser(projection(Feedback, fields), many=True))
     
     async def create_feedback(self, feedback: Feedback) -> Feedback:
-        data = await self._request("POST", "/feedback", json=feedback.model_dump(exclude_none=True))
-        return Feedback(**data)
+        return await self._request("POST", "/feedback", json=feedback.model_dump(exclude_none=True),
+                                   parse=_model_parser(Feedback))
     
     async def update_feedback(self, feedback_id: str, feedback: Feedback) -> Feedback:
-        data = await self._request("PUT", f"/feedback/{feedback_id}", 
-                                  json=feedback.model_dump(exclude_none=True))
-        return Feedback(**data)
+        return await self._request("PUT", f"/feedback/{feedback_id}", 
+                                  json=feedback.model_dump(exclude_none=True), parse=_model_parser(Feedback))
     
     # === Leads ===
     
-    async def list_leads(self, chatflow_id: str) -> List[Lead]:
-        data = await self._request("GET", f"/leads/{chatflow_id}")
-        return [Lead(**item) for item in data]
+    async def list_leads(self, chatflow_id: str, fields: Optional[Iterable[str]] = None) -> List[Lead]:
+        return await self._request("GET", f"/leads/{chatflow_id}",
+                                   parse=_model_parser(projection(Lead, fields), many=True))
     
     async def create_lead(self, lead: Lead) -> Lead:
-        data = await self._request("POST", "/leads", json=lead.model_dump(exclude_none=True))
-        return Lead(**data)
+        return await self._request("POST", "/leads", json=lead.model_dump(exclude_none=True),
+                                   parse=_model_parser(Lead))
     
     # === Tools ===
     
     async def create_tool(self, tool: Tool) -> Tool:
-        data = await self._request("POST", "/tools", json=tool.model_dump(exclude_none=True))
-        return Tool(**data)
+        result = await self._request("POST", "/tools", json=tool.model_dump(exclude_none=True),
+                                     parse=_model_parser(Tool))
+        self._invalidate("tools")
+        return result
     
-    async def list_tools(self) -> List[Tool]:
-        data = await self._request("GET", "/tools")
-        return [Tool(**item) for item in data]
+    async def list_tools(self, fields: Optional[Iterable[str]] = None) -> List[Tool]:
+        return await self._get("tools", "/tools", _model_parser(projection(Tool, fields), many=True))
     
     async def get_tool(self, tool_id: str) -> Tool:
-        data = await self._request("GET", f"/tools/{tool_id}")
-        return Tool(**data)
+        return await self._get("tools", f"/tools/{tool_id}", _model_parser(Tool))
     
     async def update_tool(self, tool_id: str, tool: Tool) -> Tool:
-        data = await self._request("PUT", f"/tools/{tool_id}", 
-                                  json=tool.model_dump(exclude_none=True))
-        return Tool(**data)
+        result = await self._request("PUT", f"/tools/{tool_id}", 
+                                  json=tool.model_dump(exclude_none=True), parse=_model_parser(Tool))
+        self._invalidate("tools")
+        return result
     
     async def delete_tool(self, tool_id: str) -> bool:
         await self._request("DELETE", f"/tools/{tool_id}")
+        self._invalidate("tools")
         return True
     
     # === Variables ===
     
     async def create_variable(self, variable: Variable) -> Variable:
-        data = await self._request("POST", "/variables", json=variable.model_dump(exclude_none=True))
-        return Variable(**data)
+        result = await self._request("POST", "/variables", json=variable.model_dump(exclude_none=True),
+                                     parse=_model_parser(Variable))
+        self._invalidate("variables")
+        return result
     
-    async def list_variables(self) -> List[Variable]:
-        data = await self._request("GET", "/variables")
-        return [Variable(**item) for item in data]
+    async def list_variables(self, fields: Optional[Iterable[str]] = None) -> List[Variable]:
+        return await self._get("variables", "/variables", _model_parser(projection(Variable, fields), many=True))
     
     async def update_variable(self, variable_id: str, variable: Variable) -> Variable:
-        data = await self._request("PUT", f"/variables/{variable_id}", 
-                                  json=variable.model_dump(exclude_none=True))
-        return Variable(**data)
+        result = await self._request("PUT", f"/variables/{variable_id}", 
+                                  json=variable.model_dump(exclude_none=True), parse=_model_parser(Variable))
+        self._invalidate("variables")
+        return result
     
     async def delete_variable(self, variable_id: str) -> bool:
         await self._request("DELETE", f"/variables/{variable_id}")
+        self._invalidate("variables")
         return True
     
     # === Document Store ===
     
-    async def list_document_stores(self) -> List[DocumentStore]:
-        data = await self._request("GET", "/document-store")
-        return [DocumentStore(**item) for item in data]
+    async def list_document_stores(self, fields: Optional[Iterable[str]] = None) -> List[DocumentStore]:
+        return await self._get("document_stores", "/document-store",
+                               _model_parser(projection(DocumentStore, fields), many=True))
     
     async def get_document_store(self, store_id: str) -> DocumentStore:
-        data = await self._request("GET", f"/document-store/{store_id}")
-        return DocumentStore(**data)
+        return await self._get("document_stores", f"/document-store/{store_id}", _model_parser(DocumentStore))
     
     async def create_document_store(self, store: DocumentStore) -> DocumentStore:
-        data = await self._request("POST", "/document-store", json=store.model_dump(exclude_none=True))
-        return DocumentStore(**data)
+        result = await self._request("POST", "/document-store", json=store.model_dump(exclude_none=True),
+                                     parse=_model_parser(DocumentStore))
+        self._invalidate("document_stores")
+        return result
     
     async def update_document_store(self, store_id: str, store: DocumentStore) -> DocumentStore:
-        data = await self._request("PUT", f"/document-store/{store_id}", 
-                                  json=store.model_dump(exclude_none=True))
-        return DocumentStore(**data)
+        result = await self._request("PUT", f"/document-store/{store_id}", 
+                                  json=store.model_dump(exclude_none=True), parse=_model_parser(DocumentStore))
+        self._invalidate("document_stores")
+        return result
     
     async def delete_document_store(self, store_id: str) -> bool:
         await self._request("DELETE", f"/document-store/{store_id}")
+        self._invalidate("document_stores", "document_chunks")
         return True
     
     async def upsert_document(self, store_id: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
-        return await self._request("POST", f"/document-store/upsert/{store_id}", json={"documents": documents})
+        result = await self._request("POST", f"/document-store/upsert/{store_id}", json={"documents": documents})
+        self._invalidate("document_stores", "document_chunks")
+        return result
+    
+    async def upsert_documents_batched(
+        self,
+        store_id: str,
+        documents: Iterable[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None
+    ) -> AsyncGenerator[UpsertBatchResult, None]:
+        """Upsert documents in size-bounded batches, yielding each batch's result as it completes
+        
+        `documents` may be any iterable (including a generator); it is consumed
+        lazily so at most `concurrency` batches are held in memory. Failed
+        batches are retried on their own and reported with `success=False`
+        instead of aborting the remaining batches.
+        """
+        bodies = (
+            (documents_body(encoded), len(encoded))
+            for encoded, _ in batch_documents(
+                documents,
+                max_count=batch_size or _env_int("FLOWISEAI_UPSERT_BATCH_SIZE", 100),
+                max_bytes=max_batch_bytes or _env_int("FLOWISEAI_UPSERT_BATCH_BYTES", 4 * 1024 * 1024)
+            )
+        )
+        try:
+            async for result in self._send_batches(
+                f"/document-store/upsert/{store_id}", bodies,
+                concurrency or _env_int("FLOWISEAI_UPSERT_CONCURRENCY", 4), max_attempts
+            ):
+                yield result
+        finally:
+            self._invalidate("document_stores", "document_chunks")
+    
+    async def vector_upsert_batched(
+        self,
+        chatflow_id: str,
+        documents: Iterable[Dict[str, Any]],
+        request: Optional[VectorUpsertRequest] = None,
+        batch_size: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None,
+        concurrency: int = 1,
+        max_attempts: Optional[int] = None,
+        dedup: Optional[DedupRun] = None
+    ) -> AsyncGenerator[UpsertBatchResult, None]:
+        """Vector-upsert `{"pageContent", "metadata"}` documents as texts/metadata batches
+        
+        Fields of `request` other than texts/metadata (e.g. stopNodeId,
+        overrideConfig) are sent with every batch. Batches run one at a time
+        by default since vector stores differ in how they handle parallel writes.
+        With `dedup`, documents already upserted are skipped and each accepted
+        batch is recorded in the index.
+        """
+        template = request.model_dump(exclude_none=True, exclude={"texts", "metadata", "documents"}) if request else {}
+        if dedup is not None:
+            documents = dedup.filter(documents)
+        # Texts and metadata of batches in flight, by the batch index _send_batches assigns
+        sent: Dict[int, Tuple[List[str], List[Dict[str, Any]]]] = {}
+        
+        def bodies():
+            for index, batch in enumerate(batch_texts(
+                documents,
+                max_count=batch_size or _env_int("FLOWISEAI_UPSERT_BATCH_SIZE", 100),
+                max_bytes=max_batch_bytes or _env_int("FLOWISEAI_UPSERT_BATCH_BYTES", 4 * 1024 * 1024)
+            )):
+                body = {
+                    **template,
+                    "texts": [document.get("pageContent", "") for document in batch],
+                    "metadata": [document.get("metadata") or {} for document in batch]
+                }
+                if dedup is not None:
+                    sent[index] = (body["texts"], [document.get("metadata") for document in batch])
+                yield dumps_plain(body).encode("utf-8"), len(batch)
+        
+        async for result in self._send_batches(f"/vector/upsert/{chatflow_id}", bodies(), concurrency, max_attempts):
+            if dedup is not None:
+                texts, metadata = sent.pop(result.batch)
+                if result.success:
+                    await asyncio.to_thread(dedup.commit, texts, metadata)
+            yield result
+    
+    async def _send_batches(
+        self,
+        endpoint: str,
+        bodies: Iterable[Tuple[bytes, int]],
+        concurrency: int,
+        max_attempts: Optional[int] = None
+    ) -> AsyncGenerator[UpsertBatchResult, None]:
+        """POST (body, item count) pairs with a sliding concurrency window, yielding results as they finish
+        
+        Bodies are built in a worker thread, one at a time: producing them can
+        mean reading and chunking local files or querying the dedup index,
+        which would otherwise stall every other call on the event loop.
+        """
+        batches = iter(enumerate(bodies))
+        window = max(1, concurrency)
+        attempts = max(1, max_attempts or _env_int("FLOWISEAI_UPSERT_BATCH_ATTEMPTS", 3))
+        pending = set()
+        exhausted = False
+        
+        async def fill():
+            nonlocal exhausted
+            while not exhausted and len(pending) < window:
+                item = await asyncio.to_thread(next, batches, None)
+                if item is None:
+                    exhausted = True
+                    return
+                index, (body, count) = item
+                pending.add(asyncio.create_task(self._send_batch(endpoint, index, body, count, attempts)))
+        
+        try:
+            await fill()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                await fill()
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def _send_batch(self, endpoint: str, index: int, body: bytes, count: int,
+                          max_attempts: int) -> UpsertBatchResult:
+        """Send one batch, retrying connection errors, 5xx, 408 and 429"""
+        start = time.monotonic()
+        attempt = 1
+        while True:
+            retry_after = None
+            try:
+                result = await self._request("POST", endpoint, retry=False, content=body)
+                return UpsertBatchResult(batch=index, documents=count, bytes=len(body), attempts=attempt,
+                                         elapsed_seconds=round(time.monotonic() - start, 3), result=result)
+            except CircuitOpenError as e:
+                error, retryable = e, False
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                error, retryable = e, status >= 500 or status in RETRYABLE_STATUSES
+                retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+            except httpx.TransportError as e:
+                error, retryable = e, True
+            
+            delay = self.resilience.policy.delay(attempt, retry_after) if retryable and attempt < max_attempts else None
+            if delay is None:
+                return UpsertBatchResult(batch=index, documents=count, bytes=len(body), attempts=attempt,
+                                         success=False, elapsed_seconds=round(time.monotonic() - start, 3),
+                                         error=str(error))
+            logger.debug(f"Retrying batch {index} to {endpoint} in {delay:.2f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+            attempt += 1
     
     async def refresh_document_store(self, store_id: str) -> Dict[str, Any]:
-        return await self._request("POST", f"/document-store/refresh/{store_id}")
+        result = await self._request("POST", f"/document-store/refresh/{store_id}")
+        self._invalidate("document_stores", "document_chunks")
+        return result
     
     async def get_document_chunks(self, store_id: str, loader_id: str) -> List[DocumentChunk]:
-        data = await self._request("GET", f"/document-store/{store_id}/chunks/{loader_id}")
-        return [DocumentChunk(**item) for item in data]
+        return await self._get("document_chunks", f"/document-store/{store_id}/chunks/{loader_id}",
+                               _model_parser(DocumentChunk, many=True))
     
     async def update_document_chunk(self, store_id: str, chunk_id: str, chunk: DocumentChunk) -> DocumentChunk:
-        data = await self._request("PUT", f"/document-store/{store_id}/chunks/{chunk_id}", 
-                                  json=chunk.model_dump(exclude_none=True))
-        return DocumentChunk(**data)
+        result = await self._request("PUT", f"/document-store/{store_id}/chunks/{chunk_id}", 
+                                  json=chunk.model_dump(exclude_none=True), parse=_model_parser(DocumentChunk))
+        self._invalidate("document_chunks")
+        return result
     
     async def delete_document_chunk(self, store_id: str, chunk_id: str) -> bool:
         await self._request("DELETE", f"/document-store/{store_id}/chunks/{chunk_id}")
+        self._invalidate("document_chunks")
         return True
     
     async def delete_document_loader(self, store_id: str, loader_id: str) -> bool:
         await self._request("DELETE", f"/document-store/{store_id}/loaders/{loader_id}")
+        self._invalidate("document_stores", "document_chunks")
         return True
     
     # === Vector Upsert ===
     
-    async def vector_upsert(self, chatflow_id: str, request: VectorUpsertRequest) -> Dict[str, Any]:
-        return await self._request("POST", f"/vector/upsert/{chatflow_id}", 
-                                  json=request.model_dump(exclude_none=True))
+    def _vector_upsert_body(self, request: VectorUpsertRequest) -> bytes:
+        """Encode a vector upsert request, writing embeddings straight from their array"""
+        body = dumps_plain(request.model_dump(exclude_none=True, exclude={"embeddings"}))
+        if request.embeddings is None:
+            return body.encode("utf-8")
+        separator = "," if body != "{}" else ""
+        embeddings = request.embeddings.to_json(self.embedding_encoding)
+        return f'{body[:-1]}{separator}"embeddings":{embeddings}}}'.encode("utf-8")
+    
+    async def vector_upsert(self, chatflow_id: str, request: VectorUpsertRequest,
+                            dedup: Optional[bool] = None) -> Dict[str, Any]:
+        """Upsert to a chatflow's vector store
+        
+        With a dedup index configured (and `dedup` not False), texts already
+        upserted to this chatflow/stop node with the same metadata are dropped
+        from the request, and the result carries a "dedup" report.
+        """
+        if self.dedup is None or dedup is False or not request.texts:
+            return await self._request("POST", f"/vector/upsert/{chatflow_id}",
+                                       content=self._vector_upsert_body(request))
+        
+        texts = request.texts
+        metadata = [request.metadata[i] if request.metadata and i < len(request.metadata) else None
+                    for i in range(len(texts))]
+        embeddings = request.embeddings
+        vector_bytes = embeddings.nbytes // len(embeddings) if embeddings else 0
+        sizes = [
+            len(text.encode("utf-8")) + (vector_bytes if embeddings and i < len(embeddings) else 0)
+            for i, text in enumerate(texts)
+        ]
+        run = DedupRun(self.dedup, vector_target(self.base_url, chatflow_id, request.stopNodeId))
+        # Hashing and the index lookup stay off the event loop
+        keep = await asyncio.to_thread(
+            lambda: run.split([content_key(text, metadata[i]) for i, text in enumerate(texts)], sizes)
+        )
+        if not keep:
+            return {"dedup": run.report().model_dump()}
+        
+        delta = request.model_copy(update={
+            "texts": [texts[i] for i in keep],
+            "metadata": [metadata[i] for i in keep] if request.metadata else None,
+            "embeddings": embeddings.take(i for i in keep if i < len(embeddings)) if embeddings else None
+        })
+        result = await self._request("POST", f"/vector/upsert/{chatflow_id}", content=self._vector_upsert_body(delta))
+        await asyncio.to_thread(run.commit, delta.texts, [metadata[i] for i in keep])
+        result = dict(result) if isinstance(result, dict) else {"result": result}
+        result["dedup"] = run.report().model_dump()
+        return result
     
     # === Upsert History ===
     
@@ -310,7 +1080,8 @@ class FlowiseAIClient:
         chatflow_id: str,
         order: Optional[str] = "DESC",
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None
     ) -> List[UpsertHistory]:
         params = {
             k: v for k, v in {
@@ -319,8 +1090,8 @@ class FlowiseAIClient:
                 "endDate": end_date
             }.items() if v is not None
         }
-        data = await self._request("GET", f"/upsert-history/{chatflow_id}", params=params)
-        return [UpsertHistory(**item) for item in data]
+        return await self._request("GET", f"/upsert-history/{chatflow_id}",
+                                   parse=_model_parser(projection(UpsertHistory, fields), many=True), params=params)
     
     async def delete_upsert_history(self, history_id: str) -> bool:
         await self._request("PATCH", f"/upsert-history/{history_id}")
@@ -335,4 +1106,6 @@ class FlowiseAIClient:
     
     async def close(self):
         """Close the HTTP client"""
-        await self.client.aclose()
\ No newline at end of file
+        await self.client.aclose()
+        if self.dedup is not None:
+            self.dedup.close()
\ No newline at end of file
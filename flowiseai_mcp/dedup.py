@@ -0,0 +1,163 @@
+"""Content-hash deduplication in front of vector upserts
+
+A small SQLite index remembers which texts (with their metadata) were already
+upserted to which target, so re-running a pipeline only sends what changed.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Set
+
+from .models import DedupReport
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+def content_key(text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Stable hash of a text and its metadata"""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=20)
+    if metadata:
+        digest.update(b"\0")
+        digest.update(json.dumps(metadata, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def vector_target(base_url: str, chatflow_id: str, stop_node_id: Optional[str] = None) -> str:
+    """Index target of a chatflow's vector store; the Flowise URL keeps instances sharing chatflow ids apart"""
+    target = f"{base_url}#chatflow:{chatflow_id}"
+    return f"{target}/{stop_node_id}" if stop_node_id else target
+
+
+class DedupIndex:
+    """SQLite-backed set of (content hash, target) pairs that were upserted successfully
+
+    Batched upserts query it from a worker thread, so the connection is shared
+    across threads and every use holds a lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS upserted ("
+            " hash TEXT NOT NULL, target TEXT NOT NULL, bytes INTEGER NOT NULL,"
+            " first_seen REAL NOT NULL, last_seen REAL NOT NULL,"
+            " PRIMARY KEY (hash, target)) WITHOUT ROWID"
+        )
+        self._db.commit()
+        self._skipped = 0
+        self._bytes_skipped = 0
+
+    def seen(self, target: str, keys: List[str]) -> Set[str]:
+        """Return the subset of keys already upserted to the target"""
+        found: Set[str] = set()
+        with self._lock:
+            for i in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[i:i + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT hash FROM upserted WHERE target = ? AND hash IN ({placeholders})", (target, *chunk)
+                )
+                found.update(row[0] for row in rows)
+        return found
+
+    def record(self, target: str, entries: Iterable[tuple]):
+        """Remember (key, bytes) pairs as upserted to the target"""
+        now = time.time()
+        rows = [(key, target, size, now, now) for key, size in entries]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO upserted (hash, target, bytes, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (hash, target) DO UPDATE SET last_seen = excluded.last_seen",
+                rows
+            )
+            self._db.commit()
+
+    def forget(self, target: str) -> int:
+        """Drop every hash recorded for a target, e.g. after its vector store was cleared"""
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM upserted WHERE target = ?", (target,))
+            self._db.commit()
+        return cursor.rowcount
+
+    def count_skipped(self, items: int, size: int):
+        with self._lock:
+            self._skipped += items
+            self._bytes_skipped += size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, targets = self._db.execute("SELECT COUNT(*), COUNT(DISTINCT target) FROM upserted").fetchone()
+        return {
+            "path": self.path,
+            "entries": entries,
+            "targets": targets,
+            "skipped": self._skipped,
+            "bytes_skipped": self._bytes_skipped
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class DedupRun:
+    """Deduplication of one upsert against an index, with its own counters"""
+
+    def __init__(self, index: DedupIndex, target: str):
+        self.index = index
+        self.target = target
+        self.items = 0
+        self.skipped = 0
+        self.bytes_sent = 0
+        self.bytes_skipped = 0
+
+    def split(self, keys: List[str], sizes: List[int]) -> List[int]:
+        """Return the positions of items not yet upserted, counting the rest as skipped"""
+        seen = self.index.seen(self.target, keys)
+        keep = []
+        skipped_bytes = 0
+        for position, key in enumerate(keys):
+            if key in seen:
+                skipped_bytes += sizes[position]
+            else:
+                keep.append(position)
+                self.bytes_sent += sizes[position]
+        self.items += len(keys)
+        self.skipped += len(keys) - len(keep)
+        self.bytes_skipped += skipped_bytes
+        self.index.count_skipped(len(keys) - len(keep), skipped_bytes)
+        return keep
+
+    def filter(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield only `{"pageContent", "metadata"}` documents not yet upserted"""
+        for document in documents:
+            text = document.get("pageContent", "")
+            key = content_key(text, document.get("metadata"))
+            if self.split([key], [len(text.encode("utf-8"))]):
+                yield document
+
+    def commit(self, texts: List[str], metadata: List[Optional[Dict[str, Any]]]):
+        """Record texts as upserted once the backend accepted them"""
+        self.index.record(self.target, (
+            (content_key(text, meta), len(text.encode("utf-8"))) for text, meta in zip(texts, metadata)
+        ))
+
+    def report(self) -> DedupReport:
+        return DedupReport(
+            items=self.items,
+            sent=self.items - self.skipped,
+            skipped=self.skipped,
+            bytes_sent=self.bytes_sent,
+            bytes_skipped=self.bytes_skipped
+        )
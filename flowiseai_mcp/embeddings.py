@@ -0,0 +1,188 @@
+"""Compact, array-backed embedding matrices
+
+`EmbeddingMatrix` keeps vectors in one contiguous `array.array` (float32 or
+float64) instead of lists of boxed Python floats. It accepts NumPy arrays,
+`array('f')`/`array('d')` rows, raw float32 buffers and base64 float32 strings
+without per-element pydantic validation, and writes itself to JSON in a single
+pass (through NumPy and orjson when both are installed).
+"""
+
+import base64
+import sys
+from array import array
+from typing import Any, List, Iterable, Iterator, Optional, Union
+
+from pydantic_core import core_schema
+
+from .serialization import dumps_plain, orjson
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Encodings understood by EmbeddingMatrix.to_json
+EMBEDDING_ENCODINGS = ("float", "base64")
+
+_BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+
+def _float32_buffer(value: Union[bytes, bytearray, memoryview, str]) -> array:
+    """Little-endian float32 vector from raw bytes or their base64 encoding"""
+    raw = base64.b64decode(value, validate=True) if isinstance(value, str) else bytes(value)
+    if len(raw) % 4:
+        raise ValueError(f"float32 buffer length must be a multiple of 4, got {len(raw)}")
+    row = array("f")
+    row.frombytes(raw)
+    if sys.byteorder == "big":
+        row.byteswap()
+    return row
+
+
+def _numpy_row(row: Any) -> array:
+    """Typed array copy of a 1-D NumPy vector, keeping float32 as float32"""
+    typecode = "f" if row.dtype == numpy.float32 else "d"
+    values = array(typecode)
+    values.frombytes(numpy.ascontiguousarray(row, dtype=numpy.float32 if typecode == "f" else numpy.float64).tobytes())
+    return values
+
+
+class EmbeddingMatrix:
+    """A rows x dim matrix of floats stored in one flat typed array"""
+
+    __slots__ = ("data", "dim")
+
+    def __init__(self, data: array, dim: int):
+        if dim and len(data) % dim:
+            raise ValueError(f"{len(data)} values do not divide into rows of {dim}")
+        self.data = data
+        self.dim = dim
+
+    @classmethod
+    def from_buffer(cls, buffer: Union[bytes, bytearray, memoryview], dim: int) -> "EmbeddingMatrix":
+        """Wrap a flat little-endian float32 buffer holding rows of `dim` values"""
+        return cls(_float32_buffer(buffer), dim)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any]) -> "EmbeddingMatrix":
+        """Build from rows of floats, typed arrays, float32 buffers or base64 float32 strings
+
+        Rows already in float32 form keep that precision; anything else is
+        stored as float64 so list input round-trips unchanged.
+        """
+        data: Optional[array] = None
+        dim = None
+        for index, row in enumerate(rows):
+            if isinstance(row, (str, *_BUFFER_TYPES)):
+                row = _float32_buffer(row)
+            elif numpy is not None and isinstance(row, numpy.ndarray):
+                if row.ndim != 1:
+                    raise ValueError(f"Embedding {index} is not a vector")
+                row = _numpy_row(row)
+            if data is None:
+                data = array("f" if isinstance(row, array) and row.typecode == "f" else "d")
+            if dim is None:
+                dim = len(row)
+            elif len(row) != dim:
+                raise ValueError(f"Embedding {index} has {len(row)} values, expected {dim}")
+            if isinstance(row, array) and row.typecode != data.typecode:
+                row = array(data.typecode, row)
+            try:
+                # fromlist converts a list in one C loop, several times faster than extend
+                data.fromlist(row) if type(row) is list else data.extend(row)
+            except TypeError as e:
+                raise ValueError(f"Embedding {index} must contain only numbers: {e}") from None
+        return cls(data if data is not None else array("f"), dim or 0)
+
+    @classmethod
+    def from_numpy(cls, value: Any) -> "EmbeddingMatrix":
+        """Copy a 2-D NumPy array, keeping float32 as float32"""
+        if value.ndim != 2:
+            raise ValueError(f"Embeddings array must be 2-D, got {value.ndim}-D")
+        dtype = numpy.float32 if value.dtype == numpy.float32 else numpy.float64
+        data = array("f" if dtype is numpy.float32 else "d")
+        data.frombytes(numpy.ascontiguousarray(value, dtype=dtype).tobytes())
+        return cls(data, value.shape[1])
+
+    @classmethod
+    def from_value(cls, value: Any) -> "EmbeddingMatrix":
+        """Coerce any supported representation; used as the pydantic validator"""
+        if isinstance(value, cls):
+            return value
+        if numpy is not None and isinstance(value, numpy.ndarray):
+            return cls.from_numpy(value)
+        if isinstance(value, (str, dict, *_BUFFER_TYPES)) or not isinstance(value, Iterable):
+            raise ValueError("Embeddings must be a list of vectors or a 2-D array")
+        return cls.from_rows(value)
+
+    def __len__(self) -> int:
+        return len(self.data) // self.dim if self.dim else 0
+
+    def __getitem__(self, index: int) -> List[float]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("embedding index out of range")
+        return self.data[index * self.dim:(index + 1) * self.dim].tolist()
+
+    def __iter__(self) -> Iterator[List[float]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, EmbeddingMatrix):
+            return self.dim == other.dim and self.data == other.data
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        dtype = "float32" if self.data.typecode == "f" else "float64"
+        return f"EmbeddingMatrix(rows={len(self)}, dim={self.dim}, dtype={dtype})"
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) * self.data.itemsize
+
+    def take(self, positions: Iterable[int]) -> "EmbeddingMatrix":
+        """A new matrix with only the given rows"""
+        data = array(self.data.typecode)
+        for index in positions:
+            data.extend(self.data[index * self.dim:(index + 1) * self.dim])
+        return EmbeddingMatrix(data, self.dim)
+
+    def tolist(self) -> List[List[float]]:
+        flat = self.data.tolist()
+        return [flat[i:i + self.dim] for i in range(0, len(flat), self.dim)]
+
+    def to_base64(self) -> List[str]:
+        """One base64 string of little-endian float32 values per row"""
+        data = self.data if self.data.typecode == "f" else array("f", self.data)
+        if sys.byteorder == "big":
+            data = array("f", data)
+            data.byteswap()
+        raw = data.tobytes()
+        step = self.dim * 4
+        return [base64.b64encode(raw[i:i + step]).decode("ascii") for i in range(0, len(raw), step)]
+
+    def to_json(self, encoding: str = "float") -> str:
+        """Serialize as a JSON array of float arrays, or of base64 float32 rows"""
+        if encoding == "base64":
+            return dumps_plain(self.to_base64())
+        if encoding != "float":
+            raise ValueError(f"Unknown embedding encoding: {encoding}")
+        if numpy is not None and orjson is not None and self.dim:
+            matrix = numpy.frombuffer(self.data, dtype=numpy.float32 if self.data.typecode == "f" else numpy.float64)
+            return orjson.dumps(matrix.reshape(-1, self.dim), option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+        return dumps_plain(self.tolist())
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls.from_value,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda value: value.tolist() if isinstance(value, EmbeddingMatrix) else value
+            )
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema: Any, handler: Any) -> dict:
+        return {"type": "array", "items": {"type": "array", "items": {"type": "number"}}}
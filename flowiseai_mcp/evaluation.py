@@ -0,0 +1,71 @@
+"""Aggregation of concurrent prediction runs into latency and error statistics"""
+
+import time
+from typing import List, Dict, Optional, Sequence
+
+from .models import PredictionResult, PredictionLatencyStats, PredictionBatchReport
+
+TIMEOUT_ERROR = "timed out"
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> Optional[float]:
+    """Linearly interpolated percentile of already sorted values"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def latency_stats(results: List[PredictionResult]) -> PredictionLatencyStats:
+    latencies = sorted(r.elapsed_seconds for r in results if r.success)
+    failed = sum(1 for r in results if not r.success)
+
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 4) if value is not None else None
+
+    return PredictionLatencyStats(
+        requests=len(results),
+        succeeded=len(results) - failed,
+        failed=failed,
+        timeouts=sum(1 for r in results if r.error == TIMEOUT_ERROR),
+        error_rate=round(failed / len(results), 4) if results else 0.0,
+        mean=rounded(sum(latencies) / len(latencies)) if latencies else None,
+        p50=rounded(percentile(latencies, 0.5)),
+        p90=rounded(percentile(latencies, 0.9)),
+        p99=rounded(percentile(latencies, 0.99)),
+        max=rounded(latencies[-1]) if latencies else None
+    )
+
+
+class PredictionBatchTracker:
+    """Collects prediction results as they complete into a PredictionBatchReport"""
+
+    def __init__(self, keep_responses: bool = True):
+        self.started = time.monotonic()
+        self.keep_responses = keep_responses
+        self.by_chatflow: Dict[str, List[PredictionResult]] = {}
+
+    def add(self, result: PredictionResult):
+        if not self.keep_responses:
+            # Statistics only need timings; drop the response bodies
+            result = result.model_copy(update={"response": None})
+        self.by_chatflow.setdefault(result.chatflow_id, []).append(result)
+
+    def __len__(self) -> int:
+        return sum(len(results) for results in self.by_chatflow.values())
+
+    def report(self) -> PredictionBatchReport:
+        elapsed = time.monotonic() - self.started
+        results = sorted((r for rs in self.by_chatflow.values() for r in rs), key=lambda r: r.index)
+        failed = sum(1 for r in results if not r.success)
+        return PredictionBatchReport(
+            requests=len(results),
+            succeeded=len(results) - failed,
+            failed=failed,
+            elapsed_seconds=round(elapsed, 3),
+            requests_per_second=round(len(results) / elapsed, 2) if elapsed > 0 else None,
+            chatflows={chatflow_id: latency_stats(rs) for chatflow_id, rs in self.by_chatflow.items()},
+            results=results
+        )
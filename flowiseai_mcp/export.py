@@ -0,0 +1,266 @@
+"""Bulk export of chat messages, feedback and leads to gzipped NDJSON
+
+Usage: flowiseai-mcp-export --output ./exports [--incremental] [--concurrency 4]
+
+Chatflows are exported concurrently (bounded by `concurrency`), and records
+are streamed page by page into one compressed newline-delimited JSON file per
+record kind, so memory use does not grow with history size. Incremental runs
+keep a per-chatflow checkpoint of the last exported `endDate` and continue
+just after it on the next run, so records on the boundary are not exported twice.
+"""
+
+import os
+import sys
+import json
+import gzip
+import time
+import asyncio
+import secrets
+import argparse
+import logging
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Iterable
+
+from pydantic import BaseModel
+
+from .client import FlowiseAIClient
+from .models import ExportReport
+
+logger = logging.getLogger(__name__)
+
+EXPORT_KINDS = ("messages", "feedback", "leads")
+CHECKPOINT_FILE = "export_checkpoint.json"
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _in_range(created: Optional[datetime], start: Optional[datetime], end: Optional[datetime],
+              after_start: bool = False) -> bool:
+    """Whether a record falls in [start, end], or (start, end] with `after_start`"""
+    if created is None:
+        return start is None and end is None
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    if start is not None and (created <= start if after_start else created < start):
+        return False
+    return end is None or created <= end
+
+
+class _NDJSONWriter:
+    """Appends JSON lines to a new gzip file, one write per batch
+
+    Compression runs in a worker thread, one batch at a time, so chatflows
+    exported concurrently neither block the event loop nor interleave lines.
+    """
+
+    def __init__(self, path: str, compresslevel: int = 6):
+        self.path = path
+        self.records = 0
+        # "x" refuses to overwrite a file left by another export
+        self._file = gzip.open(path, "xb", compresslevel=compresslevel)
+        self._lock = asyncio.Lock()
+
+    async def write(self, records: Iterable[BaseModel]):
+        lines = [record.model_dump_json().encode("utf-8") for record in records]
+        if lines:
+            async with self._lock:
+                await asyncio.to_thread(self._file.write, b"\n".join(lines) + b"\n")
+            self.records += len(lines)
+
+    async def close(self):
+        async with self._lock:
+            await asyncio.to_thread(self._file.close)
+
+
+class ChatHistoryExporter:
+    """Export chat history for many chatflows into gzipped NDJSON files"""
+
+    def __init__(
+        self,
+        client: FlowiseAIClient,
+        output_dir: str,
+        kinds: Iterable[str] = EXPORT_KINDS,
+        concurrency: int = 4,
+        page_size: int = 200,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        incremental: bool = False
+    ):
+        unknown = set(kinds) - set(EXPORT_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown export kinds: {', '.join(sorted(unknown))}")
+        self.client = client
+        self.output_dir = output_dir
+        self.kinds = tuple(kinds)
+        self.concurrency = max(1, concurrency)
+        self.page_size = page_size
+        self.start_date = start_date
+        # Pin the end of an open range so every chatflow (and the checkpoint) sees the same cut-off
+        self.end_date = end_date or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        self.incremental = incremental
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self.checkpoints: Dict[str, str] = {}
+
+    def _load_checkpoints(self):
+        if self.incremental and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                self.checkpoints = json.load(f)
+
+    def _save_checkpoints(self):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.checkpoints, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    async def _export_chatflow(self, chatflow_id: str, writers: Dict[str, _NDJSONWriter]) -> int:
+        # A checkpoint is the inclusive end of the last run, so a resumed range starts after it
+        resumed = self.incremental and chatflow_id in self.checkpoints
+        start_date = self.checkpoints[chatflow_id] if resumed else self.start_date
+        start, end = _parse_date(start_date), _parse_date(self.end_date)
+        count = 0
+
+        if "messages" in writers:
+            batch = []
+            async for message in self.client.iter_chat_messages(
+                chatflow_id, page_size=self.page_size, order="ASC", start_date=start_date, end_date=self.end_date
+            ):
+                if resumed and not _in_range(message.createdDate, start, None, after_start=True):
+                    continue
+                batch.append(message)
+                if len(batch) >= self.page_size:
+                    await writers["messages"].write(batch)
+                    count += len(batch)
+                    batch = []
+            await writers["messages"].write(batch)
+            count += len(batch)
+
+        # Feedback and lead endpoints have no date filters, so the range is applied here
+        if "feedback" in writers:
+            records = [r for r in await self.client.list_feedback(chatflow_id)
+                       if _in_range(r.createdDate, start, end, resumed)]
+            await writers["feedback"].write(records)
+            count += len(records)
+        if "leads" in writers:
+            records = [r for r in await self.client.list_leads(chatflow_id)
+                       if _in_range(r.createdDate, start, end, resumed)]
+            await writers["leads"].write(records)
+            count += len(records)
+        return count
+
+    async def run(
+        self,
+        chatflow_ids: Optional[List[str]] = None,
+        progress: Optional[Callable[[int, int, str], Awaitable[Any]]] = None
+    ) -> ExportReport:
+        """Export every chatflow (or the given ones) and return a throughput report
+
+        `progress` is awaited with (completed, total, chatflow_id) after each chatflow.
+        A failed chatflow is reported in `errors` and keeps its previous checkpoint;
+        records it wrote before failing stay in this run's files.
+        """
+        started = time.monotonic()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._load_checkpoints()
+        if chatflow_ids is None:
+            chatflow_ids = [flow.id for flow in await self.client.list_chatflows() if flow.id]
+
+        # The random part keeps exports started within the same second apart
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + "-" + secrets.token_hex(4)
+        writers = {
+            kind: _NDJSONWriter(os.path.join(self.output_dir, f"{kind}-{stamp}.ndjson.gz"))
+            for kind in self.kinds
+        }
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors: Dict[str, str] = {}
+        completed = 0
+
+        async def export_one(chatflow_id: str):
+            nonlocal completed
+            async with semaphore:
+                try:
+                    await self._export_chatflow(chatflow_id, writers)
+                    if self.incremental:
+                        self.checkpoints[chatflow_id] = self.end_date
+                        self._save_checkpoints()
+                except Exception as e:
+                    logger.error(f"Export of chatflow {chatflow_id} failed: {e}")
+                    errors[chatflow_id] = str(e)
+            completed += 1
+            if progress is not None:
+                await progress(completed, len(chatflow_ids), chatflow_id)
+
+        try:
+            await asyncio.gather(*(export_one(chatflow_id) for chatflow_id in chatflow_ids))
+        finally:
+            for writer in writers.values():
+                await writer.close()
+
+        elapsed = time.monotonic() - started
+        records = {kind: writer.records for kind, writer in writers.items()}
+        total = sum(records.values())
+        bytes_written = sum(os.path.getsize(writer.path) for writer in writers.values())
+        return ExportReport(
+            chatflows=len(chatflow_ids),
+            failed_chatflows=len(errors),
+            records=records,
+            files=[writer.path for writer in writers.values()],
+            bytes_written=bytes_written,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            elapsed_seconds=round(elapsed, 3),
+            records_per_second=round(total / elapsed, 1) if elapsed > 0 else None,
+            errors=errors
+        )
+
+
+def main():
+    """CLI entry point for bulk exports"""
+    parser = argparse.ArgumentParser(description="Export FlowiseAI chat history to gzipped NDJSON")
+    parser.add_argument("--output", default=os.getenv("FLOWISEAI_EXPORT_DIR", "exports"), help="output directory")
+    parser.add_argument("--chatflow", action="append", dest="chatflows", help="chatflow id (repeatable, default: all)")
+    parser.add_argument("--kinds", default=",".join(EXPORT_KINDS), help="comma-separated: messages,feedback,leads")
+    parser.add_argument("--concurrency", type=int, default=4, help="chatflows exported at once")
+    parser.add_argument("--page-size", type=int, default=200, help="chat messages fetched per request")
+    parser.add_argument("--start-date", help="only records created at or after this ISO date")
+    parser.add_argument("--end-date", help="only records created at or before this ISO date (default: now)")
+    parser.add_argument("--incremental", action="store_true", help="continue from the checkpoint in the output directory")
+    args = parser.parse_args()
+
+    async def run() -> ExportReport:
+        client = FlowiseAIClient()
+        try:
+            exporter = ChatHistoryExporter(
+                client,
+                args.output,
+                kinds=[k.strip() for k in args.kinds.split(",") if k.strip()],
+                concurrency=args.concurrency,
+                page_size=args.page_size,
+                start_date=args.start_date,
+                end_date=args.end_date,
+                incremental=args.incremental
+            )
+            return await exporter.run(args.chatflows, progress=_print_progress)
+        finally:
+            await client.close()
+
+    try:
+        report = asyncio.run(run())
+    except Exception as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(report.model_dump_json(indent=2))
+    if report.failed_chatflows:
+        sys.exit(1)
+
+
+async def _print_progress(done: int, total: int, chatflow_id: str):
+    print(f"[{done}/{total}] {chatflow_id}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,29 @@ import os
 import sys
 import json
 import logging
+import time
 import base64
 import asyncio
-from typing import Optional
+from typing import Optional, Dict, Any, Tuple
 from starlette.applications import Starlette
 from starlette.routing import Route
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 from starlette.requests import Request
 import uvicorn
 from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
 
 # Import the main server
 from .server import FlowiseAIMCPServer
+from .registry import ClientRegistry
+from .session_store import create_event_store
+from .ingest import set_remote_callers
+from .metrics import METRICS
+from .tracing import start_span, tracing_enabled, TRACEPARENT_HEADER
+from .workers import (
+    WorkerSupervisor, default_worker_count, write_worker_stats, remove_worker_stats, read_worker_stats,
+    read_worker_metrics, STATS_DIR_ENV, WORKER_INDEX_ENV, WORKER_GENERATION_ENV
+)
+from .tools import tool_catalog_json, tool_catalog_etag
 
 # Configure logging to stderr
 logging.basicConfig(
@@ -30,23 +41,77 @@ if os.getenv('DEBUG', '').lower() in ('true', '1', 'yes'):
     logger.setLevel(logging.DEBUG)
 
 
+def _stateless_from_env() -> bool:
+    return os.getenv("FLOWISEAI_HTTP_STATELESS", "").lower() in ("true", "1", "yes")
+
+
+def decode_config(config_b64: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decode the base64 JSON `config` query parameter"""
+    if not config_b64:
+        return None
+    try:
+        config_json = base64.b64decode(config_b64).decode('utf-8')
+        return json.loads(config_json)
+    except Exception as e:
+        logger.error(f"Failed to decode config: {e}")
+        return None
+
+
+class ASGIEndpoint:
+    """Wrap a coroutine so Starlette routes to it as an ASGI app, not a request handler"""
+    
+    def __init__(self, handler):
+        self.handler = handler
+    
+    async def __call__(self, scope, receive, send):
+        await self.handler(scope, receive, send)
+
+
 class MCPApp:
-    """MCP Application with Streamable HTTP transport"""
+    """MCP Application with Streamable HTTP transport
+    
+    In stateless mode every request is served by a fresh transport with no
+    session id, so any worker process or replica can answer any request and
+    the server scales out behind a plain load balancer. Stateful mode keeps
+    sessions in this process (clients need sticky routing) and can resume
+    dropped SSE streams from the configured event store.
+    """
     
-    def __init__(self):
+    def __init__(self, stateless: Optional[bool] = None, session_store: Optional[str] = None):
+        self.stateless = stateless if stateless is not None else _stateless_from_env()
+        session_store = session_store if session_store is not None else os.getenv("FLOWISEAI_SESSION_STORE")
+        if self.stateless and session_store:
+            logger.warning("FLOWISEAI_SESSION_STORE is ignored in stateless mode, which has no streams to resume")
+            session_store = None
+        self.event_store = create_event_store(session_store)
+        
+        # One client per FlowiseAI backend/credential pair, shared across sessions
+        self.registry = ClientRegistry()
+        # Callers are tenants: they may only read server files if the operator allows it
+        set_remote_callers()
+        
         # Create the MCP server instance
-        self.mcp_server_instance = FlowiseAIMCPServer()
+        self.mcp_server_instance = FlowiseAIMCPServer(
+            registry=self.registry,
+            credentials_resolver=self.request_credentials
+        )
         self.mcp_server = self.mcp_server_instance.server
         
         # Create the session manager
         self.session_manager = StreamableHTTPSessionManager(
             app=self.mcp_server,
+            event_store=self.event_store,
             json_response=False,
-            stateless=False
+            stateless=self.stateless
         )
         
         # Track if session manager is running
         self.manager_task = None
+        self.stats_task = None
+        
+        self.started_at = time.time()
+        self.requests = 0
+        self.in_flight = 0
     
     async def startup(self):
         """Start the session manager"""
@@ -55,59 +120,128 @@ class MCPApp:
                 await asyncio.Event().wait()
         
         self.manager_task = asyncio.create_task(run_manager())
+        await self.registry.start()
+        # Build the tool catalog now rather than on the first session's tools/list
+        tool_catalog_json()
+        if os.getenv(STATS_DIR_ENV):
+            self.stats_task = asyncio.create_task(self._publish_stats())
         logger.info("Session manager started")
     
     async def shutdown(self):
         """Shutdown the session manager"""
-        if self.manager_task:
-            self.manager_task.cancel()
-            try:
-                await self.manager_task
-            except asyncio.CancelledError:
-                pass
+        for task in (self.stats_task, self.manager_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        # The final metrics stay behind for the supervisor to fold into its baseline
+        try:
+            write_worker_stats(METRICS.snapshot(), kind="metrics")
+        except OSError as e:
+            logger.error(f"Failed to publish final worker metrics: {e}")
+        remove_worker_stats(kind="stats")
+        await self.registry.close()
+        if self.event_store:
+            self.event_store.close()
         logger.info("Session manager stopped")
     
-    async def handle_mcp(self, request: Request):
-        """Handle MCP requests"""
-        # Extract configuration from query parameters if provided
-        if request.url.query:
-            params = dict(request.query_params)
-            if 'config' in params:
-                try:
-                    # Decode base64 and parse JSON
-                    config_b64 = params['config']
-                    config_json = base64.b64decode(config_b64).decode('utf-8')
-                    config = json.loads(config_json)
-                    logger.debug(f"Applying config: {config}")
-                    
-                    # Set environment variables from config
-                    if 'flowiseaiApiKey' in config:
-                        os.environ['FLOWISEAI_API_KEY'] = config['flowiseaiApiKey']
-                    if 'flowiseaiUrl' in config:
-                        os.environ['FLOWISEAI_URL'] = config['flowiseaiUrl']
-                except Exception as e:
-                    logger.error(f"Failed to decode config: {e}")
-        
-        # Get the raw ASGI scope, receive, send
-        scope = request.scope
-        receive = request.receive
-        
-        # We need to handle the response properly
-        # The session manager will send the response directly
-        response_started = False
+    async def handle_mcp(self, scope, receive, send):
+        """Handle MCP requests as a raw ASGI app
         
-        async def send(message):
-            nonlocal response_started
-            if message['type'] == 'http.response.start':
-                response_started = True
-            await request._send(message)
-        
-        # Handle the request with the session manager
-        await self.session_manager.handle_request(scope, receive, send)
+        The session manager writes the whole response itself (including SSE
+        streams carrying progress notifications), so no Starlette Response is
+        returned afterwards.
+        """
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            if tracing_enabled():
+                await self._handle_traced(Request(scope), scope, receive, send)
+            else:
+                await self.session_manager.handle_request(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+    
+    async def _handle_traced(self, request: Request, scope, receive, send):
+        """Serve an MCP request inside a SERVER span continuing the caller's trace"""
+        with start_span(f"{request.method} /mcp", "SERVER", {
+            "http.request.method": request.method,
+            "url.path": request.url.path,
+            "mcp.session.id": request.headers.get("mcp-session-id") or ""
+        }, traceparent=request.headers.get(TRACEPARENT_HEADER)) as span:
+            # Tool calls run in the session manager's task, which does not see this
+            # context, so they pick the span up from the request headers instead
+            headers = [(k, v) for k, v in scope["headers"] if k != b"traceparent"]
+            headers.append((b"traceparent", span.traceparent.encode("latin-1")))
+            
+            async def traced_send(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                await send(message)
+            
+            await self.session_manager.handle_request(dict(scope, headers=headers), receive, traced_send)
+    
+    def worker_stats(self) -> Dict[str, Any]:
+        """Counters of this process, as published to sibling workers"""
+        return {
+            "pid": os.getpid(),
+            "index": int(os.getenv(WORKER_INDEX_ENV, "0")),
+            "generation": int(os.getenv(WORKER_GENERATION_ENV, "0")),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "sessions": len(self.session_manager._server_instances),
+            "registry": self.registry.stats(),
+            "updated_at": time.time()
+        }
+    
+    async def _publish_stats(self):
+        interval = float(os.getenv("FLOWISEAI_WORKER_STATS_INTERVAL", "5"))
+        while True:
+            try:
+                write_worker_stats(self.worker_stats())
+                write_worker_stats(METRICS.snapshot(), kind="metrics")
+            except OSError as e:
+                logger.error(f"Failed to publish worker stats: {e}")
+            await asyncio.sleep(interval)
+    
+    def workers_health(self) -> Optional[Dict[str, Any]]:
+        """Per-worker snapshots and their totals when running under the worker supervisor"""
+        if not os.getenv(STATS_DIR_ENV):
+            return None
+        # Refresh our own snapshot so the answering worker is always current
+        write_worker_stats(self.worker_stats())
+        snapshots = sorted(read_worker_stats() or [], key=lambda s: (s["index"], s["generation"]))
+        return {
+            "count": len(snapshots),
+            "answered_by": os.getpid(),
+            "totals": {
+                "requests": sum(s["requests"] for s in snapshots),
+                "in_flight": sum(s["in_flight"] for s in snapshots),
+                "sessions": sum(s["sessions"] for s in snapshots),
+                "live_clients": sum(s["registry"]["live_clients"] for s in snapshots)
+            },
+            "workers": snapshots
+        }
+    
+    def request_credentials(self) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """Resolve FlowiseAI credentials from the HTTP request behind the current MCP call"""
+        try:
+            request = self.mcp_server.request_context.request
+        except LookupError:
+            return None
+        if request is None or not hasattr(request, "query_params"):
+            return None
         
-        # Return empty response as the actual response was sent via send()
-        from starlette.responses import Response
-        return Response(content=b'', media_type='application/octet-stream')
+        config = decode_config(request.query_params.get('config')) or {}
+        url = config.get('flowiseaiUrl')
+        api_key = config.get('flowiseaiApiKey')
+        if not url:
+            return os.getenv("FLOWISEAI_URL"), api_key or os.getenv("FLOWISEAI_API_KEY")
+        # The operator's key is never sent to a tenant-chosen URL; without its own key the call runs in test mode
+        return url, api_key or ""
     
     async def handle_health(self, request: Request):
         """Health check endpoint"""
@@ -115,12 +249,35 @@ class MCPApp:
             "status": "healthy",
             "service": "flowiseai-mcp",
             "transport": "streamable-http",
+            "stateless": self.stateless,
+            "session_store": self.event_store.stats() if self.event_store else None,
+            "workers": self.workers_health(),
             "test_mode": not os.getenv("FLOWISEAI_API_KEY") or os.getenv("FLOWISEAI_API_KEY") == "test-key",
             "endpoints": {
                 "mcp": "/mcp",
-                "health": "/health"
+                "health": "/health",
+                "metrics": "/metrics",
+                "tools": "/tools"
             }
         })
+    
+    async def handle_metrics(self, request: Request):
+        """Prometheus text exposition, summed over all workers (stopped ones included) under the supervisor"""
+        if os.getenv(STATS_DIR_ENV):
+            # Siblings' numbers are as fresh as their last published snapshot
+            write_worker_stats(METRICS.snapshot(), kind="metrics")
+            body = METRICS.render(read_worker_metrics())
+        else:
+            body = METRICS.render()
+        return Response(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+    
+    async def handle_tools(self, request: Request):
+        """Serve the precomputed tools/list result for discovery without an MCP session"""
+        etag = tool_catalog_etag()
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(tool_catalog_json(), media_type="application/json", headers=headers)
 
 
 # Create the MCP app instance
@@ -129,8 +286,10 @@ mcp_app = MCPApp()
 # Create Starlette app
 app = Starlette(
     routes=[
-        Route("/mcp", endpoint=mcp_app.handle_mcp, methods=["GET", "POST", "DELETE"]),
+        Route("/mcp", endpoint=ASGIEndpoint(mcp_app.handle_mcp), methods=["GET", "POST", "DELETE"]),
         Route("/health", endpoint=mcp_app.handle_health),
+        Route("/tools", endpoint=mcp_app.handle_tools),
+        Route("/metrics", endpoint=mcp_app.handle_metrics),
         Route("/", endpoint=mcp_app.handle_health),  # Root health check
     ],
     debug=os.getenv('DEBUG', '').lower() in ('true', '1', 'yes'),
@@ -143,20 +302,38 @@ def main():
     """Main entry point for HTTP server"""
     port = int(os.getenv("PORT", "8000"))
     host = os.getenv("HOST", "0.0.0.0")
+    # Sessions live in one worker's memory, so only a server that was asked
+    # to be stateless gets a worker per CPU by default
+    workers = default_worker_count(stateless=_stateless_from_env())
+    
+    if workers > 1:
+        if os.getenv("FLOWISEAI_HTTP_STATELESS") is None:
+            logger.warning(f"FLOWISEAI_HTTP_WORKERS={workers} without FLOWISEAI_HTTP_STATELESS: switching to "
+                           f"stateless mode, so clients get no MCP sessions or resumable streams. Set "
+                           f"FLOWISEAI_HTTP_STATELESS=true to confirm, or FLOWISEAI_HTTP_WORKERS=1 to keep sessions")
+            os.environ["FLOWISEAI_HTTP_STATELESS"] = "true"
+        elif not _stateless_from_env():
+            logger.warning(f"Running {workers} stateful workers: a session only works on the worker that created it")
     
     logger.info(f"Starting FlowiseAI MCP HTTP Server")
     logger.info(f"Listening on {host}:{port}")
     logger.info(f"MCP endpoint: http://{host}:{port}/mcp")
     logger.info(f"Health check: http://{host}:{port}/health")
+    logger.info(f"Workers: {workers}, stateless: {_stateless_from_env()}")
     
     if not os.getenv("FLOWISEAI_API_KEY") or os.getenv("FLOWISEAI_API_KEY") == "test-key":
         logger.info("Running in TEST MODE - ping will work without FlowiseAI connection")
     
+    log_level = "error" if not os.getenv('DEBUG') else "debug"
+    if workers > 1:
+        WorkerSupervisor(host, port, workers, log_level=log_level).run()
+        return
+    
     uvicorn.run(
         app,
         host=host,
         port=port,
-        log_level="error" if not os.getenv('DEBUG') else "debug"
+        log_level=log_level
     )
 
 
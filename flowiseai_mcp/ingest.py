@@ -0,0 +1,210 @@
+"""Lazy ingestion of local text, markdown and JSONL files into Flowise documents
+
+Files are read block by block (memory-mapped above a size threshold) and
+chunked as they are read, so a corpus of any size is turned into a stream of
+`{"pageContent", "metadata"}` documents without being loaded into memory.
+The generators are synchronous; batched upserts advance them in a worker
+thread so file reads never block the event loop.
+"""
+
+import os
+import json
+import mmap
+import codecs
+import logging
+from typing import Optional, List, Dict, Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = frozenset({".txt", ".text", ".md", ".markdown", ".rst"})
+JSONL_EXTENSIONS = frozenset({".jsonl", ".ndjson"})
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS | JSONL_EXTENSIONS
+
+# Files at least this large are memory-mapped instead of read through a buffer
+MMAP_THRESHOLD = 1024 * 1024
+BLOCK_SIZE = 256 * 1024
+
+# Separators tried in order when looking for a natural place to end a chunk
+_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+
+# Set by the HTTP server, whose callers are tenants rather than the operator
+_remote_callers = False
+
+
+def set_remote_callers(remote: bool = True):
+    """Mark this process as serving remote callers, which need FLOWISEAI_HTTP_ALLOW_INGEST to read files"""
+    global _remote_callers
+    _remote_callers = remote
+
+
+def ingest_roots() -> List[str]:
+    """Directories local files may be read from (FLOWISEAI_INGEST_ROOTS); reading is off when unset"""
+    configured = os.getenv("FLOWISEAI_INGEST_ROOTS")
+    roots = [os.path.realpath(root) for root in (configured or "").split(os.pathsep) if root]
+    if not roots:
+        raise PermissionError("Reading local files is disabled; set FLOWISEAI_INGEST_ROOTS to enable `paths`")
+    if _remote_callers and os.getenv("FLOWISEAI_HTTP_ALLOW_INGEST", "").lower() not in ("true", "1", "yes"):
+        raise PermissionError("Reading local files is disabled over HTTP; set FLOWISEAI_HTTP_ALLOW_INGEST to enable `paths`")
+    return roots
+
+
+def _hidden(path: str, roots: List[str]) -> bool:
+    """True if any component below its ingest root is a dotfile or dot-directory"""
+    if path in roots:
+        return False
+    root = next((root for root in roots if path.startswith(root + os.sep)), None)
+    relative = path[len(root) + 1:] if root else os.path.basename(path)
+    return any(part.startswith(".") for part in relative.split(os.sep))
+
+
+def resolve_path(path: str, roots: Optional[List[str]] = None) -> str:
+    """Resolve a user-supplied path, refusing anything outside the ingest roots or hidden"""
+    roots = roots if roots is not None else ingest_roots()
+    resolved = os.path.realpath(path)
+    if not any(resolved == root or resolved.startswith(root + os.sep) for root in roots):
+        raise PermissionError(f"Path is outside the allowed ingest directories: {path}")
+    if _hidden(resolved, roots):
+        raise PermissionError(f"Hidden files and directories are not ingested: {path}")
+    if not os.path.exists(resolved):
+        raise FileNotFoundError(f"No such file or directory: {path}")
+    return resolved
+
+
+def _supported(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def iter_files(paths: Iterable[str], roots: Optional[List[str]] = None) -> Iterator[str]:
+    """Yield supported files from the given files and directories (recursively, in sorted order)"""
+    roots = roots if roots is not None else ingest_roots()
+    for path in paths:
+        resolved = resolve_path(path, roots)
+        if os.path.isfile(resolved):
+            if not _supported(resolved):
+                raise PermissionError(
+                    f"Unsupported file type: {path} (expected one of {', '.join(sorted(SUPPORTED_EXTENSIONS))})"
+                )
+            yield resolved
+            continue
+        for directory, subdirs, files in os.walk(resolved):
+            subdirs[:] = sorted(d for d in subdirs if not d.startswith("."))
+            for name in sorted(files):
+                if name.startswith(".") or not _supported(name):
+                    continue
+                try:
+                    # Symlinks inside a directory must not lead outside the roots either
+                    resolved_file = resolve_path(os.path.join(directory, name), roots)
+                except (PermissionError, FileNotFoundError) as e:
+                    logger.warning(f"Skipping {name}: {e}")
+                    continue
+                # A symlink may also point at a file type that would be refused by name
+                if _supported(resolved_file):
+                    yield resolved_file
+
+
+def _iter_blocks(path: str) -> Iterator[bytes]:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size < MMAP_THRESHOLD:
+            while True:
+                block = f.read(BLOCK_SIZE)
+                if not block:
+                    return
+                yield block
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                for offset in range(0, size, BLOCK_SIZE):
+                    yield mm[offset:offset + BLOCK_SIZE]
+
+
+def _iter_lines(path: str) -> Iterator[bytes]:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size < MMAP_THRESHOLD:
+            yield from f
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield from iter(mm.readline, b"")
+
+
+def _split_point(text: str, chunk_size: int) -> int:
+    """Index at which to end a chunk, preferring paragraph, line, sentence then word breaks"""
+    window = text[:chunk_size]
+    for separator in _SEPARATORS:
+        index = window.rfind(separator, chunk_size // 2)
+        if index != -1:
+            return index + len(separator)
+    return chunk_size
+
+
+def iter_text_chunks(path: str, chunk_size: int = 1000, chunk_overlap: int = 200,
+                     encoding: str = "utf-8") -> Iterator[str]:
+    """Yield overlapping text chunks of a file while reading it incrementally"""
+    chunk_size = max(1, chunk_size)
+    # Chunks end no earlier than half their size, so this keeps every step moving forward
+    chunk_overlap = max(0, min(chunk_overlap, chunk_size // 2 - 1))
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buffer = ""
+
+    def drain(final: bool) -> Iterator[str]:
+        nonlocal buffer
+        # Walk the buffer with an offset and trim it once, rather than re-slicing per chunk
+        start = 0
+        while len(buffer) - start > chunk_size or (final and start < len(buffer)):
+            window = buffer[start:start + chunk_size + 1]
+            cut = _split_point(window, chunk_size) if len(window) > chunk_size else len(window)
+            chunk = window[:cut].strip()
+            if chunk:
+                yield chunk
+            start = start + max(cut - chunk_overlap, 1) if cut < len(window) else len(buffer)
+        buffer = buffer[start:]
+
+    for block in _iter_blocks(path):
+        buffer += decoder.decode(block)
+        yield from drain(final=False)
+    buffer += decoder.decode(b"", final=True)
+    yield from drain(final=True)
+
+
+def _jsonl_document(record: Any, source: str, line: int) -> Dict[str, Any]:
+    """Map a JSONL record onto a Flowise document"""
+    metadata = {"source": source, "line": line}
+    if isinstance(record, dict):
+        if "pageContent" in record:
+            return {"pageContent": record["pageContent"], "metadata": {**metadata, **(record.get("metadata") or {})}}
+        for key in ("text", "content"):
+            if isinstance(record.get(key), str):
+                extra = {k: v for k, v in record.items() if k != key}
+                return {"pageContent": record[key], "metadata": {**metadata, **extra}}
+    return {"pageContent": record if isinstance(record, str) else json.dumps(record), "metadata": metadata}
+
+
+def iter_file_documents(path: str, chunk_size: int = 1000, chunk_overlap: int = 200,
+                        base: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield Flowise documents for one file: text chunks, or one document per JSONL line"""
+    source = os.path.relpath(path, base) if base else path
+    if os.path.splitext(path)[1].lower() in JSONL_EXTENSIONS:
+        for number, line in enumerate(_iter_lines(path), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping invalid JSON on line {number} of {source}")
+                continue
+            yield _jsonl_document(record, source, number)
+    else:
+        for index, chunk in enumerate(iter_text_chunks(path, chunk_size, chunk_overlap)):
+            yield {"pageContent": chunk, "metadata": {"source": source, "chunk": index}}
+
+
+def iter_documents(paths: Iterable[str], chunk_size: int = 1000, chunk_overlap: int = 200,
+                   roots: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield documents for every supported file under the given paths"""
+    roots = roots if roots is not None else ingest_roots()
+    for path in iter_files(paths, roots):
+        base = next((root for root in roots if path.startswith(root + os.sep)), None)
+        yield from iter_file_documents(path, chunk_size, chunk_overlap, base)
@@ -0,0 +1,292 @@
+"""Prometheus text-format metrics for tool calls and FlowiseAI requests
+
+No client library is needed: counters, gauges and histograms are kept in
+plain dicts keyed by label values and rendered in the text exposition format
+served on `/metrics`. Snapshots are JSON-friendly so the HTTP workers of one
+server can publish theirs and any worker can render the sum.
+
+Each tool call's time is split into phases through a context variable:
+`upstream` (waiting on Flowise, including retries), `validation` (decoding
+and validating response bodies) and `serialization` (rendering and shaping
+the tool result). Requests a call makes concurrently are summed, so the
+phases of a fan-out tool can add up to more than its wall time.
+"""
+
+import time
+import contextlib
+import contextvars
+from typing import Optional, Dict, Any, List, Tuple, Sequence, Iterable
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+PHASES = ("upstream", "validation", "serialization")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples: Dict[Tuple[str, ...], Any] = {}
+
+    def _labels(self, labels: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self, samples: Dict[Tuple[str, ...], Any]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(samples.items()):
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+    def _render_sample(self, labels: Tuple[str, ...], value: Any) -> List[str]:
+        return [f"{self.name}{self._labels(labels)} {_format(value)}"]
+
+    @staticmethod
+    def merge(values: List[Any]) -> Any:
+        return sum(values)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.samples[labels] = self.samples.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.samples[labels] = self.samples.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.samples[labels] = self.samples.get(labels, 0) - amount
+
+
+class Histogram(_Metric):
+    """Bucket counts (non-cumulative, plus +Inf), sum and count per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str):
+        sample = self.samples.get(labels)
+        if sample is None:
+            sample = self.samples[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            position = len(self.buckets)
+        sample[position] += 1
+        sample[-2] += value
+        sample[-1] += 1
+
+    def _render_sample(self, labels: Tuple[str, ...], value: Any) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), value):
+            cumulative += count
+            le = 'le="' + _format(bound) + '"'
+            lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(labels)} {_format(value[-2])}")
+        lines.append(f"{self.name}_count{self._labels(labels)} {value[-1]}")
+        return lines
+
+    @staticmethod
+    def merge(values: List[Any]) -> Any:
+        return [sum(column) for column in zip(*values)]
+
+
+class MetricsRegistry:
+    """A set of metrics that can be snapshotted, merged across processes and rendered"""
+
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, List[List[Any]]]:
+        """JSON-serializable copy of every sample"""
+        return {
+            name: [[list(labels), list(value) if isinstance(value, list) else value]
+                   for labels, value in metric.samples.items()]
+            for name, metric in self.metrics.items()
+        }
+
+    def accumulate(self, baseline: Dict[str, List[List[Any]]],
+                   snapshot: Dict[str, List[List[Any]]]) -> Dict[str, List[List[Any]]]:
+        """Add a finished process's counters and histograms to a baseline snapshot
+
+        Gauges describe live state, so those of the finished process are dropped.
+        """
+        merged: Dict[str, Dict[Tuple[str, ...], List[Any]]] = {}
+        for source in (baseline, snapshot):
+            for name, samples in source.items():
+                metric = self.metrics.get(name)
+                if metric is None or metric.kind == "gauge":
+                    continue
+                for labels, value in samples:
+                    merged.setdefault(name, {}).setdefault(tuple(labels), []).append(value)
+        return {
+            name: [[list(labels), self.metrics[name].merge(values)] for labels, values in samples.items()]
+            for name, samples in merged.items()
+        }
+
+    def render(self, snapshots: Optional[Iterable[Dict[str, List[List[Any]]]]] = None) -> str:
+        """Text exposition of this registry, or of the sum of several snapshots"""
+        merged: Dict[str, Dict[Tuple[str, ...], List[Any]]] = {}
+        if snapshots is None:
+            snapshots = [self.snapshot()]
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                for labels, value in samples:
+                    merged.setdefault(name, {}).setdefault(tuple(labels), []).append(value)
+        lines: List[str] = []
+        for name, metric in self.metrics.items():
+            samples = {labels: metric.merge(values) for labels, values in merged.get(name, {}).items()}
+            lines.extend(metric.render(samples))
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+TOOL_CALLS = METRICS.counter("flowiseai_mcp_tool_calls_total", "Tool calls started", ("tool",))
+TOOL_ERRORS = METRICS.counter("flowiseai_mcp_tool_errors_total", "Tool calls that raised an error", ("tool",))
+TOOLS_IN_FLIGHT = METRICS.gauge("flowiseai_mcp_tool_calls_in_flight", "Tool calls currently running", ("tool",))
+TOOL_DURATION = METRICS.histogram(
+    "flowiseai_mcp_tool_duration_seconds", "Wall time of tool calls", ("tool",)
+)
+TOOL_PHASE_DURATION = METRICS.histogram(
+    "flowiseai_mcp_tool_phase_seconds",
+    "Time tool calls spent waiting on Flowise (upstream), validating responses and serializing results",
+    ("tool", "phase")
+)
+TOOL_RESPONSE_BYTES = METRICS.histogram(
+    "flowiseai_mcp_tool_response_bytes", "Size of tool results", ("tool",), buckets=BYTE_BUCKETS
+)
+UPSTREAM_REQUESTS = METRICS.counter(
+    "flowiseai_mcp_upstream_requests_total", "Requests sent to Flowise", ("method", "route", "status")
+)
+UPSTREAM_IN_FLIGHT = METRICS.gauge("flowiseai_mcp_upstream_requests_in_flight", "Requests to Flowise in progress")
+UPSTREAM_DURATION = METRICS.histogram(
+    "flowiseai_mcp_upstream_duration_seconds", "Time waiting on Flowise per request, retries included",
+    ("method", "route")
+)
+UPSTREAM_RESPONSE_BYTES = METRICS.histogram(
+    "flowiseai_mcp_upstream_response_bytes", "Size of Flowise response bodies", ("method", "route"),
+    buckets=BYTE_BUCKETS
+)
+
+
+class CallTimings:
+    """Phase times accumulated by one tool call"""
+
+    __slots__ = ("upstream", "validation", "serialization", "parent")
+
+    def __init__(self, parent: Optional["CallTimings"] = None):
+        self.upstream = 0.0
+        self.validation = 0.0
+        self.serialization = 0.0
+        self.parent = parent
+
+    @contextlib.contextmanager
+    def measure(self, phase: str):
+        """Add the time spent in the block to a phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self, phase, getattr(self, phase) + time.perf_counter() - start)
+
+
+_timings: contextvars.ContextVar[Optional[CallTimings]] = contextvars.ContextVar("flowiseai_call_timings", default=None)
+
+
+def route(endpoint: str) -> str:
+    """Low-cardinality label for an API path: its first segment, so ids never become labels"""
+    return endpoint.lstrip("/").split("/", 1)[0].split("?", 1)[0] or "/"
+
+
+def payload_size(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def observe_request(method: str, endpoint: str, status: str, upstream: float, validation: float = 0.0,
+                    response_bytes: Optional[int] = None):
+    """Record one Flowise request and charge its time to the running tool call"""
+    label = route(endpoint)
+    UPSTREAM_REQUESTS.inc(method, label, status)
+    UPSTREAM_DURATION.observe(upstream, method, label)
+    if response_bytes is not None:
+        UPSTREAM_RESPONSE_BYTES.observe(response_bytes, method, label)
+    timings = _timings.get()
+    if timings is not None:
+        timings.upstream += upstream
+        timings.validation += validation
+
+
+class ToolCallMetrics:
+    """Context for one tool call: counts it, tracks it in flight and records its phases on exit"""
+
+    __slots__ = ("tool", "timings", "_token", "_start")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+
+    def __enter__(self) -> CallTimings:
+        self.timings = CallTimings(_timings.get())
+        self._token = _timings.set(self.timings)
+        self._start = time.perf_counter()
+        TOOL_CALLS.inc(self.tool)
+        TOOLS_IN_FLIGHT.inc(self.tool)
+        return self.timings
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        _timings.reset(self._token)
+        TOOLS_IN_FLIGHT.dec(self.tool)
+        if exc_type is not None:
+            TOOL_ERRORS.inc(self.tool)
+        TOOL_DURATION.observe(elapsed, self.tool)
+        timings = self.timings
+        for phase in PHASES:
+            TOOL_PHASE_DURATION.observe(getattr(timings, phase), self.tool, phase)
+        # Sub-calls (e.g. inside `batch`) also count towards the calling tool
+        if timings.parent is not None:
+            timings.parent.upstream += timings.upstream
+            timings.parent.validation += timings.validation
+            timings.parent.serialization += timings.serialization
+        return False
@@ -5,6 +5,8 @@ from datetime import datetime
 from pydantic import BaseModel, Field
 from enum import Enum
 
+from .embeddings import EmbeddingMatrix
+
 
 class ChatType(str, Enum):
     INTERNAL = "INTERNAL"
@@ -63,10 +65,59 @@ class PredictionResponse(BaseModel):
     sessionId: Optional[str] = None
     sourceDocuments: Optional[List[Dict[str, Any]]] = None
     usedTools: Optional[List[Dict[str, Any]]] = None
+    agentReasoning: Optional[List[Dict[str, Any]]] = None
     question: Optional[str] = None
     chatMessageId: Optional[str] = None
 
 
+class PredictionResult(BaseModel):
+    """Outcome of one prediction in a concurrent batch"""
+    index: int
+    chatflow_id: str
+    question: Optional[str] = None
+    success: bool = True
+    elapsed_seconds: float = 0.0
+    response: Optional[PredictionResponse] = None
+    error: Optional[str] = None
+
+
+class PredictionLatencyStats(BaseModel):
+    """Latency percentiles (seconds) and error rate of a chatflow's predictions"""
+    requests: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    timeouts: int = 0
+    error_rate: float = 0.0
+    mean: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
+    max: Optional[float] = None
+
+
+class PredictionBatchReport(BaseModel):
+    """Per-item results and per-chatflow latency statistics of a prediction batch"""
+    requests: int
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
+    requests_per_second: Optional[float] = None
+    chatflows: Dict[str, PredictionLatencyStats] = {}
+    results: List[PredictionResult] = []
+
+
+class StreamTiming(BaseModel):
+    """Latency breakdown of a streaming prediction, in seconds from request start"""
+    time_to_headers: Optional[float] = None
+    time_to_first_byte: Optional[float] = None
+    time_to_first_token: Optional[float] = None
+    total_time: Optional[float] = None
+    events: int = 0
+    tokens: int = 0
+    inter_token_gap_mean: Optional[float] = None
+    inter_token_gap_max: Optional[float] = None
+
+
 class ChatMessage(BaseModel):
     id: Optional[str] = None
     role: str
@@ -83,6 +134,26 @@ class ChatMessage(BaseModel):
     feedback: Optional[Dict[str, Any]] = None
 
 
+class ChatMessagePage(BaseModel):
+    """One bounded page of chat messages and the cursor for the next page"""
+    messages: List[ChatMessage]
+    next_cursor: Optional[str] = None
+
+
+class ExportReport(BaseModel):
+    """Outcome and throughput of a bulk chat history export"""
+    chatflows: int
+    failed_chatflows: int = 0
+    records: Dict[str, int] = {}
+    files: List[str] = []
+    bytes_written: int = 0
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    elapsed_seconds: float = 0.0
+    records_per_second: Optional[float] = None
+    errors: Dict[str, str] = {}
+
+
 class Attachment(BaseModel):
     id: Optional[str] = None
     chatflowId: str
@@ -175,12 +246,49 @@ class DocumentChunk(BaseModel):
 class VectorUpsertRequest(BaseModel):
     documents: Optional[List[Dict[str, Any]]] = None
     texts: Optional[List[str]] = None
-    embeddings: Optional[List[List[float]]] = None
+    # Lists of floats, 2-D NumPy arrays, typed arrays or float32 buffers, stored without boxing each value
+    embeddings: Optional[EmbeddingMatrix] = None
     metadata: Optional[List[Dict[str, Any]]] = None
     stopNodeId: Optional[str] = None
     overrideConfig: Optional[Dict[str, Any]] = None
 
 
+class DedupReport(BaseModel):
+    """Items and bytes sent vs. skipped by content-hash deduplication"""
+    items: int = 0
+    sent: int = 0
+    skipped: int = 0
+    bytes_sent: int = 0
+    bytes_skipped: int = 0
+
+
+class UpsertBatchResult(BaseModel):
+    """Outcome of one batch of a bulk document upsert"""
+    batch: int
+    documents: int
+    bytes: int
+    attempts: int = 1
+    success: bool = True
+    elapsed_seconds: float = 0.0
+    error: Optional[str] = None
+    result: Optional[Any] = None
+
+
+class BulkUpsertReport(BaseModel):
+    """Summary of a bulk document upsert"""
+    batches: int = 0
+    succeeded_batches: int = 0
+    failed_batches: int = 0
+    documents: int = 0
+    documents_upserted: int = 0
+    bytes_sent: int = 0
+    retries: int = 0
+    elapsed_seconds: float = 0.0
+    documents_per_second: Optional[float] = None
+    failures: List[UpsertBatchResult] = []
+    dedup: Optional[DedupReport] = None
+
+
 class UpsertHistory(BaseModel):
     id: Optional[str] = None
     chatflowid: str
@@ -0,0 +1,41 @@
+"""Field projections of response models
+
+A projection is a lightweight model holding only the requested fields of a
+response model. Validating API responses against it leaves every other key
+untouched, so listing hundreds of chatflows for their ids and names never
+walks a flow graph, loader list or source document.
+"""
+
+import copy
+import functools
+from typing import Optional, Iterable, FrozenSet, Type, Union
+
+from pydantic import BaseModel, create_model
+
+
+@functools.lru_cache(maxsize=256)
+def projection_model(model: Type[BaseModel], fields: FrozenSet[str]) -> Type[BaseModel]:
+    """Model with only `fields` of `model`, keeping their types, aliases and defaults"""
+    unknown = fields - set(model.model_fields)
+    if unknown:
+        raise ValueError(f"Unknown {model.__name__} fields: {', '.join(sorted(unknown))}")
+    if fields == set(model.model_fields):
+        return model
+    return create_model(
+        f"{model.__name__}Projection",
+        __doc__=f"{model.__name__} restricted to: {', '.join(sorted(fields))}",
+        **{
+            name: (field.annotation, copy.copy(field))
+            for name, field in model.model_fields.items() if name in fields
+        }
+    )
+
+
+def projection(model: Type[BaseModel], fields: Optional[Union[str, Iterable[str]]]) -> Type[BaseModel]:
+    """Resolve a `fields` argument (list or comma-separated string) to a model; None keeps the full model"""
+    if fields is None:
+        return model
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    selected = frozenset(name.strip() for name in fields if name.strip())
+    return projection_model(model, selected) if selected else model
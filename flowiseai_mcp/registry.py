@@ -0,0 +1,179 @@
+"""Keyed registry of FlowiseAI clients for serving many backends from one process"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import contextlib
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+from .client import FlowiseAIClient
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("client", "last_used")
+
+    def __init__(self, client: FlowiseAIClient):
+        self.client = client
+        self.last_used = time.monotonic()
+
+
+class ClientRegistry:
+    """LRU registry of FlowiseAIClient instances keyed by URL and API key hash
+
+    Each distinct backend/credential pair gets its own client and connection pool.
+    Least recently used clients are evicted once `max_clients` is reached, and
+    clients idle for longer than `idle_timeout` seconds are closed by a background
+    reaper. A client leased by a running tool call, or with requests still in
+    flight, is never idle and is only closed once it drains.
+    """
+
+    def __init__(
+        self,
+        max_clients: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        **client_kwargs
+    ):
+        self.max_clients = max_clients or int(os.getenv("FLOWISEAI_MAX_CLIENTS", "64"))
+        self.idle_timeout = idle_timeout if idle_timeout is not None else float(
+            os.getenv("FLOWISEAI_CLIENT_IDLE_TIMEOUT", "300")
+        )
+        self.client_kwargs = client_kwargs
+        self._clients: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._retiring: List[FlowiseAIClient] = []
+        self._leases: Dict[FlowiseAIClient, int] = {}
+        self._lock = asyncio.Lock()
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._created = 0
+        self._evicted = 0
+        self._expired = 0
+
+    @staticmethod
+    def key_for(base_url: str, api_key: str) -> str:
+        """Build the registry key without keeping the raw API key around"""
+        key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else "anonymous"
+        return f"{base_url}#{key_hash}"
+
+    async def get(self, base_url: Optional[str] = None, api_key: Optional[str] = None) -> FlowiseAIClient:
+        """Return the client for a backend, creating it on first use"""
+        return await self._get(base_url, api_key, hold=False)
+
+    @contextlib.asynccontextmanager
+    async def lease(self, base_url: Optional[str] = None, api_key: Optional[str] = None) -> AsyncIterator[FlowiseAIClient]:
+        """Hold the client for a backend for a whole tool call, across all of its requests"""
+        client = await self._get(base_url, api_key, hold=True)
+        try:
+            yield client
+        finally:
+            count = self._leases[client] - 1
+            if count:
+                self._leases[client] = count
+            else:
+                del self._leases[client]
+            entry = self._clients.get(self.key_for(client.base_url, client.api_key))
+            if entry is not None and entry.client is client:
+                entry.last_used = time.monotonic()
+
+    def _busy(self, client: FlowiseAIClient) -> bool:
+        return bool(client._in_flight or self._leases.get(client))
+
+    async def _get(self, base_url: Optional[str], api_key: Optional[str], hold: bool) -> FlowiseAIClient:
+        url = FlowiseAIClient._normalize_url(base_url or os.getenv("FLOWISEAI_URL", "http://localhost:3000"))
+        api_key = api_key if api_key is not None else os.getenv("FLOWISEAI_API_KEY", "")
+        key = self.key_for(url, api_key)
+
+        async with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients.move_to_end(key)
+                entry.last_used = time.monotonic()
+                if hold:
+                    self._leases[entry.client] = self._leases.get(entry.client, 0) + 1
+                return entry.client
+
+            while len(self._clients) >= self.max_clients:
+                _, evicted = self._clients.popitem(last=False)
+                self._evicted += 1
+                await self._retire(evicted.client)
+
+            client = FlowiseAIClient(base_url=url, api_key=api_key, **self.client_kwargs)
+            self._clients[key] = _Entry(client)
+            if hold:
+                self._leases[client] = 1
+            self._created += 1
+            logger.debug(f"Created FlowiseAI client for {url}")
+            return client
+
+    async def _retire(self, client: FlowiseAIClient):
+        """Close a client now, or once its leases and in-flight requests are released"""
+        if self._busy(client):
+            self._retiring.append(client)
+        else:
+            await client.close()
+
+    async def close_idle(self) -> int:
+        """Close clients idle past the timeout and drained retired clients"""
+        closed = 0
+        async with self._lock:
+            now = time.monotonic()
+            idle = [k for k, e in self._clients.items()
+                    if now - e.last_used > self.idle_timeout and not self._busy(e.client)]
+            for key in idle:
+                entry = self._clients.pop(key)
+                self._expired += 1
+                await self._retire(entry.client)
+
+            drained = [c for c in self._retiring if not self._busy(c)]
+            self._retiring = [c for c in self._retiring if self._busy(c)]
+            for client in drained:
+                await client.close()
+                closed += 1
+        return closed
+
+    async def start(self):
+        """Start the background idle reaper"""
+        if self._reaper_task is None and self.idle_timeout > 0:
+            self._reaper_task = asyncio.create_task(self._reap())
+
+    async def _reap(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 60.0))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.close_idle()
+            except Exception as e:
+                logger.error(f"Client reaper failed: {e}")
+
+    async def close(self):
+        """Stop the reaper and close every client"""
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+        async with self._lock:
+            clients = [e.client for e in self._clients.values()] + self._retiring
+            self._clients.clear()
+            self._retiring = []
+        for client in clients:
+            await client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate registry counters without exposing tenant URLs or keys"""
+        return {
+            "live_clients": len(self._clients),
+            "retiring_clients": len(self._retiring),
+            "max_clients": self.max_clients,
+            "idle_timeout": self.idle_timeout,
+            "created": self._created,
+            "evicted": self._evicted,
+            "expired": self._expired,
+            "leased_clients": len(self._leases),
+            "in_flight_requests": sum(e.client._in_flight for e in self._clients.values())
+        }
@@ -0,0 +1,181 @@
+"""Retry, backoff and circuit breaking for FlowiseAI requests"""
+
+import time
+import random
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: the request did not take effect or the server asked us to come back
+RETRYABLE_STATUSES = frozenset({408, 429, 502, 503, 504})
+
+# Methods that can be repeated without changing the outcome
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Endpoints whose failures usually come from the one chatflow or store they run,
+# so they get a circuit per id rather than one for the whole endpoint
+SCOPED_ENDPOINTS = ("prediction", "vector/upsert", "document-store/upsert", "document-store/refresh")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling FlowiseAI while an endpoint's circuit is open"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Idempotency-aware retries with full-jitter exponential backoff"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 5.0,
+        max_retry_after: float = 30.0,
+        retry_post: bool = False
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.retry_post = retry_post
+
+    def allows(self, method: str, opt_in: Optional[bool] = None) -> bool:
+        """Whether a request may be retried at all"""
+        if opt_in is not None:
+            return opt_in
+        return method in IDEMPOTENT_METHODS or (self.retry_post and method == "POST")
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before retry number `attempt` (1-based), or None to give up"""
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_started = None
+        # Let one probe through; start another if the previous one never reported back
+        if self.state == self.HALF_OPEN and (
+            self._probe_started is None or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probe_started = now
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failure_threshold <= 0:
+            return
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_started = None
+
+
+class Resilience:
+    """Retry policy plus per-endpoint circuit breakers and their counters"""
+
+    def __init__(self, policy: RetryPolicy, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.policy = policy
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retries: Dict[str, int] = {}
+        self.exhausted = 0
+        self.short_circuited = 0
+
+    @staticmethod
+    def endpoint_key(endpoint: str) -> str:
+        """Group endpoints by their first path segment, e.g. /chatflows/123 -> /chatflows
+
+        Endpoints that run one chatflow or store keep its id, e.g.
+        /prediction/123 -> /prediction/123, so one broken flow does not open
+        the circuit for every other.
+        """
+        path = endpoint.lstrip("/").split("?", 1)[0]
+        for prefix in SCOPED_ENDPOINTS:
+            if path.startswith(prefix + "/"):
+                resource = path[len(prefix) + 1:].split("/", 1)[0]
+                return f"/{prefix}/{resource}"
+        return "/" + path.split("/", 1)[0]
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        key = self.endpoint_key(endpoint)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def check(self, endpoint: str) -> CircuitBreaker:
+        """Return the endpoint's breaker, failing fast if it is open"""
+        breaker = self.breaker(endpoint)
+        if self.failure_threshold > 0 and not breaker.allow():
+            self.short_circuited += 1
+            raise CircuitOpenError(
+                f"FlowiseAI endpoint {self.endpoint_key(endpoint)} is unavailable "
+                f"(circuit open, retry in {breaker.retry_in():.0f}s)"
+            )
+        return breaker
+
+    def record_retry(self, endpoint: str):
+        key = self.endpoint_key(endpoint)
+        self.retries[key] = self.retries.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_attempts": self.policy.max_attempts,
+            "retry_post": self.policy.retry_post,
+            "retries": dict(self.retries),
+            "retries_exhausted": self.exhausted,
+            "short_circuited": self.short_circuited,
+            "circuits": {
+                key: {"state": b.state, "consecutive_failures": b.failures, "times_opened": b.times_opened}
+                for key, b in self.breakers.items()
+            },
+            "open_circuits": sorted(k for k, b in self.breakers.items() if b.state != CircuitBreaker.CLOSED)
+        }
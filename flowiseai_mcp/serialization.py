@@ -0,0 +1,66 @@
+"""Single-pass JSON serialization of tool results
+
+Models are serialized by pydantic's Rust serializer (`model_dump_json`), and
+homogeneous lists of models through a cached `TypeAdapter`, so results are
+written in one pass without building intermediate dicts. Plain Python results
+use orjson when it is installed and the standard library otherwise.
+"""
+
+import json
+import logging
+import functools
+from typing import Any, List, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+@functools.lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Compiled serializer for List[model], built once per model class"""
+    return TypeAdapter(List[model])
+
+
+def dumps_plain(value: Any) -> str:
+    """Serialize dicts, lists and scalars, stringifying anything JSON cannot represent"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str, option=_ORJSON_OPTIONS).decode("utf-8")
+        except TypeError:
+            # e.g. integers wider than 64 bits; the stdlib handles those
+            pass
+    return json.dumps(value, default=str)
+
+
+def _dumps_models(result: Any) -> str:
+    if isinstance(result, BaseModel):
+        return result.model_dump_json()
+    model = type(result[0])
+    if all(type(item) is model for item in result):
+        return list_adapter(model).dump_json(result).decode("utf-8")
+    return "[" + ",".join(_dumps_models(item) if isinstance(item, BaseModel) else dumps_plain(item)
+                          for item in result) + "]"
+
+
+def serialize(result: Any) -> str:
+    """Render a tool result as JSON text; strings are passed through unchanged"""
+    if isinstance(result, str):
+        return result
+    if isinstance(result, BaseModel) or (isinstance(result, list) and result and isinstance(result[0], BaseModel)):
+        try:
+            return _dumps_models(result)
+        except Exception as e:
+            # Free-form fields may hold values pydantic cannot serialize; fall back to a lossy dump
+            logger.debug(f"Falling back to model_dump for serialization: {e}")
+            if isinstance(result, BaseModel):
+                return dumps_plain(result.model_dump())
+            return dumps_plain([r.model_dump() if isinstance(r, BaseModel) else r for r in result])
+    return dumps_plain(result)
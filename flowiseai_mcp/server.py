@@ -5,8 +5,8 @@ import sys
 import json
 import asyncio
 import socket
-from typing import Optional, List, Dict, Any, Union
-from contextlib import closing
+from typing import Optional, List, Dict, Any, Union, Callable, Tuple
+from contextlib import closing, asynccontextmanager
 import logging
 from dotenv import load_dotenv
 
@@ -15,12 +15,16 @@ from mcp.server.stdio import stdio_server
 from mcp.server.models import InitializationOptions
 from mcp.types import (
     Tool as MCPTool, TextContent, ImageContent, EmbeddedResource,
-    BlobResourceContents, TextResourceContents, ServerCapabilities
+    BlobResourceContents, TextResourceContents, ServerCapabilities,
+    Resource
 )
 
 from .client import FlowiseAIClient
+from .registry import ClientRegistry
+from .tools import TOOLS, ToolContext, tool_catalog
+from .metrics import METRICS
+from .tracing import start_span, TRACEPARENT_HEADER
 from .models import *
-from .models import Tool as FlowiseTool
 
 # Load environment variables
 load_dotenv()
@@ -49,885 +53,139 @@ def find_free_port() -> int:
 class FlowiseAIMCPServer:
     """MCP Server for FlowiseAI with complete API coverage"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        registry: Optional[ClientRegistry] = None,
+        credentials_resolver: Optional[Callable[[], Optional[Tuple[Optional[str], Optional[str]]]]] = None
+    ):
         self.server = Server("flowiseai-mcp")
         self.client: Optional[FlowiseAIClient] = None
+        # When a registry is set, each request is served by the client for its own credentials
+        self.registry = registry
+        self.credentials_resolver = credentials_resolver
         self.initialization_options = InitializationOptions(
             server_name="flowiseai-mcp",
             server_version="1.0.0",
             capabilities=ServerCapabilities()
         )
         self.setup_handlers()
+    
+    def _credentials(self) -> Tuple[Optional[str], Optional[str]]:
+        """Resolve the FlowiseAI URL and API key for the current request"""
+        if self.credentials_resolver:
+            credentials = self.credentials_resolver()
+            if credentials:
+                return credentials
+        return os.getenv("FLOWISEAI_URL"), os.getenv("FLOWISEAI_API_KEY")
+    
+    def _incoming_traceparent(self) -> Optional[str]:
+        """W3C traceparent of the HTTP request behind the current MCP call, if any"""
+        try:
+            request = self.server.request_context.request
+        except LookupError:
+            return None
+        headers = getattr(request, "headers", None)
+        return headers.get(TRACEPARENT_HEADER) if headers is not None else None
+    
+    @staticmethod
+    def _is_test_mode(api_key: Optional[str]) -> bool:
+        return not api_key or api_key == "test-key"
+    
+    async def _get_client(self, base_url: Optional[str], api_key: Optional[str]) -> FlowiseAIClient:
+        """Return the client for the resolved credentials"""
+        if self.registry:
+            return await self.registry.get(base_url, api_key)
+        if not self.client:
+            self.client = FlowiseAIClient()
+        return self.client
+    
+    @asynccontextmanager
+    async def _client_lease(self, base_url: Optional[str], api_key: Optional[str], test_mode: bool):
+        """The client for a tool call or status read, kept open by the registry until it returns"""
+        if test_mode:
+            yield None
+        elif self.registry:
+            async with self.registry.lease(base_url, api_key) as client:
+                yield client
+        else:
+            yield await self._get_client(base_url, api_key)
         
     def setup_handlers(self):
         """Setup all MCP handlers"""
         
-        # === Assistants Tools ===
-        
         @self.server.list_tools()
         async def list_tools() -> List[MCPTool]:
-            return [
-                # Assistant tools
-                MCPTool(
-                    name="assistant_create",
-                    description="Create a new assistant",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "description": {"type": "string"},
-                            "model": {"type": "string"},
-                            "prompt": {"type": "string"},
-                            "temperature": {"type": "number"},
-                            "max_tokens": {"type": "integer"},
-                            "tools": {"type": "array", "items": {"type": "string"}}
-                        },
-                        "required": ["name"]
-                    }
-                ),
-                MCPTool(
-                    name="assistant_list",
-                    description="List all assistants",
-                    inputSchema={"type": "object", "properties": {}}
-                ),
-                MCPTool(
-                    name="assistant_get",
-                    description="Get an assistant by ID",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"id": {"type": "string"}},
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="assistant_update",
-                    description="Update an assistant",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "string"},
-                            "name": {"type": "string"},
-                            "description": {"type": "string"},
-                            "model": {"type": "string"},
-                            "prompt": {"type": "string"},
-                            "temperature": {"type": "number"},
-                            "max_tokens": {"type": "integer"}
-                        },
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="assistant_delete",
-                    description="Delete an assistant",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"id": {"type": "string"}},
-                        "required": ["id"]
-                    }
-                ),
-                
-                # Chatflow tools
-                MCPTool(
-                    name="chatflow_create",
-                    description="Create a new chatflow",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "flowData": {"type": "object"},
-                            "deployed": {"type": "boolean"},
-                            "isPublic": {"type": "boolean"},
-                            "category": {"type": "string"}
-                        },
-                        "required": ["name"]
-                    }
-                ),
-                MCPTool(
-                    name="chatflow_list",
-                    description="List all chatflows",
-                    inputSchema={"type": "object", "properties": {}}
-                ),
-                MCPTool(
-                    name="chatflow_get",
-                    description="Get a chatflow by ID",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"id": {"type": "string"}},
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="chatflow_get_by_apikey",
-                    description="Get a chatflow by API key",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"apikey": {"type": "string"}},
-                        "required": ["apikey"]
-                    }
-                ),
-                MCPTool(
-                    name="chatflow_update",
-                    description="Update a chatflow including flowData, deployed status, and isPublic",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "string"},
-                            "name": {"type": "string"},
-                            "flowData": {"type": "object"},
-                            "deployed": {"type": "boolean"},
-                            "isPublic": {"type": "boolean"}
-                        },
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="chatflow_delete",
-                    description="Delete a chatflow",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"id": {"type": "string"}},
-                        "required": ["id"]
-                    }
-                ),
-                
-                # Prediction tools
-                MCPTool(
-                    name="prediction_run",
-                    description="Run a prediction on a chatflow with support for question, form (AgentFlow V2), streaming, overrideConfig, history, uploads, and humanInput",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "chatflow_id": {"type": "string"},
-                            "question": {"type": "string"},
-                            "form": {"type": "object", "description": "AgentFlow V2 form inputs"},
-                            "streaming": {"type": "boolean"},
-                            "overrideConfig": {
-                                "type": "object",
-                                "properties": {
-                                    "sessionId": {"type": "string"},
-                                    "vars": {"type": "object"},
-                                    "temperature": {"type": "number"},
-                                    "maxTokens": {"type": "integer"}
-                                }
-                            },
-                            "history": {"type": "array", "items": {"type": "object"}},
-                            "uploads": {"type": "array", "items": {"type": "object"}},
-                            "humanInput": {"type": "string", "description": "Human-in-the-loop input"},
-                            "chatId": {"type": "string"}
-                        },
-                        "required": ["chatflow_id"]
-                    }
-                ),
-                MCPTool(
-                    name="prediction_stream",
-                    description="Run a streaming prediction on a chatflow",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "chatflow_id": {"type": "string"},
-                            "question": {"type": "string"},
-                            "form": {"type": "object"},
-                            "overrideConfig": {"type": "object"},
-                            "history": {"type": "array"},
-                            "uploads": {"type": "array"},
-                            "sessionId": {"type": "string"}
-                        },
-                        "required": ["chatflow_id"]
-                    }
-                ),
-                
-                # Chat Message tools
-                MCPTool(
-                    name="chatmessage_list",
-                    description="List chat messages for a chatflow with filters",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "chatflow_id": {"type": "string"},
-                            "chatType": {"type": "string", "enum": ["INTERNAL", "EXTERNAL"]},
-                            "order": {"type": "string", "enum": ["ASC", "DESC"]},
-                            "chatId": {"type": "string"},
-                            "memoryType": {"type": "string"},
-                            "sessionId": {"type": "string"},
-                            "startDate": {"type": "string"},
-                            "endDate": {"type": "string"},
-                            "feedback": {"type": "boolean"},
-                            "limit": {"type": "integer"},
-                            "offset": {"type": "integer"}
-                        },
-                        "required": ["chatflow_id"]
-                    }
-                ),
-                MCPTool(
-                    name="chatmessage_delete_all",
-                    description="Delete all chat messages for a chatflow",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"chatflow_id": {"type": "string"}},
-                        "required": ["chatflow_id"]
-                    }
-                ),
-                
-                # Attachment tools
-                MCPTool(
-                    name="attachment_create",
-                    description="Create attachments for a chatflow/chat session",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "chatflow_id": {"type": "string"},
-                            "chat_id": {"type": "string"},
-                            "attachments": {"type": "array"},
-                            "return_base64": {"type": "boolean"}
-                        },
-                        "required": ["chatflow_id", "chat_id", "attachments"]
-                    }
-                ),
-                
-                # Feedback tools
-                MCPTool(
-                    name="feedback_list",
-                    description="List feedback for a chatflow",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"chatflow_id": {"type": "string"}},
-                        "required": ["chatflow_id"]
-                    }
-                ),
-                MCPTool(
-                    name="feedback_create",
-                    description="Create feedback",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "chatflowid": {"type": "string"},
-                            "chatId": {"type": "string"},
-                            "messageId": {"type": "string"},
-                            "rating": {"type": "integer", "minimum": 1, "maximum": 5},
-                            "content": {"type": "string"}
-                        },
-                        "required": ["chatflowid", "chatId"]
-                    }
-                ),
-                MCPTool(
-                    name="feedback_update",
-                    description="Update feedback",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "string"},
-                            "rating": {"type": "integer"},
-                            "content": {"type": "string"}
-                        },
-                        "required": ["id"]
-                    }
-                ),
-                
-                # Lead tools
-                MCPTool(
-                    name="lead_list",
-                    description="List leads for a chatflow",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"chatflow_id": {"type": "string"}},
-                        "required": ["chatflow_id"]
-                    }
-                ),
-                MCPTool(
-                    name="lead_create",
-                    description="Create a lead",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "chatflowid": {"type": "string"},
-                            "chatId": {"type": "string"},
-                            "name": {"type": "string"},
-                            "email": {"type": "string"},
-                            "phone": {"type": "string"}
-                        },
-                        "required": ["chatflowid", "chatId"]
-                    }
-                ),
-                
-                # Custom Tool tools
-                MCPTool(
-                    name="tool_create",
-                    description="Create a custom tool with schema and function",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "description": {"type": "string"},
-                            "schema": {"type": "object"},
-                            "func": {"type": "string"}
-                        },
-                        "required": ["name"]
-                    }
-                ),
-                MCPTool(
-                    name="tool_list",
-                    description="List all custom tools",
-                    inputSchema={"type": "object", "properties": {}}
-                ),
-                MCPTool(
-                    name="tool_get",
-                    description="Get a custom tool by ID",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"id": {"type": "string"}},
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="tool_update",
-                    description="Update a custom tool",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "string"},
-                            "name": {"type": "string"},
-                            "description": {"type": "string"},
-                            "schema": {"type": "object"},
-                            "func": {"type": "string"}
-                        },
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="tool_delete",
-                    description="Delete a custom tool",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"id": {"type": "string"}},
-                        "required": ["id"]
-                    }
-                ),
-                
-                # Variable tools
-                MCPTool(
-                    name="variable_create",
-                    description="Create a runtime variable",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "value": {},
-                            "type": {"type": "string"}
-                        },
-                        "required": ["name", "value"]
-                    }
-                ),
-                MCPTool(
-                    name="variable_list",
-                    description="List all variables",
-                    inputSchema={"type": "object", "properties": {}}
-                ),
-                MCPTool(
-                    name="variable_update",
-                    description="Update a variable",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "string"},
-                            "name": {"type": "string"},
-                            "value": {},
-                            "type": {"type": "string"}
-                        },
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="variable_delete",
-                    description="Delete a variable",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"id": {"type": "string"}},
-                        "required": ["id"]
-                    }
-                ),
-                
-                # Document Store tools
-                MCPTool(
-                    name="docstore_list",
-                    description="List all document stores",
-                    inputSchema={"type": "object", "properties": {}}
-                ),
-                MCPTool(
-                    name="docstore_get",
-                    description="Get a document store by ID",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"id": {"type": "string"}},
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="docstore_create",
-                    description="Create a new document store",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "description": {"type": "string"},
-                            "loaders": {"type": "array"},
-                            "vectorStoreConfig": {"type": "object"},
-                            "embeddingConfig": {"type": "object"},
-                            "recordManagerConfig": {"type": "object"}
-                        },
-                        "required": ["name"]
-                    }
-                ),
-                MCPTool(
-                    name="docstore_upsert",
-                    description="Upsert documents to a document store",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "store_id": {"type": "string"},
-                            "documents": {"type": "array"}
-                        },
-                        "required": ["store_id", "documents"]
-                    }
-                ),
-                MCPTool(
-                    name="docstore_refresh",
-                    description="Refresh/reprocess all documents in a store",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"store_id": {"type": "string"}},
-                        "required": ["store_id"]
-                    }
-                ),
-                MCPTool(
-                    name="docstore_get_chunks",
-                    description="Get loader chunks from a document store",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "store_id": {"type": "string"},
-                            "loader_id": {"type": "string"}
-                        },
-                        "required": ["store_id", "loader_id"]
-                    }
-                ),
-                MCPTool(
-                    name="docstore_update_chunk",
-                    description="Update a document chunk",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "store_id": {"type": "string"},
-                            "chunk_id": {"type": "string"},
-                            "pageContent": {"type": "string"},
-                            "metadata": {"type": "object"}
-                        },
-                        "required": ["store_id", "chunk_id"]
-                    }
-                ),
-                MCPTool(
-                    name="docstore_update",
-                    description="Update a document store",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "string"},
-                            "name": {"type": "string"},
-                            "description": {"type": "string"}
-                        },
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="docstore_delete",
-                    description="Delete a document store",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"id": {"type": "string"}},
-                        "required": ["id"]
-                    }
-                ),
-                MCPTool(
-                    name="docstore_delete_chunk",
-                    description="Delete a document chunk",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "store_id": {"type": "string"},
-                            "chunk_id": {"type": "string"}
-                        },
-                        "required": ["store_id", "chunk_id"]
-                    }
-                ),
-                MCPTool(
-                    name="docstore_delete_loader",
-                    description="Delete a loader and all its chunks",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "store_id": {"type": "string"},
-                            "loader_id": {"type": "string"}
-                        },
-                        "required": ["store_id", "loader_id"]
-                    }
-                ),
-                
-                # Vector tools
-                MCPTool(
-                    name="vector_upsert",
-                    description="Upsert embeddings to vector store for a chatflow",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "chatflow_id": {"type": "string"},
-                            "documents": {"type": "array"},
-                            "texts": {"type": "array"},
-                            "embeddings": {"type": "array"},
-                            "metadata": {"type": "array"},
-                            "stopNodeId": {"type": "string"},
-                            "overrideConfig": {"type": "object"}
-                        },
-                        "required": ["chatflow_id"]
-                    }
-                ),
-                
-                # Upsert History tools
-                MCPTool(
-                    name="upsert_history_list",
-                    description="Retrieve upsert history for a chatflow",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "chatflow_id": {"type": "string"},
-                            "order": {"type": "string", "enum": ["ASC", "DESC"]},
-                            "startDate": {"type": "string"},
-                            "endDate": {"type": "string"}
-                        },
-                        "required": ["chatflow_id"]
-                    }
-                ),
-                MCPTool(
-                    name="upsert_history_delete",
-                    description="Soft-delete upsert history records",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {"history_id": {"type": "string"}},
-                        "required": ["history_id"]
-                    }
-                ),
-                
-                # Health check
-                MCPTool(
-                    name="ping",
-                    description="Health check endpoint",
-                    inputSchema={"type": "object", "properties": {}}
-                )
-            ]
+            # The catalog is built once; hand out a copy so the SDK cannot mutate it
+            return list(tool_catalog())
         
         @self.server.call_tool()
         async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Union[TextContent, ImageContent]]:
             """Execute tool calls"""
+            spec = TOOLS.get(name)
+            if spec is None:
+                return [TextContent(type="text", text=f"Unknown tool: {name}")]
             
-            # Handle ping without client for test mode
-            if name == "ping":
-                # Check if we're in test mode (no API key)
-                if not os.getenv("FLOWISEAI_API_KEY") or os.getenv("FLOWISEAI_API_KEY") == "test-key":
-                    return [TextContent(type="text", text="pong (test mode)")]
-                
-                # Otherwise try real ping
-                if not self.client:
-                    self.client = FlowiseAIClient()
-                try:
-                    result = await self.client.ping()
-                    return [TextContent(type="text", text=result)]
-                except:
-                    return [TextContent(type="text", text="pong (offline)")]
+            base_url, api_key = self._credentials()
+            test_mode = self._is_test_mode(api_key)
             
-            # For all other tools, create client if needed
-            if not self.client:
-                # Check if we're in test mode
-                if not os.getenv("FLOWISEAI_API_KEY") or os.getenv("FLOWISEAI_API_KEY") == "test-key":
-                    return [TextContent(type="text", text=f"Tool '{name}' unavailable in test mode. Please configure FLOWISEAI_API_KEY.")]
-                self.client = FlowiseAIClient()
+            # Check test mode before creating a client
+            if test_mode and spec.requires_client:
+                return [TextContent(type="text", text=f"Tool '{name}' unavailable in test mode. Please configure FLOWISEAI_API_KEY.")]
             
-            try:
-                # Assistant operations
-                if name == "assistant_create":
-                    assistant = Assistant(**arguments)
-                    result = await self.client.create_assistant(assistant)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "assistant_list":
-                    results = await self.client.list_assistants()
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "assistant_get":
-                    result = await self.client.get_assistant(arguments["id"])
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "assistant_update":
-                    assistant_id = arguments.pop("id")
-                    assistant = Assistant(**arguments)
-                    result = await self.client.update_assistant(assistant_id, assistant)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "assistant_delete":
-                    await self.client.delete_assistant(arguments["id"])
-                    return [TextContent(type="text", text="Assistant deleted successfully")]
-                
-                # Chatflow operations
-                elif name == "chatflow_create":
-                    chatflow = Chatflow(**arguments)
-                    result = await self.client.create_chatflow(chatflow)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "chatflow_list":
-                    results = await self.client.list_chatflows()
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "chatflow_get":
-                    result = await self.client.get_chatflow(arguments["id"])
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "chatflow_get_by_apikey":
-                    result = await self.client.get_chatflow_by_apikey(arguments["apikey"])
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "chatflow_update":
-                    chatflow_id = arguments.pop("id")
-                    chatflow = Chatflow(**arguments)
-                    result = await self.client.update_chatflow(chatflow_id, chatflow)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "chatflow_delete":
-                    await self.client.delete_chatflow(arguments["id"])
-                    return [TextContent(type="text", text="Chatflow deleted successfully")]
-                
-                # Prediction operations
-                elif name == "prediction_run":
-                    chatflow_id = arguments.pop("chatflow_id")
-                    request = PredictionRequest(**arguments)
-                    
-                    if request.streaming:
-                        chunks = []
-                        async for chunk in await self.client.predict(chatflow_id, request):
-                            chunks.append(chunk)
-                        return [TextContent(type="text", text="\\n".join(chunks))]
-                    else:
-                        result = await self.client.predict(chatflow_id, request)
-                        return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "prediction_stream":
-                    chatflow_id = arguments.pop("chatflow_id")
-                    request = PredictionRequest(**arguments)
-                    chunks = []
-                    async for chunk in self.client.predict_streaming(chatflow_id, request):
-                        chunks.append(chunk)
-                    return [TextContent(type="text", text="\\n".join(chunks))]
-                
-                # Chat Message operations
-                elif name == "chatmessage_list":
-                    chatflow_id = arguments.pop("chatflow_id")
-                    chat_type = ChatType(arguments.pop("chatType")) if "chatType" in arguments else None
-                    memory_type = MemoryType(arguments.pop("memoryType")) if "memoryType" in arguments else None
-                    
-                    results = await self.client.list_chat_messages(
-                        chatflow_id,
-                        chat_type=chat_type,
-                        memory_type=memory_type,
-                        **arguments
-                    )
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "chatmessage_delete_all":
-                    await self.client.delete_chat_messages(arguments["chatflow_id"])
-                    return [TextContent(type="text", text="All chat messages deleted successfully")]
-                
-                # Attachment operations
-                elif name == "attachment_create":
-                    results = await self.client.create_attachments(
-                        arguments["chatflow_id"],
-                        arguments["chat_id"],
-                        arguments["attachments"],
-                        arguments.get("return_base64", False)
-                    )
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                # Feedback operations
-                elif name == "feedback_list":
-                    results = await self.client.list_feedback(arguments["chatflow_id"])
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "feedback_create":
-                    feedback = Feedback(**arguments)
-                    result = await self.client.create_feedback(feedback)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "feedback_update":
-                    feedback_id = arguments.pop("id")
-                    feedback = Feedback(**arguments)
-                    result = await self.client.update_feedback(feedback_id, feedback)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                # Lead operations
-                elif name == "lead_list":
-                    results = await self.client.list_leads(arguments["chatflow_id"])
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "lead_create":
-                    lead = Lead(**arguments)
-                    result = await self.client.create_lead(lead)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                # Custom Tool operations
-                elif name == "tool_create":
-                    tool = FlowiseTool(**arguments)
-                    result = await self.client.create_tool(tool)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "tool_list":
-                    results = await self.client.list_tools()
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "tool_get":
-                    result = await self.client.get_tool(arguments["id"])
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "tool_update":
-                    tool_id = arguments.pop("id")
-                    tool = FlowiseTool(**arguments)
-                    result = await self.client.update_tool(tool_id, tool)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "tool_delete":
-                    await self.client.delete_tool(arguments["id"])
-                    return [TextContent(type="text", text="Tool deleted successfully")]
-                
-                # Variable operations
-                elif name == "variable_create":
-                    variable = Variable(**arguments)
-                    result = await self.client.create_variable(variable)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "variable_list":
-                    results = await self.client.list_variables()
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "variable_update":
-                    variable_id = arguments.pop("id")
-                    variable = Variable(**arguments)
-                    result = await self.client.update_variable(variable_id, variable)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "variable_delete":
-                    await self.client.delete_variable(arguments["id"])
-                    return [TextContent(type="text", text="Variable deleted successfully")]
-                
-                # Document Store operations
-                elif name == "docstore_list":
-                    results = await self.client.list_document_stores()
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "docstore_get":
-                    result = await self.client.get_document_store(arguments["id"])
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "docstore_create":
-                    store = DocumentStore(**arguments)
-                    result = await self.client.create_document_store(store)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "docstore_upsert":
-                    result = await self.client.upsert_document(arguments["store_id"], arguments["documents"])
-                    return [TextContent(type="text", text=json.dumps(result, default=str))]
-                
-                elif name == "docstore_refresh":
-                    result = await self.client.refresh_document_store(arguments["store_id"])
-                    return [TextContent(type="text", text=json.dumps(result, default=str))]
-                
-                elif name == "docstore_get_chunks":
-                    results = await self.client.get_document_chunks(arguments["store_id"], arguments["loader_id"])
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "docstore_update_chunk":
-                    store_id = arguments.pop("store_id")
-                    chunk_id = arguments.pop("chunk_id")
-                    chunk = DocumentChunk(**arguments)
-                    result = await self.client.update_document_chunk(store_id, chunk_id, chunk)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "docstore_update":
-                    store_id = arguments.pop("id")
-                    store = DocumentStore(**arguments)
-                    result = await self.client.update_document_store(store_id, store)
-                    return [TextContent(type="text", text=json.dumps(result.model_dump(), default=str))]
-                
-                elif name == "docstore_delete":
-                    await self.client.delete_document_store(arguments["id"])
-                    return [TextContent(type="text", text="Document store deleted successfully")]
-                
-                elif name == "docstore_delete_chunk":
-                    await self.client.delete_document_chunk(arguments["store_id"], arguments["chunk_id"])
-                    return [TextContent(type="text", text="Document chunk deleted successfully")]
-                
-                elif name == "docstore_delete_loader":
-                    await self.client.delete_document_loader(arguments["store_id"], arguments["loader_id"])
-                    return [TextContent(type="text", text="Document loader and chunks deleted successfully")]
-                
-                # Vector operations
-                elif name == "vector_upsert":
-                    chatflow_id = arguments.pop("chatflow_id")
-                    request = VectorUpsertRequest(**arguments)
-                    result = await self.client.vector_upsert(chatflow_id, request)
-                    return [TextContent(type="text", text=json.dumps(result, default=str))]
-                
-                # Upsert History operations
-                elif name == "upsert_history_list":
-                    chatflow_id = arguments.pop("chatflow_id")
-                    results = await self.client.list_upsert_history(chatflow_id, **arguments)
-                    return [TextContent(type="text", text=json.dumps([r.model_dump() for r in results], default=str))]
-                
-                elif name == "upsert_history_delete":
-                    await self.client.delete_upsert_history(arguments["history_id"])
-                    return [TextContent(type="text", text="Upsert history deleted successfully")]
-                
-                else:
-                    return [TextContent(type="text", text=f"Unknown tool: {name}")]
-                    
-            except Exception as e:
-                logger.error(f"Tool execution error: {str(e)}")
-                return [TextContent(type="text", text=f"Error: {str(e)}")]
+            async with self._client_lease(base_url, api_key, test_mode) as client:
+                span = start_span(f"tools/call {name}", "SERVER", {
+                    "mcp.method.name": "tools/call",
+                    "gen_ai.tool.name": name,
+                    "flowiseai.test_mode": test_mode
+                }, traceparent=self._incoming_traceparent())
+                try:
+                    with span:
+                        context = ToolContext(self.server, client, test_mode, multi_tenant=self.registry is not None)
+                        text = await spec.invoke(context, arguments or {})
+                        span.set_attribute("flowiseai.response.size", len(text))
+                    return [TextContent(type="text", text=text)]
+                except Exception as e:
+                    logger.error(f"Tool execution error: {str(e)}")
+                    return [TextContent(type="text", text=f"Error: {str(e)}")]
         
         # Resources for configuration and status
         @self.server.list_resources()
-        async def list_resources() -> List[str]:
+        async def list_resources() -> List[Resource]:
             return [
-                "config://server",
-                "status://connection",
-                "status://health"
+                Resource(uri="config://server", name="Server configuration", mimeType="application/json"),
+                Resource(uri="status://connection", name="FlowiseAI connection status", mimeType="application/json"),
+                Resource(uri="status://health", name="Server health", mimeType="application/json"),
+                Resource(uri="status://pool", name="Connection pool status", mimeType="application/json"),
+                Resource(uri="status://cache", name="Response cache statistics", mimeType="application/json"),
+                Resource(uri="status://resilience", name="Retry and circuit breaker status", mimeType="application/json"),
+                Resource(uri="status://metrics", name="Prometheus metrics of this process", mimeType="text/plain")
             ]
         
         @self.server.read_resource()
         async def read_resource(uri: str) -> str:
+            # The MCP SDK passes a URL object, so compare on its string form
+            uri = str(uri)
+            base_url, api_key = self._credentials()
+            
             if uri == "config://server":
                 config = {
-                    "base_url": os.getenv("FLOWISEAI_URL", "http://localhost:3000"),
-                    "api_key": "***" if os.getenv("FLOWISEAI_API_KEY") else "Not set",
-                    "test_mode": not os.getenv("FLOWISEAI_API_KEY") or os.getenv("FLOWISEAI_API_KEY") == "test-key"
+                    "base_url": base_url or "http://localhost:3000",
+                    "api_key": "***" if api_key else "Not set",
+                    "test_mode": self._is_test_mode(api_key)
                 }
                 return json.dumps(config, indent=2)
             
             elif uri == "status://connection":
                 # Check if we're in test mode
-                if not os.getenv("FLOWISEAI_API_KEY") or os.getenv("FLOWISEAI_API_KEY") == "test-key":
+                if self._is_test_mode(api_key):
                     return json.dumps({"status": "test_mode", "message": "Running in test mode without FlowiseAI connection"})
                 
-                if not self.client:
-                    self.client = FlowiseAIClient()
-                try:
-                    result = await self.client.ping()
-                    return json.dumps({"status": "connected", "message": result})
-                except:
-                    return json.dumps({"status": "disconnected", "message": "Unable to connect to FlowiseAI"})
+                async with self._client_lease(base_url, api_key, False) as client:
+                    try:
+                        result = await client.ping()
+                        return json.dumps({"status": "connected", "message": result})
+                    except:
+                        return json.dumps({"status": "disconnected", "message": "Unable to connect to FlowiseAI"})
             
             elif uri == "status://health":
                 return json.dumps({
@@ -938,9 +196,34 @@ class FlowiseAIMCPServer:
                         "agentflow_v2", "document_store", "vector_operations",
                         "uploads", "hitl", "session_management"
                     ],
-                    "test_mode": not os.getenv("FLOWISEAI_API_KEY") or os.getenv("FLOWISEAI_API_KEY") == "test-key"
+                    "test_mode": self._is_test_mode(api_key)
                 })
             
+            elif uri == "status://pool":
+                if self.registry:
+                    # Only the caller's own pool is shown, never other tenants'
+                    stats = {"registry": self.registry.stats()}
+                    if not self._is_test_mode(api_key):
+                        async with self._client_lease(base_url, api_key, False) as client:
+                            stats["pool"] = client.pool_stats()
+                    return json.dumps(stats, indent=2)
+                if not self.client:
+                    return json.dumps({"status": "idle", "message": "No FlowiseAI client has been created yet"})
+                return json.dumps(self.client.pool_stats(), indent=2)
+            
+            elif uri == "status://metrics":
+                return METRICS.render()
+            
+            elif uri in ("status://cache", "status://resilience"):
+                if self.registry:
+                    if self._is_test_mode(api_key):
+                        return json.dumps({"status": "test_mode", "message": "No FlowiseAI client in test mode"})
+                elif not self.client:
+                    return json.dumps({"status": "idle", "message": "No FlowiseAI client has been created yet"})
+                async with self._client_lease(base_url, api_key, False) as client:
+                    stats = client.cache_stats() if uri == "status://cache" else client.resilience_stats()
+                return json.dumps(stats, indent=2)
+            
             return ""
     
     async def run(self):
@@ -952,6 +235,8 @@ class FlowiseAIMCPServer:
         """Cleanup resources"""
         if self.client:
             await self.client.close()
+        if self.registry:
+            await self.registry.close()
 
 
 def main():
@@ -0,0 +1,133 @@
+"""Event stores for resumable Streamable HTTP streams
+
+The MCP SDK keeps live sessions in process memory; what it lets us plug in is
+the event store behind SSE resumability. `SQLiteEventStore` records every
+message sent on a stream so a client reconnecting with `Last-Event-ID` gets
+the progress notifications and results it missed. `:memory:` keeps events
+per process; a file path also keeps them across restarts. Stateful mode runs
+a single worker, so the store is never shared between processes. SQLite calls
+run in a worker thread so a slow disk or a locked file never stalls the
+event loop.
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+
+from mcp.server.streamable_http import EventCallback, EventId, EventMessage, EventStore, StreamId
+from mcp.types import JSONRPCMessage
+
+logger = logging.getLogger(__name__)
+
+# Prune expired events at most this often (seconds)
+_PRUNE_INTERVAL = 60.0
+
+
+class SQLiteEventStore(EventStore):
+    """SQLite-backed EventStore; event ids are row ids, so they stay unique across restarts"""
+
+    def __init__(self, path: str = ":memory:", ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl if ttl is not None else float(os.getenv("FLOWISEAI_SESSION_EVENT_TTL", "3600"))
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, stream_id TEXT NOT NULL,"
+            " message TEXT, created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_stream ON events (stream_id, id)")
+        self._db.commit()
+        self._last_prune = time.monotonic()
+        self._stored = 0
+        self._replayed = 0
+
+    async def store_event(self, stream_id: StreamId, message: Optional[JSONRPCMessage]) -> EventId:
+        """Append a message (None for a priming event) and return its event id"""
+        body = message.model_dump_json(by_alias=True, exclude_none=True) if message is not None else None
+        event_id = await asyncio.to_thread(self._insert, stream_id, body)
+        self._stored += 1
+        return str(event_id)
+
+    def _insert(self, stream_id: str, body: Optional[str]) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO events (stream_id, message, created) VALUES (?, ?, ?)", (stream_id, body, time.time())
+            )
+            self._db.commit()
+        if time.monotonic() - self._last_prune > _PRUNE_INTERVAL:
+            self.prune()
+        return cursor.lastrowid
+
+    async def replay_events_after(self, last_event_id: EventId, send_callback: EventCallback) -> Optional[StreamId]:
+        """Send every message stored on the same stream after `last_event_id`"""
+        try:
+            last_id = int(last_event_id)
+        except ValueError:
+            logger.warning(f"Ignoring malformed Last-Event-ID: {last_event_id[:64]}")
+            return None
+        found = await asyncio.to_thread(self._events_after, last_id)
+        if found is None:
+            logger.warning(f"Event {last_id} not found, nothing to replay")
+            return None
+        stream_id, rows = found
+        for event_id, body in rows:
+            if body is None:
+                continue
+            await send_callback(EventMessage(JSONRPCMessage.model_validate_json(body), str(event_id)))
+            self._replayed += 1
+        return stream_id
+
+    def _events_after(self, last_id: int) -> Optional[Tuple[str, List[Tuple[int, Optional[str]]]]]:
+        with self._lock:
+            row = self._db.execute("SELECT stream_id FROM events WHERE id = ?", (last_id,)).fetchone()
+            if row is None:
+                return None
+            rows = self._db.execute(
+                "SELECT id, message FROM events WHERE stream_id = ? AND id > ? ORDER BY id", (row[0], last_id)
+            ).fetchall()
+        return row[0], rows
+
+    def prune(self) -> int:
+        """Drop events older than the TTL"""
+        self._last_prune = time.monotonic()
+        if self.ttl <= 0:
+            return 0
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM events WHERE created < ?", (time.time() - self.ttl,))
+            self._db.commit()
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            events, streams = self._db.execute("SELECT COUNT(*), COUNT(DISTINCT stream_id) FROM events").fetchone()
+        return {
+            "path": self.path,
+            "events": events,
+            "streams": streams,
+            "stored": self._stored,
+            "replayed": self._replayed,
+            "ttl": self.ttl
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def create_event_store(spec: Optional[str]) -> Optional[SQLiteEventStore]:
+    """Build the store named by FLOWISEAI_SESSION_STORE: unset/`none`, `memory`, or a SQLite file path"""
+    if not spec or spec.lower() == "none":
+        return None
+    if spec.lower() == "memory":
+        return SQLiteEventStore(":memory:")
+    if spec.startswith("sqlite://"):
+        spec = spec[len("sqlite://"):]
+    return SQLiteEventStore(spec)
@@ -0,0 +1,353 @@
+"""Output shaping applied to every tool result
+
+Callers pass an `output` argument to any tool to cut what comes back:
+
+- `select`: paths to keep, e.g. `["id", "name", "flowData.nodes[*].id"]`. Paths
+  are applied to each item of a list result unless they start with `$`, and the
+  selected parts keep their place in the structure.
+- `summary`: shorten long strings and lists and collapse deep nesting.
+- `max_bytes`: cap the response size. Lists are paged by item, anything else is
+  cut by bytes; a `continuation` token fetches the next part.
+
+The full result of a truncated call is kept in memory for its continuations,
+scoped to the caller's backend and credentials. A token whose result has
+been evicted is rejected rather than answered by re-running the call, which
+would repeat writes and predictions.
+
+FLOWISEAI_MAX_OUTPUT_BYTES sets a server-wide default for `max_bytes`.
+"""
+
+import os
+import re
+import json
+import base64
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple, Union
+
+from pydantic import BaseModel
+
+from .serialization import dumps_plain, list_adapter
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_ARGUMENT = "output"
+
+# Smallest cap honoured, so a response always has room for at least a fragment and its token
+MIN_OUTPUT_BYTES = 256
+
+SUMMARY_MAX_STRING = 200
+SUMMARY_MAX_ITEMS = 10
+SUMMARY_MAX_DEPTH = 3
+
+# Bound on the full results of truncated calls kept for their continuations
+_CACHE_BYTES = int(os.getenv("FLOWISEAI_CONTINUATION_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Repeated on every tool in tools/list, so kept to types and one line; TOOLS_REFERENCE.md has the details
+OUTPUT_SCHEMA = {
+    "type": "object",
+    "description": "Shape the result (see docs)",
+    "properties": {
+        "select": {"type": "array", "items": {"type": "string"}},
+        "summary": {"type": "boolean"},
+        "max_bytes": {"type": "integer"},
+        "continuation": {"type": "string"}
+    }
+}
+
+_PATH_TOKEN = re.compile(r"\.?([^.\[\]]+)|\[(\*|-?\d+)\]")
+
+
+class OutputOptions:
+    """Parsed `output` argument of a tool call"""
+
+    __slots__ = ("select", "summary", "max_bytes", "continuation")
+
+    def __init__(self, select: Optional[List[str]] = None, summary: bool = False,
+                 max_bytes: Optional[int] = None, continuation: Optional[str] = None):
+        self.select = select
+        self.summary = summary
+        self.max_bytes = max(MIN_OUTPUT_BYTES, max_bytes) if max_bytes else None
+        self.continuation = continuation
+
+    @classmethod
+    def from_arguments(cls, arguments: Dict[str, Any]) -> Tuple[Optional["OutputOptions"], Dict[str, Any]]:
+        """Split the `output` argument off a tool call's arguments"""
+        raw = arguments.get(OUTPUT_ARGUMENT)
+        default_max = _default_max_bytes()
+        if raw is None and not default_max:
+            return None, arguments
+        arguments = {k: v for k, v in arguments.items() if k != OUTPUT_ARGUMENT}
+        raw = raw or {}
+        if not isinstance(raw, dict):
+            raise ValueError("output must be an object")
+        select = raw.get("select")
+        if isinstance(select, str):
+            select = [select]
+        return cls(
+            select=select or None,
+            summary=bool(raw.get("summary")),
+            max_bytes=raw.get("max_bytes") or default_max,
+            continuation=raw.get("continuation")
+        ), arguments
+
+
+def _default_max_bytes() -> Optional[int]:
+    value = os.getenv("FLOWISEAI_MAX_OUTPUT_BYTES")
+    return int(value) if value else None
+
+
+# === Selection ===
+
+def parse_path(path: str) -> List[Union[str, int]]:
+    """Split `a.b[0].c[*]` into ["a", "b", 0, "c", "*"]"""
+    tokens: List[Union[str, int]] = []
+    position = 0
+    while position < len(path):
+        match = _PATH_TOKEN.match(path, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Invalid path: {path}")
+        name, index = match.groups()
+        if name is not None:
+            tokens.append(name)
+        else:
+            tokens.append(index if index == "*" else int(index))
+        position = match.end()
+    return tokens
+
+
+_MISSING = object()
+
+
+def _select(value: Any, tokens: List[Union[str, int]]) -> Any:
+    """The parts of value reached by tokens, in their original structure, or _MISSING"""
+    if not tokens:
+        return value
+    token, rest = tokens[0], tokens[1:]
+    if isinstance(value, list):
+        if token == "*":
+            # Misses keep their position so selections from several paths line up when merged
+            selected = [_select(item, rest) for item in value]
+            return selected if not value or any(item is not _MISSING for item in selected) else _MISSING
+        if isinstance(token, int):
+            if -len(value) <= token < len(value):
+                item = _select(value[token], rest)
+                return [item] if item is not _MISSING else _MISSING
+            return _MISSING
+        # A field name on a list applies to each of its items
+        return _select(value, ["*"] + tokens)
+    if isinstance(value, dict):
+        if token == "*":
+            selected = {key: _select(item, rest) for key, item in value.items()}
+            return {key: item for key, item in selected.items() if item is not _MISSING}
+        if isinstance(token, str) and token in value:
+            item = _select(value[token], rest)
+            return {token: item} if item is not _MISSING else _MISSING
+    return _MISSING
+
+
+def _merge(left: Any, right: Any) -> Any:
+    if left is _MISSING:
+        return right
+    if right is _MISSING:
+        return left
+    if isinstance(left, dict) and isinstance(right, dict):
+        merged = dict(left)
+        for key, value in right.items():
+            merged[key] = _merge(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(left, list) and isinstance(right, list) and len(left) == len(right):
+        return [_merge(a, b) for a, b in zip(left, right)]
+    return right
+
+
+def _select_paths(value: Any, token_lists: List[List[Union[str, int]]]) -> Any:
+    result = _MISSING
+    for tokens in token_lists:
+        result = _merge(result, _select(value, tokens))
+    return result
+
+
+def select(value: Any, paths: List[str]) -> Any:
+    """Keep only the parts of value named by paths; list results are selected per item"""
+    relative = [parse_path(path) for path in paths if not path.startswith("$")]
+    absolute = [parse_path(path[1:].lstrip(".")) for path in paths if path.startswith("$")]
+    if isinstance(value, list) and relative:
+        # One (possibly empty) record per item, so counts and positions are kept
+        result = [_select_paths(item, relative) for item in value]
+        result = [{} if item is _MISSING else item for item in result]
+        relative = []
+    else:
+        result = _MISSING
+    result = _merge(result, _select_paths(value, relative + absolute))
+    if result is _MISSING:
+        return [] if isinstance(value, list) else {}
+    return _drop_missing(result)
+
+
+def _drop_missing(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_drop_missing(item) for item in value if item is not _MISSING]
+    if isinstance(value, dict):
+        return {key: _drop_missing(item) for key, item in value.items()}
+    return value
+
+
+# === Summary ===
+
+def summarize(value: Any, depth: int = 0) -> Any:
+    """Shorten strings and lists and collapse nesting below SUMMARY_MAX_DEPTH"""
+    if isinstance(value, str):
+        if len(value) > SUMMARY_MAX_STRING:
+            return f"{value[:SUMMARY_MAX_STRING]}... (+{len(value) - SUMMARY_MAX_STRING} chars)"
+        return value
+    if isinstance(value, dict):
+        if depth >= SUMMARY_MAX_DEPTH and value:
+            return f"{{{len(value)} keys}}"
+        return {key: summarize(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, list):
+        if depth >= SUMMARY_MAX_DEPTH and value:
+            return f"[{len(value)} items]"
+        items = [summarize(item, depth + 1) for item in value[:SUMMARY_MAX_ITEMS]]
+        if len(value) > SUMMARY_MAX_ITEMS:
+            items.append(f"... (+{len(value) - SUMMARY_MAX_ITEMS} more items)")
+        return items
+    return value
+
+
+# === Truncation ===
+
+def to_plain(result: Any) -> Any:
+    """JSON-compatible Python form of a tool result"""
+    if isinstance(result, BaseModel):
+        return result.model_dump(mode="json")
+    if isinstance(result, list) and result and all(type(item) is type(result[0]) for item in result) \
+            and isinstance(result[0], BaseModel):
+        return list_adapter(type(result[0])).dump_python(result, mode="json")
+    if isinstance(result, list):
+        return [to_plain(item) for item in result]
+    if isinstance(result, str):
+        try:
+            return json.loads(result)
+        except ValueError:
+            return result
+    return result
+
+
+class _Full:
+    """A complete shaped result, as item texts (list results) or one text"""
+
+    __slots__ = ("items", "text", "digest", "size")
+
+    def __init__(self, items: Optional[List[str]] = None, text: Optional[str] = None):
+        self.items = items
+        self.text = text
+        whole = "[" + ",".join(items) + "]" if items is not None else text
+        self.size = len(whole)
+        self.digest = hashlib.blake2b(whole.encode("utf-8"), digest_size=8).hexdigest()
+
+
+# Keyed by (tenant, digest) so a token only ever reads results of its own backend and credentials
+_recent: "OrderedDict[Tuple[str, str], _Full]" = OrderedDict()
+_recent_size = 0
+
+
+def _remember(tenant: str, full: _Full):
+    global _recent_size
+    key = (tenant, full.digest)
+    previous = _recent.pop(key, None)
+    if previous is not None:
+        _recent_size -= previous.size
+    _recent[key] = full
+    _recent_size += full.size
+    # The newest result is kept even when it alone exceeds the bound
+    while _recent_size > _CACHE_BYTES and len(_recent) > 1:
+        _, evicted = _recent.popitem(last=False)
+        _recent_size -= evicted.size
+
+
+def encode_token(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(dumps_plain(state).encode("utf-8")).decode("ascii")
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except ValueError:
+        raise ValueError("Invalid continuation token") from None
+    if not isinstance(state, dict) or not isinstance(state.get("offset"), int) or "digest" not in state:
+        raise ValueError("Invalid continuation token")
+    return state
+
+
+def _page(full: _Full, offset: int, max_bytes: int, token_state: Dict[str, Any]) -> str:
+    """The part of a full result starting at offset, with a token for the rest"""
+    if full.items is not None:
+        taken, size = [], 0
+        for text in full.items[offset:]:
+            if taken and size + len(text.encode("utf-8")) + 1 > max_bytes:
+                break
+            taken.append(text)
+            size += len(text.encode("utf-8")) + 1
+        end = offset + len(taken)
+        token = encode_token({**token_state, "offset": end}) if end < len(full.items) else None
+        return (
+            '{"items":[' + ",".join(taken) + "]," +
+            dumps_plain({"offset": offset, "returned": len(taken), "total": len(full.items), "continuation": token})[1:]
+        )
+
+    data = full.text.encode("utf-8")
+    chunk = data[offset:offset + max_bytes].decode("utf-8", errors="ignore")
+    end = offset + len(chunk.encode("utf-8"))
+    if end >= len(data):
+        return chunk
+    token = encode_token({**token_state, "offset": end})
+    return f'{chunk}\n[truncated: bytes {offset}-{end} of {len(data)}; call again with output.continuation="{token}"]'
+
+
+def _render(result: Any, select_paths: Optional[List[str]], summary: bool, serializer) -> Tuple[str, Any]:
+    """Apply selection and summary; return the text and, when computed, its plain value"""
+    if not select_paths and not summary:
+        return serializer(result), None
+    value = to_plain(result)
+    if select_paths:
+        value = select(value, select_paths)
+    if summary:
+        value = summarize(value)
+    return dumps_plain(value), value
+
+
+def _full(result: Any, text: str, value: Any) -> _Full:
+    if value is None and isinstance(result, list):
+        value = to_plain(result)
+    if isinstance(value, list):
+        return _Full(items=[dumps_plain(item) for item in value])
+    return _Full(text=text)
+
+
+def shape(result: Any, options: OutputOptions, serializer, tool: str, tenant: str) -> str:
+    """Select, summarize and truncate a tool result"""
+    text, value = _render(result, options.select, options.summary, serializer)
+    if not options.max_bytes or len(text.encode("utf-8")) <= options.max_bytes:
+        return text
+    full = _full(result, text, value)
+    _remember(tenant, full)
+    state = {"tool": tool, "max_bytes": options.max_bytes, "digest": full.digest}
+    return _page(full, 0, options.max_bytes, state)
+
+
+def continuation_state(token: str, tool: str) -> Dict[str, Any]:
+    state = decode_token(token)
+    if state.get("tool") != tool:
+        raise ValueError(f"Continuation token belongs to tool {state.get('tool')}, not {tool}")
+    return state
+
+
+def cached_page(state: Dict[str, Any], max_bytes: Optional[int], tenant: str) -> str:
+    """The next page of a truncated result held in memory for this tenant"""
+    full = _recent.get((tenant, state["digest"]))
+    if full is None:
+        raise ValueError("The continuation token has expired; call the tool again without it")
+    _recent.move_to_end((tenant, state["digest"]))
+    return _page(full, state["offset"], max_bytes or MIN_OUTPUT_BYTES, state)
@@ -0,0 +1,260 @@
+"""Server-sent event decoding and response assembly for FlowiseAI streaming predictions"""
+
+import json
+import time
+from typing import Optional, List, Dict, Any, Iterator
+
+from .models import PredictionResponse, StreamTiming
+
+# Event kinds emitted by Flowise streaming predictions
+FLOWISE_EVENTS = frozenset({
+    "start", "token", "sourceDocuments", "usedTools", "agentReasoning", "nextAgent",
+    "agentFlowEvent", "agentFlowExecutedData", "nextAgentFlow", "action", "artifacts",
+    "fileAnnotations", "metadata", "error", "abort", "end",
+})
+
+
+class StreamError(Exception):
+    """Raised when Flowise reports an error inside an event stream"""
+
+
+class SSEEvent:
+    """A single dispatched text/event-stream event"""
+
+    __slots__ = ("event", "data", "id", "retry", "received_at")
+
+    def __init__(self, event: str, data: str, id: Optional[str], retry: Optional[int], received_at: float):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+        self.received_at = received_at
+
+    def __repr__(self) -> str:
+        return f"SSEEvent(event={self.event!r}, data={self.data[:40]!r}, id={self.id!r})"
+
+
+class SSEDecoder:
+    """Incremental text/event-stream decoder
+
+    Text can be fed in arbitrary chunks; only an unterminated trailing line is
+    buffered between calls. Multi-line `data:` fields are joined with newlines
+    when the event is dispatched, comments are ignored, and `id`/`retry` hints
+    are kept as the stream's last event id and reconnection delay.
+    """
+
+    def __init__(self):
+        self._partial = ""
+        self._event = ""
+        self._data: List[str] = []
+        self._has_data = False
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed(self, text: str) -> Iterator[SSEEvent]:
+        """Decode a chunk of text, yielding every event it completes"""
+        if self._partial:
+            text = self._partial + text
+        lines = text.split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            if line.endswith("\r"):
+                line = line[:-1]
+            event = self._process_line(line)
+            if event is not None:
+                yield event
+
+    def flush(self) -> Iterator[SSEEvent]:
+        """Dispatch whatever remains once the stream has ended"""
+        if self._partial:
+            line, self._partial = self._partial.rstrip("\r"), ""
+            event = self._process_line(line)
+            if event is not None:
+                yield event
+        event = self._dispatch()
+        if event is not None:
+            yield event
+
+    def _process_line(self, line: str) -> Optional[SSEEvent]:
+        if not line:
+            return self._dispatch()
+        if line[0] == ":":
+            return None
+
+        field, sep, value = line.partition(":")
+        if sep and value[:1] == " ":
+            value = value[1:]
+
+        if field == "data":
+            self._data.append(value)
+            self._has_data = True
+        elif field == "event":
+            self._event = value
+        elif field == "id":
+            if "\0" not in value:
+                self.last_event_id = value
+        elif field == "retry":
+            if value.isdigit():
+                self.retry = int(value)
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        if not self._has_data:
+            self._event = ""
+            return None
+        data = self._data[0] if len(self._data) == 1 else "\n".join(self._data)
+        event = SSEEvent(self._event or "message", data, self.last_event_id, self.retry, time.monotonic())
+        self._event = ""
+        self._data = []
+        self._has_data = False
+        return event
+
+
+class FlowiseEvent:
+    """A typed Flowise streaming event"""
+
+    __slots__ = ("kind", "data", "received_at")
+
+    def __init__(self, kind: str, data: Any, received_at: float):
+        self.kind = kind
+        self.data = data
+        self.received_at = received_at
+
+    def __repr__(self) -> str:
+        return f"FlowiseEvent(kind={self.kind!r})"
+
+    @classmethod
+    def from_sse(cls, event: SSEEvent) -> "FlowiseEvent":
+        """Map an SSE event onto a Flowise event kind
+
+        Flowise sends either named events (`event: token`) or unnamed events whose
+        data is a JSON envelope like `{"event": "token", "data": "..."}`; plain
+        unnamed text is treated as a token and `[DONE]` as the end of the stream.
+        """
+        data = event.data
+        if event.event != "message":
+            return cls(event.event, _maybe_json(data) if event.event != "token" else data, event.received_at)
+        if data == "[DONE]":
+            return cls("end", None, event.received_at)
+        if data[:1] == "{":
+            try:
+                envelope = json.loads(data)
+            except ValueError:
+                envelope = None
+            if isinstance(envelope, dict) and "event" in envelope:
+                return cls(envelope["event"], envelope.get("data"), event.received_at)
+        return cls("token", data, event.received_at)
+
+
+def _maybe_json(data: str) -> Any:
+    if data[:1] in ("{", "["):
+        try:
+            return json.loads(data)
+        except ValueError:
+            pass
+    return data
+
+
+class StreamTimer:
+    """Collects latency marks for one streaming request"""
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.headers_at: Optional[float] = None
+        self.first_byte_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.ended_at: Optional[float] = None
+        self.events = 0
+        self.tokens = 0
+        self._gap_total = 0.0
+        self._gap_max = 0.0
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+    def headers(self):
+        self.headers_at = time.monotonic()
+
+    def first_byte(self):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.monotonic()
+
+    def event(self, event: FlowiseEvent):
+        self.events += 1
+        if event.kind != "token":
+            return
+        now = event.received_at
+        self.tokens += 1
+        if self.first_token_at is None:
+            self.first_token_at = now
+        else:
+            gap = now - self.last_token_at
+            self._gap_total += gap
+            if gap > self._gap_max:
+                self._gap_max = gap
+        self.last_token_at = now
+
+    def end(self):
+        self.ended_at = time.monotonic()
+
+    def summary(self) -> StreamTiming:
+        def since_start(mark: Optional[float]) -> Optional[float]:
+            if mark is None or self.started_at is None:
+                return None
+            return round(mark - self.started_at, 6)
+
+        gaps = self.tokens - 1
+        return StreamTiming(
+            time_to_headers=since_start(self.headers_at),
+            time_to_first_byte=since_start(self.first_byte_at),
+            time_to_first_token=since_start(self.first_token_at),
+            total_time=since_start(self.ended_at),
+            events=self.events,
+            tokens=self.tokens,
+            inter_token_gap_mean=round(self._gap_total / gaps, 6) if gaps > 0 else None,
+            inter_token_gap_max=round(self._gap_max, 6) if gaps > 0 else None
+        )
+
+
+class PredictionAssembler:
+    """Builds a PredictionResponse incrementally from Flowise events
+
+    Tokens are collected into a list and joined once when the response is
+    requested, so long generations are not re-concatenated per token.
+    """
+
+    def __init__(self, timer: Optional[StreamTimer] = None):
+        self.timer = timer or StreamTimer()
+        self._tokens: List[str] = []
+        self._fields: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.ended = False
+
+    def add(self, event: FlowiseEvent):
+        self.timer.event(event)
+        kind = event.kind
+        if kind == "token":
+            if event.data:
+                self._tokens.append(event.data)
+        elif kind in ("sourceDocuments", "usedTools", "agentReasoning", "artifacts", "fileAnnotations"):
+            self._fields[kind] = event.data
+        elif kind == "metadata" and isinstance(event.data, dict):
+            for key in ("chatId", "chatMessageId", "question", "sessionId"):
+                if event.data.get(key) is not None:
+                    self._fields[key] = event.data[key]
+        elif kind == "error":
+            self.error = event.data if isinstance(event.data, str) else json.dumps(event.data)
+        elif kind in ("end", "abort"):
+            self.ended = True
+
+    @property
+    def text(self) -> str:
+        return "".join(self._tokens)
+
+    def response(self) -> PredictionResponse:
+        """Return the assembled response, raising if the stream reported an error"""
+        if self.error is not None:
+            raise StreamError(self.error)
+        fields = {k: v for k, v in self._fields.items() if k in PredictionResponse.model_fields}
+        return PredictionResponse(text=self.text, **fields)
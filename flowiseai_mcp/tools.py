@@ -0,0 +1,1356 @@
+"""Declarative tool registry for the FlowiseAI MCP server
+
+Every MCP tool is described once by a ToolSpec (name, input schema, handler,
+serializer and call policy). Both `list_tools` and `call_tool` are derived from
+the `TOOLS` table, so dispatch is a single dictionary lookup and every result
+goes through one serialization path (see `serialization.py`).
+"""
+
+import os
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+import functools
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Type, Tuple, AsyncIterator, Iterator
+
+from pydantic import BaseModel, create_model
+from mcp.types import Tool as MCPTool, ListToolsResult
+
+from .client import FlowiseAIClient
+from .registry import ClientRegistry
+from .serialization import serialize, dumps_plain, orjson
+from .export import ChatHistoryExporter, EXPORT_KINDS
+from .batching import BulkUpsertTracker
+from .evaluation import PredictionBatchTracker
+from .ingest import iter_documents
+from .dedup import DedupRun, vector_target
+from .sse import PredictionAssembler
+from .metrics import ToolCallMetrics, CallTimings, TOOL_RESPONSE_BYTES, payload_size
+from .shaping import (
+    OUTPUT_ARGUMENT, OUTPUT_SCHEMA, OutputOptions, shape, continuation_state, cached_page
+)
+from .models import *
+from .models import Tool as FlowiseTool
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[["ToolContext", Dict[str, Any]], Awaitable[Any]]
+
+
+class ToolContext:
+    """Per-call state handed to tool handlers"""
+
+    __slots__ = ("server", "client", "test_mode", "multi_tenant")
+
+    def __init__(self, server: Any, client: Optional[FlowiseAIClient], test_mode: bool = False,
+                 multi_tenant: bool = False):
+        self.server = server
+        self.client = client
+        self.test_mode = test_mode
+        # True when callers bring their own backends and credentials (HTTP mode)
+        self.multi_tenant = multi_tenant
+
+    @property
+    def tenant(self) -> str:
+        """Registry key of the caller's backend and credentials, scoping state kept between calls"""
+        if self.client is None:
+            return "test"
+        return ClientRegistry.key_for(self.client.base_url, self.client.api_key)
+
+    def _request_context(self):
+        try:
+            return self.server.request_context
+        except (AttributeError, LookupError):
+            return None
+
+    def progress_reporter(self) -> Optional[Callable[[float, Optional[str]], Awaitable[bool]]]:
+        """Return a coroutine that sends MCP progress notifications, or None if not requested
+
+        The reporter returns False once a notification fails (e.g. the client went
+        away) and stops sending after that.
+        """
+        ctx = self._request_context()
+        progress_token = ctx.meta.progressToken if ctx and ctx.meta else None
+        if progress_token is None:
+            return None
+        state = {"alive": True}
+
+        async def report(progress: float, message: Optional[str] = None, total: Optional[float] = None) -> bool:
+            if not state["alive"]:
+                return False
+            try:
+                await ctx.session.send_progress_notification(
+                    progress_token,
+                    progress=progress,
+                    total=total,
+                    message=message,
+                    related_request_id=str(ctx.request_id)
+                )
+            except Exception as e:
+                logger.debug(f"Failed to send progress notification: {e}")
+                state["alive"] = False
+            return state["alive"]
+
+        return report
+
+
+class ToolSpec:
+    """A single MCP tool: its schema, handler and call policy"""
+
+    __slots__ = (
+        "name", "description", "input_schema", "handler", "serializer",
+        "requires_client", "max_concurrency", "shapes_output", "_limits"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        input_schema: Dict[str, Any],
+        handler: Handler,
+        serializer: Callable[[Any], str] = serialize,
+        requires_client: bool = True,
+        max_concurrency: Optional[int] = None,
+        shapes_output: Optional[bool] = None
+    ):
+        self.name = name
+        self.description = description
+        self.input_schema = input_schema
+        self.handler = handler
+        self.serializer = serializer
+        self.requires_client = requires_client
+        self.max_concurrency = max_concurrency
+        # Tools answering with a fixed short message do not advertise `output`
+        self.shapes_output = shapes_output if shapes_output is not None else not getattr(handler, "fixed_result", False)
+        # Per-tenant semaphore and the number of calls holding or awaiting it
+        self._limits: Dict[str, List[Any]] = {}
+
+    async def invoke(self, ctx: ToolContext, arguments: Dict[str, Any]) -> str:
+        """Run the handler under this tool's policies, then serialize and shape its result"""
+        start = time.perf_counter()
+        try:
+            with ToolCallMetrics(self.name) as timings:
+                text = await self._invoke(ctx, arguments, timings)
+            TOOL_RESPONSE_BYTES.observe(payload_size(text), self.name)
+            return text
+        finally:
+            logger.debug(f"Tool {self.name} took {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    async def _invoke(self, ctx: ToolContext, arguments: Dict[str, Any], timings: CallTimings) -> str:
+        options, arguments = OutputOptions.from_arguments(arguments)
+        if options is None:
+            result = await self._limited(ctx, arguments)
+            with timings.measure("serialization"):
+                return self.serializer(result)
+        if not options.continuation:
+            result = await self._limited(ctx, arguments)
+            with timings.measure("serialization"):
+                return shape(result, options, self.serializer, self.name, ctx.tenant)
+
+        # Never re-run the call for a continuation: it may have been a write or a prediction
+        state = continuation_state(options.continuation, self.name)
+        with timings.measure("serialization"):
+            return cached_page(state, state.get("max_bytes") or options.max_bytes, ctx.tenant)
+
+    async def _limited(self, ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+        if not self.max_concurrency:
+            return await self.handler(ctx, arguments)
+        # max_concurrency applies per tenant, so one tenant's calls never queue another's
+        tenant = ctx.tenant
+        limit = self._limits.get(tenant)
+        if limit is None:
+            limit = self._limits[tenant] = [asyncio.Semaphore(self.max_concurrency), 0]
+        limit[1] += 1
+        try:
+            async with limit[0]:
+                return await self.handler(ctx, arguments)
+        finally:
+            limit[1] -= 1
+            if not limit[1]:
+                del self._limits[tenant]
+
+
+# === Handler factories ===
+
+def call(method: str, *arg_names: str) -> Handler:
+    """Call a client method with the named arguments passed positionally"""
+    async def handler(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+        return await getattr(ctx.client, method)(*(arguments[name] for name in arg_names))
+    return handler
+
+
+def listing(method: str, *arg_names: str) -> Handler:
+    """Like `call`, also passing an optional `fields` projection to the list method"""
+    async def handler(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+        return await getattr(ctx.client, method)(*(arguments[name] for name in arg_names), fields=arguments.get("fields"))
+    return handler
+
+
+def create(method: str, model: Type[BaseModel]) -> Handler:
+    """Build a model from all arguments and pass it to a client method"""
+    async def handler(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+        return await getattr(ctx.client, method)(model(**arguments))
+    return handler
+
+
+def update(method: str, model: Type[BaseModel], *id_args: str) -> Handler:
+    """Pass identifier arguments followed by a model built from the rest"""
+    id_args = id_args or ("id",)
+
+    async def handler(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+        fields = {k: v for k, v in arguments.items() if k not in id_args}
+        return await getattr(ctx.client, method)(*(arguments[name] for name in id_args), model(**fields))
+    return handler
+
+
+def delete(method: str, message: str, *arg_names: str) -> Handler:
+    """Call a client method and report a fixed confirmation message"""
+    async def handler(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+        await getattr(ctx.client, method)(*(arguments[name] for name in arg_names))
+        return message
+    handler.fixed_result = True
+    return handler
+
+
+def _camel_to_snake(arguments: Dict[str, Any], mapping: Dict[str, str]) -> Dict[str, Any]:
+    return {mapping[k]: v for k, v in arguments.items() if k in mapping}
+
+
+# === Custom handlers ===
+
+async def _ping(ctx: ToolContext, arguments: Dict[str, Any]) -> str:
+    if ctx.test_mode:
+        return "pong (test mode)"
+    try:
+        return await ctx.client.ping()
+    except Exception:
+        return "pong (offline)"
+
+
+async def _stream_prediction(ctx: ToolContext, chatflow_id: str, request: PredictionRequest) -> Dict[str, Any]:
+    """Run a streaming prediction, forwarding events as MCP progress notifications
+
+    Token text (and the names of other Flowise events) is sent as it arrives
+    when the caller supplied a progress token, so Streamable HTTP clients see
+    tokens in real time. The assembled PredictionResponse and its stream
+    timing are returned as the final tool result.
+    """
+    report = ctx.progress_reporter()
+    assembler = PredictionAssembler()
+    async for event in ctx.client.predict_streaming(chatflow_id, request, timer=assembler.timer):
+        assembler.add(event)
+        if report is not None:
+            message = event.data if event.kind == "token" else f"[{event.kind}]"
+            # Keep draining after a failed notification so the result stays complete
+            if not await report(assembler.timer.events, message):
+                report = None
+
+    result = assembler.response().model_dump()
+    result["timing"] = assembler.timer.summary().model_dump()
+    return result
+
+
+async def _prediction_run(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+    request = PredictionRequest(**{k: v for k, v in arguments.items() if k != "chatflow_id"})
+    if request.streaming:
+        return await _stream_prediction(ctx, arguments["chatflow_id"], request)
+    return await ctx.client.predict(arguments["chatflow_id"], request)
+
+
+async def _prediction_stream(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+    request = PredictionRequest(**{k: v for k, v in arguments.items() if k != "chatflow_id"})
+    return await _stream_prediction(ctx, arguments["chatflow_id"], request)
+
+
+MAX_PREDICTION_BATCH = 1000
+MAX_PREDICTION_CONCURRENCY = 64
+
+
+async def _prediction_batch(ctx: ToolContext, arguments: Dict[str, Any]) -> PredictionBatchReport:
+    default_chatflow = arguments.get("chatflow_id")
+    items = arguments["items"]
+    if len(items) > MAX_PREDICTION_BATCH:
+        raise ValueError(f"A prediction batch may hold at most {MAX_PREDICTION_BATCH} items")
+    requests = []
+    for index, item in enumerate(items):
+        chatflow_id = item.get("chatflow_id") or default_chatflow
+        if not chatflow_id:
+            raise ValueError(f"Item {index} has no chatflow_id and no default chatflow_id was given")
+        requests.append((chatflow_id, PredictionRequest(**{k: v for k, v in item.items() if k != "chatflow_id"})))
+
+    concurrency = arguments.get("concurrency")
+    tracker = PredictionBatchTracker(keep_responses=arguments.get("include_responses", True))
+    report = ctx.progress_reporter()
+    async for result in ctx.client.predict_batch(
+        requests,
+        concurrency=min(int(concurrency), MAX_PREDICTION_CONCURRENCY) if concurrency else None,
+        timeout=arguments.get("timeout")
+    ):
+        tracker.add(result)
+        if report is not None:
+            # Each completed prediction is streamed to the caller as it lands
+            message = {"index": result.index, "chatflow_id": result.chatflow_id, "ok": result.success,
+                       "elapsed_seconds": result.elapsed_seconds}
+            if result.success and result.response is not None and result.response.text is not None:
+                message["text"] = result.response.text[:200]
+            elif not result.success:
+                message["error"] = result.error
+            await report(len(tracker), dumps_plain(message), len(requests))
+    return tracker.report()
+
+
+_CHATMESSAGE_FILTERS = {
+    "order": "order", "chatId": "chat_id", "sessionId": "session_id", "startDate": "start_date",
+    "endDate": "end_date", "feedback": "feedback", "limit": "limit", "offset": "offset", "fields": "fields"
+}
+
+# Arguments that select messages (as opposed to how many) and so travel inside a cursor
+_CHATMESSAGE_CURSOR_ARGS = (
+    "chatType", "memoryType", "order", "chatId", "sessionId", "startDate", "endDate", "feedback", "fields"
+)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Pack paging state into an opaque, URL-safe cursor"""
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError:
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(state, dict) or not isinstance(state.get("offset"), int):
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def _chat_message_filters(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "chat_type": ChatType(arguments["chatType"]) if "chatType" in arguments else None,
+        "memory_type": MemoryType(arguments["memoryType"]) if "memoryType" in arguments else None,
+        **_camel_to_snake(arguments, _CHATMESSAGE_FILTERS)
+    }
+
+
+async def _chatmessage_list(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+    if "cursor" not in arguments and "page_size" not in arguments:
+        return await ctx.client.list_chat_messages(arguments["chatflow_id"], **_chat_message_filters(arguments))
+
+    # Paged mode: the cursor carries the filters and page size of the first call
+    if "cursor" in arguments:
+        state = decode_cursor(arguments["cursor"])
+        selection = state.get("filters", {})
+    else:
+        state = {"offset": 0}
+        selection = {k: arguments[k] for k in _CHATMESSAGE_CURSOR_ARGS if k in arguments}
+    page_size = arguments.get("page_size") or state.get("page_size") or DEFAULT_PAGE_SIZE
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+
+    messages, has_more = await ctx.client.get_chat_message_page(
+        arguments["chatflow_id"], page_size=page_size, offset=state["offset"],
+        previous_first_id=state.get("first_id"), **_chat_message_filters(selection)
+    )
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor({
+            "offset": state["offset"] + page_size,
+            "page_size": page_size,
+            "filters": selection,
+            # Lets the next call notice a backend that ignored the offset and sent this page again
+            "first_id": getattr(messages[0], "id", None)
+        })
+    page_model = _message_page_model(type(messages[0])) if messages else ChatMessagePage
+    return page_model(messages=messages, next_cursor=next_cursor)
+
+
+@functools.lru_cache(maxsize=None)
+def _message_page_model(message_model: Type[BaseModel]) -> Type[ChatMessagePage]:
+    """ChatMessagePage holding projected messages"""
+    if message_model is ChatMessage:
+        return ChatMessagePage
+    return create_model(f"{message_model.__name__}Page", __base__=ChatMessagePage, messages=(List[message_model], ...))
+
+
+async def _attachment_create(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+    return await ctx.client.create_attachments(
+        arguments["chatflow_id"],
+        arguments["chat_id"],
+        arguments["attachments"],
+        arguments.get("return_base64", False)
+    )
+
+
+_UPSERT_HISTORY_FILTERS = {"order": "order", "startDate": "start_date", "endDate": "end_date", "fields": "fields"}
+
+
+async def _upsert_history_list(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+    return await ctx.client.list_upsert_history(
+        arguments["chatflow_id"], **_camel_to_snake(arguments, _UPSERT_HISTORY_FILTERS)
+    )
+
+
+async def _track_batches(ctx: ToolContext, results: AsyncIterator[UpsertBatchResult],
+                         total: Optional[int] = None) -> BulkUpsertReport:
+    """Collect batch results into a report, sending a progress notification per batch"""
+    tracker = BulkUpsertTracker()
+    report = ctx.progress_reporter()
+    async for result in results:
+        tracker.add(result)
+        if report is not None:
+            status = "ok" if result.success else f"failed: {result.error}"
+            await report(tracker.documents, f"batch {result.batch} ({result.documents} documents) {status}", total)
+    return tracker.report()
+
+
+async def _docstore_bulk_upsert(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+    documents = arguments["documents"]
+    return await _track_batches(ctx, ctx.client.upsert_documents_batched(
+        arguments["store_id"],
+        documents,
+        batch_size=arguments.get("batch_size"),
+        max_batch_bytes=arguments.get("max_batch_bytes"),
+        concurrency=arguments.get("concurrency")
+    ), len(documents))
+
+
+# Arguments shared by tools that can read documents from local files instead of inline JSON
+_FILE_INGEST_PROPERTIES = {
+    "paths": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Local files or directories (.txt, .md, .jsonl) to read instead of inline documents"
+    },
+    "chunk_size": {"type": "integer", "minimum": 1, "description": "Characters per text chunk (default 1000)"},
+    "chunk_overlap": {"type": "integer", "minimum": 0, "description": "Characters shared by adjacent chunks (default 200)"},
+    "batch_size": {"type": "integer", "minimum": 1, "description": "Maximum documents per request"}
+}
+
+
+def _file_documents(arguments: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    return iter_documents(
+        arguments["paths"],
+        chunk_size=arguments.get("chunk_size", 1000),
+        chunk_overlap=arguments.get("chunk_overlap", 200)
+    )
+
+
+async def _docstore_upsert(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+    if "paths" in arguments:
+        return await _track_batches(ctx, ctx.client.upsert_documents_batched(
+            arguments["store_id"], _file_documents(arguments), batch_size=arguments.get("batch_size")
+        ))
+    if "documents" not in arguments:
+        raise ValueError("Either documents or paths is required")
+    return await ctx.client.upsert_document(arguments["store_id"], arguments["documents"])
+
+
+async def _vector_upsert(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+    fields = {
+        k: v for k, v in arguments.items()
+        if k not in ("chatflow_id", "dedup") and k not in _FILE_INGEST_PROPERTIES
+    }
+    request = VectorUpsertRequest(**fields)
+    if "paths" in arguments:
+        run = None
+        if ctx.client.dedup is not None and arguments.get("dedup") is not False:
+            run = DedupRun(ctx.client.dedup, vector_target(ctx.client.base_url, arguments["chatflow_id"],
+                                                           request.stopNodeId))
+        report = await _track_batches(ctx, ctx.client.vector_upsert_batched(
+            arguments["chatflow_id"], _file_documents(arguments), request,
+            batch_size=arguments.get("batch_size"), dedup=run
+        ))
+        if run is not None:
+            report.dedup = run.report()
+        return report
+    return await ctx.client.vector_upsert(arguments["chatflow_id"], request, dedup=arguments.get("dedup"))
+
+
+def _export_dir(ctx: ToolContext, name: Optional[str]) -> str:
+    """Resolve an export subdirectory, keeping it inside FLOWISEAI_EXPORT_DIR
+
+    When serving many tenants, each backend/credential pair gets its own
+    directory under it, so tenants never write into each other's exports.
+    """
+    base = os.path.abspath(os.getenv("FLOWISEAI_EXPORT_DIR", "exports"))
+    name = name or "chat-history"
+    if os.path.isabs(name) or os.path.normpath(name).startswith(".."):
+        raise ValueError("Export name must be a relative directory inside the export directory")
+    if ctx.multi_tenant:
+        base = os.path.join(base, hashlib.sha256(ctx.tenant.encode("utf-8")).hexdigest()[:16])
+    return os.path.join(base, os.path.normpath(name))
+
+
+async def _chat_history_export(ctx: ToolContext, arguments: Dict[str, Any]) -> Any:
+    exporter = ChatHistoryExporter(
+        ctx.client,
+        _export_dir(ctx, arguments.get("name")),
+        kinds=arguments.get("kinds") or EXPORT_KINDS,
+        concurrency=arguments.get("concurrency", 4),
+        start_date=arguments.get("startDate"),
+        end_date=arguments.get("endDate"),
+        incremental=arguments.get("incremental", False)
+    )
+    report = ctx.progress_reporter()
+
+    async def progress(done: int, total: int, chatflow_id: str):
+        if report is not None:
+            await report(done, f"exported {chatflow_id}", total)
+
+    return await exporter.run(arguments.get("chatflow_ids"), progress=progress)
+
+
+# Sub-operations of one batch call, and how many of them run at once by default
+MAX_BATCH_OPERATIONS = 500
+DEFAULT_BATCH_CONCURRENCY = 8
+MAX_BATCH_CONCURRENCY = 32
+
+
+def _loads(text: str) -> Any:
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def _is_json(text: str) -> bool:
+    """Whether a tool's output text is JSON that can be embedded as-is"""
+    if not text or text[0] not in '{["-0123456789tfn':
+        return False
+    try:
+        _loads(text)
+    except ValueError:
+        return False
+    return True
+
+
+async def _batch(ctx: ToolContext, arguments: Dict[str, Any]) -> str:
+    operations = arguments["operations"]
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f"A batch may hold at most {MAX_BATCH_OPERATIONS} operations")
+    concurrency = max(1, min(int(arguments.get("concurrency") or DEFAULT_BATCH_CONCURRENCY), MAX_BATCH_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    report = ctx.progress_reporter()
+    results: List[Optional[str]] = [None] * len(operations)
+    started = time.perf_counter()
+    done = failed = 0
+
+    async def run(index: int, operation: Dict[str, Any]):
+        nonlocal done, failed
+        name = operation.get("tool") if isinstance(operation, dict) else None
+        spec = TOOLS.get(name)
+        entry = dumps_plain({"index": index, "tool": name})[:-1]
+        try:
+            if spec is None or spec.name == "batch":
+                raise ValueError(f"Unknown tool: {name}" if spec is None else "Batches cannot be nested")
+            if ctx.test_mode and spec.requires_client:
+                raise ValueError(f"Tool '{name}' unavailable in test mode")
+            async with semaphore:
+                text = await spec.invoke(ctx, operation.get("arguments") or {})
+            # Sub-results are spliced in as JSON rather than re-encoded as strings
+            results[index] = f'{entry},"ok":true,"result":{text if _is_json(text) else dumps_plain(text)}}}'
+            status = "done"
+        except Exception as e:
+            failed += 1
+            results[index] = f'{entry},"ok":false,"error":{dumps_plain(str(e))}}}'
+            status = "failed"
+        done += 1
+        if report is not None:
+            await report(done, f"{name} {status}", len(operations))
+
+    await asyncio.gather(*(run(index, operation) for index, operation in enumerate(operations)))
+    summary = dumps_plain({
+        "operations": len(operations),
+        "succeeded": len(operations) - failed,
+        "failed": failed,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    })
+    return '{"results":[' + ",".join(results) + "]," + summary[1:]
+
+
+# Field projection shared by list tools: only the named fields are validated and returned
+_FIELDS_PROPERTY = {
+    "fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Only return these fields (e.g. [\"id\", \"name\"]); other fields, such as large nested "
+                       "objects, are skipped instead of validated"
+    }
+}
+
+
+# === Tool table ===
+
+TOOL_SPECS = (
+    # Assistant tools
+    ToolSpec(
+        name="assistant_create",
+        description="Create a new assistant",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "description": {"type": "string"},
+                "model": {"type": "string"},
+                "prompt": {"type": "string"},
+                "temperature": {"type": "number"},
+                "max_tokens": {"type": "integer"},
+                "tools": {"type": "array", "items": {"type": "string"}}
+            },
+            "required": ["name"]
+        },
+        handler=create("create_assistant", Assistant)
+    ),
+    ToolSpec(
+        name="assistant_list",
+        description="List all assistants",
+        input_schema={
+            "type": "object",
+            "properties": {**_FIELDS_PROPERTY}
+        },
+        handler=listing("list_assistants")
+    ),
+    ToolSpec(
+        name="assistant_get",
+        description="Get an assistant by ID",
+        input_schema={
+            "type": "object",
+            "properties": {"id": {"type": "string"}},
+            "required": ["id"]
+        },
+        handler=call("get_assistant", "id")
+    ),
+    ToolSpec(
+        name="assistant_update",
+        description="Update an assistant",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "name": {"type": "string"},
+                "description": {"type": "string"},
+                "model": {"type": "string"},
+                "prompt": {"type": "string"},
+                "temperature": {"type": "number"},
+                "max_tokens": {"type": "integer"}
+            },
+            "required": ["id"]
+        },
+        handler=update("update_assistant", Assistant)
+    ),
+    ToolSpec(
+        name="assistant_delete",
+        description="Delete an assistant",
+        input_schema={
+            "type": "object",
+            "properties": {"id": {"type": "string"}},
+            "required": ["id"]
+        },
+        handler=delete("delete_assistant", "Assistant deleted successfully", "id")
+    ),
+
+    # Chatflow tools
+    ToolSpec(
+        name="chatflow_create",
+        description="Create a new chatflow",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "flowData": {"type": "object"},
+                "deployed": {"type": "boolean"},
+                "isPublic": {"type": "boolean"},
+                "category": {"type": "string"}
+            },
+            "required": ["name"]
+        },
+        handler=create("create_chatflow", Chatflow)
+    ),
+    ToolSpec(
+        name="chatflow_list",
+        description="List all chatflows",
+        input_schema={
+            "type": "object",
+            "properties": {**_FIELDS_PROPERTY}
+        },
+        handler=listing("list_chatflows")
+    ),
+    ToolSpec(
+        name="chatflow_get",
+        description="Get a chatflow by ID",
+        input_schema={
+            "type": "object",
+            "properties": {"id": {"type": "string"}},
+            "required": ["id"]
+        },
+        handler=call("get_chatflow", "id")
+    ),
+    ToolSpec(
+        name="chatflow_get_by_apikey",
+        description="Get a chatflow by API key",
+        input_schema={
+            "type": "object",
+            "properties": {"apikey": {"type": "string"}},
+            "required": ["apikey"]
+        },
+        handler=call("get_chatflow_by_apikey", "apikey")
+    ),
+    ToolSpec(
+        name="chatflow_update",
+        description="Update a chatflow including flowData, deployed status, and isPublic",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "name": {"type": "string"},
+                "flowData": {"type": "object"},
+                "deployed": {"type": "boolean"},
+                "isPublic": {"type": "boolean"}
+            },
+            "required": ["id"]
+        },
+        handler=update("update_chatflow", Chatflow)
+    ),
+    ToolSpec(
+        name="chatflow_delete",
+        description="Delete a chatflow",
+        input_schema={
+            "type": "object",
+            "properties": {"id": {"type": "string"}},
+            "required": ["id"]
+        },
+        handler=delete("delete_chatflow", "Chatflow deleted successfully", "id")
+    ),
+
+    # Prediction tools
+    ToolSpec(
+        name="prediction_run",
+        description="Run a prediction on a chatflow with support for question, form (AgentFlow V2), streaming, overrideConfig, history, uploads, and humanInput",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "chatflow_id": {"type": "string"},
+                "question": {"type": "string"},
+                "form": {"type": "object", "description": "AgentFlow V2 form inputs"},
+                "streaming": {"type": "boolean"},
+                "overrideConfig": {
+                    "type": "object",
+                    "properties": {
+                        "sessionId": {"type": "string"},
+                        "vars": {"type": "object"},
+                        "temperature": {"type": "number"},
+                        "maxTokens": {"type": "integer"}
+                    }
+                },
+                "history": {"type": "array", "items": {"type": "object"}},
+                "uploads": {"type": "array", "items": {"type": "object"}},
+                "humanInput": {"type": "string", "description": "Human-in-the-loop input"},
+                "chatId": {"type": "string"}
+            },
+            "required": ["chatflow_id"]
+        },
+        handler=_prediction_run
+    ),
+    ToolSpec(
+        name="prediction_stream",
+        description="Run a streaming prediction on a chatflow",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "chatflow_id": {"type": "string"},
+                "question": {"type": "string"},
+                "form": {"type": "object"},
+                "overrideConfig": {"type": "object"},
+                "history": {"type": "array"},
+                "uploads": {"type": "array"},
+                "sessionId": {"type": "string"}
+            },
+            "required": ["chatflow_id"]
+        },
+        handler=_prediction_stream
+    ),
+
+    ToolSpec(
+        name="prediction_batch",
+        description="Run many non-streaming predictions concurrently (e.g. an evaluation set) and report each "
+                    "answer plus latency percentiles and error rates per chatflow; results are also sent as "
+                    "progress notifications as they complete",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "chatflow_id": {"type": "string", "description": "Chatflow for items that do not name one"},
+                "items": {
+                    "type": "array",
+                    "maxItems": MAX_PREDICTION_BATCH,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "chatflow_id": {"type": "string"},
+                            "question": {"type": "string"},
+                            "form": {"type": "object"},
+                            "overrideConfig": {"type": "object"},
+                            "history": {"type": "array"},
+                            "sessionId": {"type": "string"}
+                        }
+                    }
+                },
+                "concurrency": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": MAX_PREDICTION_CONCURRENCY,
+                    "description": "Predictions in flight at once (default: FLOWISEAI_PREDICTION_CONCURRENCY or 4)"
+                },
+                "timeout": {"type": "number", "description": "Seconds allowed per prediction"},
+                "include_responses": {
+                    "type": "boolean",
+                    "description": "Include each prediction's response (default: true); false keeps only status and timing"
+                }
+            },
+            "required": ["items"]
+        },
+        handler=_prediction_batch
+    ),
+
+    # Chat Message tools
+    ToolSpec(
+        name="chatmessage_list",
+        description="List chat messages for a chatflow with filters. Pass page_size (or a cursor from a "
+                    "previous page) to get one bounded page plus next_cursor instead of the full history",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "chatflow_id": {"type": "string"},
+                "chatType": {"type": "string", "enum": ["INTERNAL", "EXTERNAL"]},
+                "order": {"type": "string", "enum": ["ASC", "DESC"]},
+                "chatId": {"type": "string"},
+                "memoryType": {"type": "string"},
+                "sessionId": {"type": "string"},
+                "startDate": {"type": "string"},
+                "endDate": {"type": "string"},
+                "feedback": {"type": "boolean"},
+                "limit": {"type": "integer"},
+                "offset": {"type": "integer"},
+                "page_size": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": MAX_PAGE_SIZE,
+                    "description": "Return one page of this many messages with a continuation cursor"
+                },
+                "cursor": {"type": "string", "description": "next_cursor from the previous page"},
+                **_FIELDS_PROPERTY
+            },
+            "required": ["chatflow_id"]
+        },
+        handler=_chatmessage_list
+    ),
+    ToolSpec(
+        name="chatmessage_delete_all",
+        description="Delete all chat messages for a chatflow",
+        input_schema={
+            "type": "object",
+            "properties": {"chatflow_id": {"type": "string"}},
+            "required": ["chatflow_id"]
+        },
+        handler=delete("delete_chat_messages", "All chat messages deleted successfully", "chatflow_id")
+    ),
+
+    # Attachment tools
+    ToolSpec(
+        name="attachment_create",
+        description="Create attachments for a chatflow/chat session",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "chatflow_id": {"type": "string"},
+                "chat_id": {"type": "string"},
+                "attachments": {"type": "array"},
+                "return_base64": {"type": "boolean"}
+            },
+            "required": ["chatflow_id", "chat_id", "attachments"]
+        },
+        handler=_attachment_create
+    ),
+
+    # Feedback tools
+    ToolSpec(
+        name="feedback_list",
+        description="List feedback for a chatflow",
+        input_schema={
+            "type": "object",
+            "properties": {"chatflow_id": {"type": "string"}, **_FIELDS_PROPERTY},
+            "required": ["chatflow_id"]
+        },
+        handler=listing("list_feedback", "chatflow_id")
+    ),
+    ToolSpec(
+        name="feedback_create",
+        description="Create feedback",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "chatflowid": {"type": "string"},
+                "chatId": {"type": "string"},
+                "messageId": {"type": "string"},
+                "rating": {"type": "integer", "minimum": 1, "maximum": 5},
+                "content": {"type": "string"}
+            },
+            "required": ["chatflowid", "chatId"]
+        },
+        handler=create("create_feedback", Feedback)
+    ),
+    ToolSpec(
+        name="feedback_update",
+        description="Update feedback",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "rating": {"type": "integer"},
+                "content": {"type": "string"}
+            },
+            "required": ["id"]
+        },
+        handler=update("update_feedback", Feedback)
+    ),
+
+    # Lead tools
+    ToolSpec(
+        name="lead_list",
+        description="List leads for a chatflow",
+        input_schema={
+            "type": "object",
+            "properties": {"chatflow_id": {"type": "string"}, **_FIELDS_PROPERTY},
+            "required": ["chatflow_id"]
+        },
+        handler=listing("list_leads", "chatflow_id")
+    ),
+    ToolSpec(
+        name="lead_create",
+        description="Create a lead",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "chatflowid": {"type": "string"},
+                "chatId": {"type": "string"},
+                "name": {"type": "string"},
+                "email": {"type": "string"},
+                "phone": {"type": "string"}
+            },
+            "required": ["chatflowid", "chatId"]
+        },
+        handler=create("create_lead", Lead)
+    ),
+
+    # Custom Tool tools
+    ToolSpec(
+        name="tool_create",
+        description="Create a custom tool with schema and function",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "description": {"type": "string"},
+                "schema": {"type": "object"},
+                "func": {"type": "string"}
+            },
+            "required": ["name"]
+        },
+        handler=create("create_tool", FlowiseTool)
+    ),
+    ToolSpec(
+        name="tool_list",
+        description="List all custom tools",
+        input_schema={
+            "type": "object",
+            "properties": {**_FIELDS_PROPERTY}
+        },
+        handler=listing("list_tools")
+    ),
+    ToolSpec(
+        name="tool_get",
+        description="Get a custom tool by ID",
+        input_schema={
+            "type": "object",
+            "properties": {"id": {"type": "string"}},
+            "required": ["id"]
+        },
+        handler=call("get_tool", "id")
+    ),
+    ToolSpec(
+        name="tool_update",
+        description="Update a custom tool",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "name": {"type": "string"},
+                "description": {"type": "string"},
+                "schema": {"type": "object"},
+                "func": {"type": "string"}
+            },
+            "required": ["id"]
+        },
+        handler=update("update_tool", FlowiseTool)
+    ),
+    ToolSpec(
+        name="tool_delete",
+        description="Delete a custom tool",
+        input_schema={
+            "type": "object",
+            "properties": {"id": {"type": "string"}},
+            "required": ["id"]
+        },
+        handler=delete("delete_tool", "Tool deleted successfully", "id")
+    ),
+
+    # Variable tools
+    ToolSpec(
+        name="variable_create",
+        description="Create a runtime variable",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "value": {},
+                "type": {"type": "string"}
+            },
+            "required": ["name", "value"]
+        },
+        handler=create("create_variable", Variable)
+    ),
+    ToolSpec(
+        name="variable_list",
+        description="List all variables",
+        input_schema={
+            "type": "object",
+            "properties": {**_FIELDS_PROPERTY}
+        },
+        handler=listing("list_variables")
+    ),
+    ToolSpec(
+        name="variable_update",
+        description="Update a variable",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "name": {"type": "string"},
+                "value": {},
+                "type": {"type": "string"}
+            },
+            "required": ["id"]
+        },
+        handler=update("update_variable", Variable)
+    ),
+    ToolSpec(
+        name="variable_delete",
+        description="Delete a variable",
+        input_schema={
+            "type": "object",
+            "properties": {"id": {"type": "string"}},
+            "required": ["id"]
+        },
+        handler=delete("delete_variable", "Variable deleted successfully", "id")
+    ),
+
+    # Document Store tools
+    ToolSpec(
+        name="docstore_list",
+        description="List all document stores",
+        input_schema={
+            "type": "object",
+            "properties": {**_FIELDS_PROPERTY}
+        },
+        handler=listing("list_document_stores")
+    ),
+    ToolSpec(
+        name="docstore_get",
+        description="Get a document store by ID",
+        input_schema={
+            "type": "object",
+            "properties": {"id": {"type": "string"}},
+            "required": ["id"]
+        },
+        handler=call("get_document_store", "id")
+    ),
+    ToolSpec(
+        name="docstore_create",
+        description="Create a new document store",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "description": {"type": "string"},
+                "loaders": {"type": "array"},
+                "vectorStoreConfig": {"type": "object"},
+                "embeddingConfig": {"type": "object"},
+                "recordManagerConfig": {"type": "object"}
+            },
+            "required": ["name"]
+        },
+        handler=create("create_document_store", DocumentStore)
+    ),
+    ToolSpec(
+        name="docstore_upsert",
+        description="Upsert documents to a document store, inline or streamed from local files via paths",
+        input_schema={
+            "type": "object",
+            "properties": {"store_id": {"type": "string"}, "documents": {"type": "array"}, **_FILE_INGEST_PROPERTIES},
+            "required": ["store_id"]
+        },
+        handler=_docstore_upsert
+    ),
+    ToolSpec(
+        name="docstore_bulk_upsert",
+        description="Upsert a large set of documents to a document store in parallel, size-bounded batches, "
+                    "retrying failed batches and reporting progress per batch",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "store_id": {"type": "string"},
+                "documents": {"type": "array"},
+                "batch_size": {"type": "integer", "minimum": 1, "description": "Maximum documents per request"},
+                "max_batch_bytes": {"type": "integer", "minimum": 1, "description": "Maximum JSON bytes per request"},
+                "concurrency": {"type": "integer", "minimum": 1, "maximum": 32, "description": "Batches in flight at once"}
+            },
+            "required": ["store_id", "documents"]
+        },
+        handler=_docstore_bulk_upsert
+    ),
+    ToolSpec(
+        name="docstore_refresh",
+        description="Refresh/reprocess all documents in a store",
+        input_schema={
+            "type": "object",
+            "properties": {"store_id": {"type": "string"}},
+            "required": ["store_id"]
+        },
+        handler=call("refresh_document_store", "store_id")
+    ),
+    ToolSpec(
+        name="docstore_get_chunks",
+        description="Get loader chunks from a document store",
+        input_schema={
+            "type": "object",
+            "properties": {"store_id": {"type": "string"}, "loader_id": {"type": "string"}},
+            "required": ["store_id", "loader_id"]
+        },
+        handler=call("get_document_chunks", "store_id", "loader_id")
+    ),
+    ToolSpec(
+        name="docstore_update_chunk",
+        description="Update a document chunk",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "store_id": {"type": "string"},
+                "chunk_id": {"type": "string"},
+                "pageContent": {"type": "string"},
+                "metadata": {"type": "object"}
+            },
+            "required": ["store_id", "chunk_id"]
+        },
+        handler=update("update_document_chunk", DocumentChunk, "store_id", "chunk_id")
+    ),
+    ToolSpec(
+        name="docstore_update",
+        description="Update a document store",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "name": {"type": "string"},
+                "description": {"type": "string"}
+            },
+            "required": ["id"]
+        },
+        handler=update("update_document_store", DocumentStore)
+    ),
+    ToolSpec(
+        name="docstore_delete",
+        description="Delete a document store",
+        input_schema={
+            "type": "object",
+            "properties": {"id": {"type": "string"}},
+            "required": ["id"]
+        },
+        handler=delete("delete_document_store", "Document store deleted successfully", "id")
+    ),
+    ToolSpec(
+        name="docstore_delete_chunk",
+        description="Delete a document chunk",
+        input_schema={
+            "type": "object",
+            "properties": {"store_id": {"type": "string"}, "chunk_id": {"type": "string"}},
+            "required": ["store_id", "chunk_id"]
+        },
+        handler=delete("delete_document_chunk", "Document chunk deleted successfully", "store_id", "chunk_id")
+    ),
+    ToolSpec(
+        name="docstore_delete_loader",
+        description="Delete a loader and all its chunks",
+        input_schema={
+            "type": "object",
+            "properties": {"store_id": {"type": "string"}, "loader_id": {"type": "string"}},
+            "required": ["store_id", "loader_id"]
+        },
+        handler=delete("delete_document_loader", "Document loader and chunks deleted successfully", "store_id", "loader_id")
+    ),
+
+    # Vector tools
+    ToolSpec(
+        name="vector_upsert",
+        description="Upsert embeddings to vector store for a chatflow; with paths, texts are read from local "
+                    "files and sent in batches",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "chatflow_id": {"type": "string"},
+                "documents": {"type": "array"},
+                "texts": {"type": "array"},
+                "embeddings": {"type": "array"},
+                "metadata": {"type": "array"},
+                "stopNodeId": {"type": "string"},
+                "overrideConfig": {"type": "object"},
+                "dedup": {
+                    "type": "boolean",
+                    "description": "Skip texts already upserted to this chatflow (default: on when the server "
+                                   "has a dedup index)"
+                },
+                **_FILE_INGEST_PROPERTIES
+            },
+            "required": ["chatflow_id"]
+        },
+        handler=_vector_upsert
+    ),
+
+    # Export tools
+    ToolSpec(
+        name="chat_history_export",
+        description="Export chat messages, feedback and leads of all (or selected) chatflows to gzipped "
+                    "NDJSON files under the server's export directory, optionally continuing from the last "
+                    "incremental checkpoint",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "name": {"type": "string", "description": "Subdirectory of the export directory (default: chat-history)"},
+                "chatflow_ids": {"type": "array", "items": {"type": "string"}},
+                "kinds": {"type": "array", "items": {"type": "string", "enum": list(EXPORT_KINDS)}},
+                "startDate": {"type": "string"},
+                "endDate": {"type": "string"},
+                "incremental": {"type": "boolean", "description": "Start each chatflow from its last checkpoint"},
+                "concurrency": {"type": "integer", "minimum": 1, "maximum": 32}
+            }
+        },
+        handler=_chat_history_export,
+        max_concurrency=1
+    ),
+
+    # Upsert History tools
+    ToolSpec(
+        name="upsert_history_list",
+        description="Retrieve upsert history for a chatflow",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "chatflow_id": {"type": "string"},
+                "order": {"type": "string", "enum": ["ASC", "DESC"]},
+                "startDate": {"type": "string"},
+                "endDate": {"type": "string"},
+                **_FIELDS_PROPERTY
+            },
+            "required": ["chatflow_id"]
+        },
+        handler=_upsert_history_list
+    ),
+    ToolSpec(
+        name="upsert_history_delete",
+        description="Soft-delete upsert history records",
+        input_schema={
+            "type": "object",
+            "properties": {"history_id": {"type": "string"}},
+            "required": ["history_id"]
+        },
+        handler=delete("delete_upsert_history", "Upsert history deleted successfully", "history_id")
+    ),
+
+    # Batch
+    ToolSpec(
+        name="batch",
+        description="Run many tool calls in one request, concurrently, returning each result or error in order",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "operations": {
+                    "type": "array",
+                    "maxItems": MAX_BATCH_OPERATIONS,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "tool": {"type": "string", "description": "Name of any other tool"},
+                            "arguments": {"type": "object"}
+                        },
+                        "required": ["tool"]
+                    }
+                },
+                "concurrency": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": MAX_BATCH_CONCURRENCY,
+                    "description": f"Operations run at once (default: {DEFAULT_BATCH_CONCURRENCY})"
+                }
+            },
+            "required": ["operations"]
+        },
+        handler=_batch,
+        requires_client=False
+    ),
+
+    # Health check
+    ToolSpec(
+        name="ping",
+        description="Health check endpoint",
+        input_schema={
+            "type": "object",
+            "properties": {}
+        },
+        handler=_ping,
+        requires_client=False,
+        shapes_output=False
+    ),
+)
+
+TOOLS: Dict[str, ToolSpec] = {spec.name: spec for spec in TOOL_SPECS}
+
+
+@functools.lru_cache(maxsize=None)
+def tool_catalog() -> Tuple[MCPTool, ...]:
+    """Build the MCP tool list once; the table is static for the life of the process"""
+    return tuple(
+        MCPTool(
+            name=spec.name,
+            description=spec.description,
+            inputSchema=_with_output_argument(spec.input_schema) if spec.shapes_output else spec.input_schema
+        )
+        for spec in TOOL_SPECS
+    )
+
+
+def _with_output_argument(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Advertise the shared `output` shaping argument on a tool's input schema"""
+    return {**schema, "properties": {**schema.get("properties", {}), OUTPUT_ARGUMENT: OUTPUT_SCHEMA}}
+
+
+@functools.lru_cache(maxsize=None)
+def tool_catalog_json() -> bytes:
+    """The tools/list result in its wire form, serialized once"""
+    result = ListToolsResult(tools=list(tool_catalog()))
+    return result.model_dump_json(by_alias=True, exclude_none=True).encode("utf-8")
+
+
+@functools.lru_cache(maxsize=None)
+def tool_catalog_etag() -> str:
+    return '"' + hashlib.blake2b(tool_catalog_json(), digest_size=16).hexdigest() + '"'
@@ -0,0 +1,290 @@
+"""Optional request tracing with W3C trace context
+
+Set FLOWISEAI_TRACING to turn it on:
+  console - one JSON span per line on stderr (stdout carries the stdio transport)
+  file    - the same lines appended to FLOWISEAI_TRACING_FILE
+  otel    - spans go to the OpenTelemetry SDK configured in this process
+            (e.g. an OTLP exporter to a collector); needs `opentelemetry-api`
+
+Spans follow OpenTelemetry naming: an MCP `tools/call` span per tool call
+(a child of the caller's `traceparent` when the HTTP request carries one) and
+a CLIENT span per FlowiseAI request, whose `traceparent` is sent on to Flowise.
+The console and file exporters write OTLP-style span objects with ids,
+nanosecond timestamps, attributes, events and status.
+"""
+
+import os
+import sys
+import json
+import time
+import secrets
+import logging
+import threading
+import contextvars
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    """(trace_id, span_id, flags) from a W3C traceparent header, or None if it is invalid"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    trace_id, span_id, flags = parts[1], parts[2], parts[3]
+    try:
+        int(trace_id, 16), int(span_id, 16), int(flags, 16)
+    except ValueError:
+        return None
+    if len(trace_id) != 32 or len(span_id) != 16 or trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id.lower(), span_id.lower(), flags
+
+
+class Span:
+    """A finished-on-exit span, exported as one OTLP-style JSON object"""
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_id", "flags", "start_ns", "end_ns",
+        "attributes", "events", "status", "status_message", "current", "_tracer", "_token"
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, kind: str, trace_id: str, parent_id: Optional[str],
+                 flags: str, attributes: Optional[Dict[str, Any]], current: bool = True):
+        self._tracer = tracer
+        self.current = current
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.flags = flags
+        self.attributes = dict(attributes) if attributes else {}
+        self.events = []
+        self.status = "UNSET"
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._token = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{self.flags}"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        event = {"name": name, "timeUnixNano": time.time_ns()}
+        if attributes:
+            event["attributes"] = attributes
+        self.events.append(event)
+
+    def record_exception(self, error: BaseException):
+        self.add_event("exception", {"exception.type": type(error).__name__, "exception.message": str(error)})
+        self.status = "ERROR"
+        self.status_message = str(error)
+
+    def __enter__(self) -> "Span":
+        if self.current:
+            self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A consumer closing a stream early is not a failure
+        if exc is not None and not isinstance(exc, GeneratorExit) and self.status != "ERROR":
+            self.record_exception(exc)
+        self.end_ns = time.time_ns()
+        if self._token is not None:
+            _current.reset(self._token)
+        self._tracer.export(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind}",
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": f"STATUS_CODE_{self.status}"}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.events:
+            span["events"] = self.events
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NoopSpan:
+    """Stand-in used when tracing is off, so call sites need no checks"""
+
+    __slots__ = ()
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("flowiseai_span", default=None)
+
+
+class Tracer:
+    """Creates spans and writes finished ones as JSON lines to a stream"""
+
+    def __init__(self, stream, service_name: str = "flowiseai-mcp"):
+        self.stream = stream
+        self.resource = {"service.name": service_name, "process.pid": os.getpid()}
+        self._lock = threading.Lock()
+        self.exported = 0
+
+    def start_span(self, name: str, kind: str = "INTERNAL", attributes: Optional[Dict[str, Any]] = None,
+                   traceparent: Optional[str] = None, current: bool = True) -> Span:
+        """Start a child of the current span, of `traceparent` when given, or a new trace
+
+        With current=False the span does not become the parent of spans started
+        inside it, which is what an async generator needs: it yields into its
+        consumer's context, so it must not leave itself set there.
+        """
+        parent = _current.get()
+        remote = parse_traceparent(traceparent) if traceparent else None
+        if remote is not None:
+            trace_id, parent_id, flags = remote
+        elif parent is not None:
+            trace_id, parent_id, flags = parent.trace_id, parent.span_id, parent.flags
+        else:
+            trace_id, parent_id, flags = secrets.token_hex(16), None, "01"
+        return Span(self, name, kind, trace_id, parent_id, flags, attributes, current)
+
+    def export(self, span: Span):
+        record = span.to_dict()
+        record["resource"] = self.resource
+        line = json.dumps(record, default=str, separators=(",", ":")) + "\n"
+        try:
+            with self._lock:
+                # One write per span keeps lines whole when several workers append to one file
+                self.stream.write(line)
+                self.stream.flush()
+            self.exported += 1
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to export span {span.name}: {e}")
+
+
+class OtelTracer:
+    """Adapter creating spans through the OpenTelemetry API instead of the built-in exporters"""
+
+    def __init__(self, trace, context, propagate):
+        self._trace = trace
+        self._context = context
+        self._propagate = propagate
+        self._tracer = trace.get_tracer("flowiseai_mcp")
+
+    def start_span(self, name: str, kind: str = "INTERNAL", attributes: Optional[Dict[str, Any]] = None,
+                   traceparent: Optional[str] = None, current: bool = True) -> "_OtelSpan":
+        parent = self._propagate.extract({TRACEPARENT_HEADER: traceparent}) if traceparent else None
+        span = self._tracer.start_span(
+            name, context=parent, kind=getattr(self._trace.SpanKind, kind), attributes=attributes
+        )
+        return _OtelSpan(self, span, current)
+
+
+class _OtelSpan:
+    __slots__ = ("_owner", "_span", "_current", "_token")
+
+    def __init__(self, owner: OtelTracer, span, current: bool):
+        self._owner = owner
+        self._span = span
+        self._current = current
+        self._token = None
+
+    @property
+    def traceparent(self) -> Optional[str]:
+        carrier: Dict[str, str] = {}
+        self._owner._propagate.inject(carrier, context=self._owner._trace.set_span_in_context(self._span))
+        return carrier.get(TRACEPARENT_HEADER)
+
+    def set_attribute(self, key: str, value: Any):
+        self._span.set_attribute(key, value)
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self._span.add_event(name, attributes or {})
+
+    def record_exception(self, error: BaseException):
+        self._span.record_exception(error)
+        self._span.set_status(self._owner._trace.Status(self._owner._trace.StatusCode.ERROR, str(error)))
+
+    def __enter__(self) -> "_OtelSpan":
+        if self._current:
+            self._token = self._owner._context.attach(self._owner._trace.set_span_in_context(self._span))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            self.record_exception(exc)
+        self._span.end()
+        if self._token is not None:
+            self._owner._context.detach(self._token)
+        return False
+
+
+def _create_tracer():
+    mode = os.getenv("FLOWISEAI_TRACING", "").lower()
+    if mode in ("", "off", "none", "false", "0"):
+        return None
+    service_name = os.getenv("OTEL_SERVICE_NAME", "flowiseai-mcp")
+    if mode == "otel":
+        try:
+            from opentelemetry import trace, context, propagate
+            return OtelTracer(trace, context, propagate)
+        except ImportError:
+            logger.error("FLOWISEAI_TRACING=otel needs opentelemetry-api; writing spans to stderr instead")
+            mode = "console"
+    if mode == "file":
+        path = os.getenv("FLOWISEAI_TRACING_FILE", "flowiseai-mcp-traces.jsonl")
+        return Tracer(open(path, "a", encoding="utf-8"), service_name)
+    if mode != "console":
+        logger.error(f"Unknown FLOWISEAI_TRACING mode {mode!r}; writing spans to stderr")
+    return Tracer(sys.stderr, service_name)
+
+
+_tracer = _create_tracer()
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def start_span(name: str, kind: str = "INTERNAL", attributes: Optional[Dict[str, Any]] = None,
+               traceparent: Optional[str] = None, current: bool = True):
+    """Open a span (use as a context manager); a shared no-op span when tracing is off"""
+    if _tracer is None:
+        return NOOP_SPAN
+    return _tracer.start_span(name, kind, attributes, traceparent, current)
+
+
+def configure_tracing(tracer=None):
+    """Replace the tracer chosen from the environment, e.g. with a Tracer on another stream; None disables"""
+    global _tracer
+    _tracer = tracer
@@ -0,0 +1,315 @@
+"""Multi-process launcher for the HTTP server
+
+`WorkerSupervisor` binds the listening socket once and runs N worker
+processes that accept on it, each importing the app and so holding its own
+client registry and connection pools. SIGHUP replaces the workers one at a
+time: a new worker must be serving before the old one is asked to finish its
+in-flight requests and exit, so capacity never drops below N - 1. Workers
+that die are respawned.
+
+Each worker periodically writes a small stats snapshot into a directory
+shared with its siblings, which lets `/health` on any worker report all of
+them. When a worker stops, the supervisor folds its last metrics snapshot
+into a baseline kept in the same directory, so counters summed over the
+workers never go backwards.
+"""
+
+import os
+import json
+import time
+import signal
+import socket
+import asyncio
+import logging
+import tempfile
+import multiprocessing
+from typing import Optional, Dict, Any, List, Callable
+
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Set by the supervisor for its workers
+STATS_DIR_ENV = "FLOWISEAI_WORKER_STATS_DIR"
+WORKER_INDEX_ENV = "FLOWISEAI_WORKER_INDEX"
+WORKER_GENERATION_ENV = "FLOWISEAI_WORKER_GENERATION"
+
+# Counters and histograms of stopped workers, next to the live snapshots
+RETIRED_METRICS_FILE = "retired-metrics.json"
+
+_spawn = multiprocessing.get_context("spawn")
+
+
+def default_worker_count(stateless: bool = False) -> int:
+    """FLOWISEAI_HTTP_WORKERS; unset, one worker per CPU for stateless servers and a single one otherwise"""
+    value = os.getenv("FLOWISEAI_HTTP_WORKERS", "")
+    if value and value.lower() != "auto":
+        return max(1, int(value))
+    if value or stateless:
+        return os.cpu_count() or 1
+    return 1
+
+
+def write_worker_stats(stats: Dict[str, Any], kind: str = "stats"):
+    """Publish this worker's snapshot of a kind for its siblings (no-op outside the supervisor)"""
+    directory = os.getenv(STATS_DIR_ENV)
+    if not directory:
+        return
+    _write_json(os.path.join(directory, f"{os.getpid()}.{kind}.json"), stats)
+
+
+def _write_json(path: str, data: Any):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def remove_worker_stats(pid: Optional[int] = None, kind: Optional[str] = None):
+    """Drop the snapshots of a worker (by default this one), or only those of one kind"""
+    directory = os.getenv(STATS_DIR_ENV)
+    if not directory:
+        return
+    prefix = f"{pid or os.getpid()}."
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and (kind is None or name == f"{prefix}{kind}.json"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def read_worker_stats(kind: str = "stats") -> Optional[List[Dict[str, Any]]]:
+    """Snapshots of a kind from every live worker, or None outside the supervisor"""
+    directory = os.getenv(STATS_DIR_ENV)
+    if not directory:
+        return None
+    snapshots = []
+    for name in os.listdir(directory):
+        if not name.endswith(f".{kind}.json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Written or removed concurrently; it shows up on the next read
+            continue
+    return snapshots
+
+
+def _read_retired(directory: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(directory, RETIRED_METRICS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"pids": [], "metrics": {}}
+
+
+def read_worker_metrics() -> Optional[List[Dict[str, Any]]]:
+    """Metrics snapshots of every live worker plus the retired baseline, or None outside the supervisor"""
+    directory = os.getenv(STATS_DIR_ENV)
+    if not directory:
+        return None
+    retired = _read_retired(directory)
+    # A worker being folded in is already part of the baseline
+    folded = set(retired["pids"])
+    snapshots = [retired["metrics"]]
+    for name in os.listdir(directory):
+        if not name.endswith(".metrics.json") or name.split(".", 1)[0] in folded:
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def retire_worker_stats(pid: int):
+    """Fold a stopped worker's last metrics snapshot into the retired baseline, then drop its snapshots"""
+    directory = os.getenv(STATS_DIR_ENV)
+    if not directory:
+        return
+    try:
+        with open(os.path.join(directory, f"{pid}.metrics.json")) as f:
+            last = json.load(f)
+    except (OSError, ValueError):
+        last = None
+    if last is None:
+        remove_worker_stats(pid)
+        return
+    path = os.path.join(directory, RETIRED_METRICS_FILE)
+    metrics = METRICS.accumulate(_read_retired(directory)["metrics"], last)
+    # Readers skip the worker's own snapshot while the baseline already counts it
+    _write_json(path, {"pids": [str(pid)], "metrics": metrics})
+    remove_worker_stats(pid)
+    _write_json(path, {"pids": [], "metrics": metrics})
+
+
+async def _serve(server, sock: socket.socket, ready, drain, in_flight: Callable[[], int], graceful_timeout: float):
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started and not task.done():
+        await asyncio.sleep(0.05)
+    if server.started:
+        ready.set()
+    while not task.done() and not drain.is_set():
+        await asyncio.sleep(0.1)
+    if not task.done():
+        # Stop accepting and let open requests (SSE streams included) finish
+        # before uvicorn shuts down, which would cut streaming responses short
+        for listener in server.servers:
+            listener.close()
+        deadline = time.monotonic() + graceful_timeout
+        while in_flight() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        server.should_exit = True
+    await task
+
+
+def _worker_main(sock: socket.socket, index: int, generation: int, ready, drain, log_level: str, graceful_timeout: float):
+    """Entry point of a worker process"""
+    import uvicorn
+
+    os.environ[WORKER_INDEX_ENV] = str(index)
+    os.environ[WORKER_GENERATION_ENV] = str(generation)
+    # Imported here so every worker builds its own MCPApp, registry and client pools
+    from .http_server import app, mcp_app
+
+    config = uvicorn.Config(app, log_level=log_level, timeout_graceful_shutdown=graceful_timeout)
+    asyncio.run(_serve(uvicorn.Server(config), sock, ready, drain, lambda: mcp_app.in_flight, graceful_timeout))
+
+
+class _Worker:
+    __slots__ = ("index", "generation", "process", "ready", "drain")
+
+    def __init__(self, index: int, generation: int, process, ready, drain):
+        self.index = index
+        self.generation = generation
+        self.process = process
+        self.ready = ready
+        self.drain = drain
+
+
+class WorkerSupervisor:
+    """Run and supervise HTTP worker processes sharing one listening socket"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        workers: int,
+        log_level: str = "error",
+        graceful_timeout: Optional[float] = None,
+        startup_timeout: Optional[float] = None
+    ):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.log_level = log_level
+        self.graceful_timeout = graceful_timeout if graceful_timeout is not None else float(
+            os.getenv("FLOWISEAI_WORKER_GRACEFUL_TIMEOUT", "30")
+        )
+        self.startup_timeout = startup_timeout if startup_timeout is not None else float(
+            os.getenv("FLOWISEAI_WORKER_STARTUP_TIMEOUT", "60")
+        )
+        self._workers: List[_Worker] = []
+        self._socket: Optional[socket.socket] = None
+        self._generation = 0
+        self._restart_requested = False
+        self._should_exit = False
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self, index: int) -> _Worker:
+        ready = _spawn.Event()
+        drain = _spawn.Event()
+        process = _spawn.Process(
+            target=_worker_main,
+            args=(self._socket, index, self._generation, ready, drain, self.log_level, self.graceful_timeout),
+            name=f"flowiseai-mcp-worker-{index}"
+        )
+        process.start()
+        logger.info(f"Started worker {index} (pid {process.pid}, generation {self._generation})")
+        return _Worker(index, self._generation, process, ready, drain)
+
+    def _wait_ready(self, worker: _Worker) -> bool:
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline and not self._should_exit:
+            if worker.ready.wait(0.1):
+                return True
+            if not worker.process.is_alive():
+                return False
+        return False
+
+    def _stop(self, worker: _Worker):
+        """Ask a worker to finish its in-flight requests and exit, killing it past the grace period"""
+        if worker.process.is_alive():
+            worker.drain.set()
+            worker.process.join(self.graceful_timeout + 5)
+            if worker.process.is_alive():
+                logger.error(f"Worker {worker.index} (pid {worker.process.pid}) did not exit, killing it")
+                worker.process.kill()
+                worker.process.join()
+        retire_worker_stats(worker.process.pid)
+
+    def rolling_restart(self):
+        """Replace every worker, starting each replacement before stopping the worker it replaces"""
+        self._generation += 1
+        logger.info(f"Rolling restart to generation {self._generation}")
+        for position, old in enumerate(list(self._workers)):
+            new = self._spawn(old.index)
+            if not self._wait_ready(new):
+                logger.error(f"Replacement worker {old.index} failed to start; keeping the running workers")
+                self._stop(new)
+                return
+            self._workers[position] = new
+            self._stop(old)
+        logger.info(f"Rolling restart complete: {len(self._workers)} workers at generation {self._generation}")
+
+    def _respawn_dead(self):
+        for position, worker in enumerate(self._workers):
+            if not worker.process.is_alive():
+                logger.error(f"Worker {worker.index} (pid {worker.process.pid}) exited with "
+                             f"{worker.process.exitcode}, restarting it")
+                retire_worker_stats(worker.process.pid)
+                self._workers[position] = self._spawn(worker.index)
+
+    def _handle_signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self._restart_requested = True
+        else:
+            self._should_exit = True
+
+    def run(self):
+        """Serve until SIGINT/SIGTERM; SIGHUP triggers a rolling restart"""
+        self._socket = self._bind()
+        stats_dir = tempfile.mkdtemp(prefix="flowiseai-mcp-workers-")
+        os.environ[STATS_DIR_ENV] = stats_dir
+        for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(sig, self._handle_signal)
+        try:
+            self._workers = [self._spawn(index) for index in range(self.workers)]
+            while not self._should_exit:
+                if self._restart_requested:
+                    self._restart_requested = False
+                    self.rolling_restart()
+                else:
+                    self._respawn_dead()
+                time.sleep(0.5)
+        finally:
+            for worker in self._workers:
+                worker.drain.set()
+            for worker in self._workers:
+                self._stop(worker)
+            self._socket.close()
+            for name in os.listdir(stats_dir):
+                os.remove(os.path.join(stats_dir, name))
+            os.rmdir(stats_dir)
+            logger.info("All workers stopped")